@@ -1,16 +1,29 @@
 ﻿# SehaCafmHelper.py
+import time
+
+_PROCESS_STARTED_AT = time.perf_counter() # لقياس زمن ظهور النافذة من بدء الاستيراد
+
 import sys
+import functools
+import importlib
+import threading
+from collections import deque
 from pathlib import Path
+from typing import TYPE_CHECKING
 from PySide6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QPushButton, QTextEdit, QMessageBox, QLabel, QGroupBox)
-from PySide6.QtCore import QThread, Signal, Qt
+                             QPushButton, QPlainTextEdit, QMessageBox, QLabel, QGroupBox, QDialog)
+from PySide6.QtCore import QObject, QThread, QTimer, Signal, Qt
 from PySide6.QtGui import QFont
 
 # --- استيراد الوحدات المساعدة ---
+# الوحدات التي تستورد Playwright (مدير المتصفح، الإدخال، المراقبة) تُستورد عند أول استخدام أو في
+# التجهيز المسبق بعد ظهور النافذة (PREWARM_MODULES)، فلا تؤخر ظهور الواجهة.
 try:
-    from utils.browser_manager import BrowserManager 
-    from utils.logger import Logger 
-    # from utils.config_manager import ConfigManager # سنضيفه عند الحاجة لقراءة الإعدادات من ملف
+    from utils.async_loop_thread import AsyncLoopThread
+    from utils.browser_worker import BrowserWorker, BrowserCommand, PRIORITY_HIGH, PRIORITY_LOW
+    from utils.logger import Logger, stop_logging
+    from utils.metrics import METRICS, TimingEvent
+    from utils.config_manager import ConfigManager, ConfigError
 except ImportError as e:
     initial_error_msg = f"خطأ حرج في استيراد الوحدات: {e}\n" \
                         f"يرجى التأكد من وجود مجلد 'utils' وبه الملفات المطلوبة."
@@ -25,101 +38,193 @@ except ImportError as e:
         print(initial_error_msg)
     sys.exit(1)
 
+if TYPE_CHECKING:
+    from utils.browser_manager import BrowserManager
+    from utils.async_browser_manager import AsyncBrowserManager
+    from utils.connection_supervisor import AsyncConnectionSupervisor
+    from utils.data_entry import DataEntryEngine
+    from utils.monitoring_service import MonitoringService
+
+_IMPORTS_DONE_AT = time.perf_counter()
+
+PREWARM_MODULES = ("utils.browser_manager", "utils.async_browser_manager", "utils.data_entry",
+                   "utils.monitoring_service")
+
+BROWSER_COMMAND_TITLES = {
+    "connect_and_navigate": "الاتصال والانتقال",
+    "check_login_status": "التحقق من تسجيل الدخول",
+    "save_session": "حفظ الجلسة",
+    "prewarm": "تجهيز Playwright",
+}
+
 # --- مسارات ---
 APP_BASE_DIR = Path(__file__).resolve().parent
 SESSIONS_DIR = APP_BASE_DIR / 'sessions' # سيتم إنشاؤه إذا لم يكن موجودًا
 BROWSER_SESSION_FILE = SESSIONS_DIR / "browser_session.json"
+CONFIG_FILE = APP_BASE_DIR / 'config' / 'config.json'
+
+# --- أوامر المتصفح (تُنفذ في خيط BrowserWorker الدائم) ---
+# كل أمر يستقبل مدير المتصفح المملوك للعامل والأمر نفسه (للتقدم والإلغاء)، ويعيد (النجاح، الرسالة).
+# لا تلمس هذه الدوال عناصر Qt.
+def connect_and_navigate_command(manager: "BrowserManager", command: BrowserCommand, login_url: str | None,
+                                 cdp_url: str, cdp_timeout: int) -> tuple[bool, str]:
+    if not login_url:
+        return False, "رابط تسجيل الدخول (login_url) غير محدد."
+    if not manager.connect_to_existing_cdp_browser(cdp_url, cdp_timeout):
+        return False, "فشل الاتصال بالمتصفح. تأكد من تشغيله يدويًا مع العلامات الصحيحة (--remote-debugging-port و --user-data-dir)."
+    command.report("تم الاتصال بالمتصفح بنجاح.")
+    command.check_cancelled()
+    if not manager.navigate_to_url(login_url):
+        return False, f"تم الاتصال، لكن فشل الانتقال إلى صفحة تسجيل الدخول ({login_url})."
+    return True, f"تم الانتقال إلى: {login_url}. يرجى تسجيل الدخول يدويًا في المتصفح."
+
+
+def check_login_status_command(manager: "BrowserManager", command: BrowserCommand, session_check_xpath: str | None,
+                               session_check: dict) -> tuple[bool, str]:
+    if not manager.is_connected_to_persistent_cdp:
+        return False, "غير متصل بالمتصفح. لا يمكن التحقق."
+    if not session_check_xpath and not session_check.get("probe_url"):
+        return False, "إعدادات التحقق من تسجيل الدخول مفقودة (session_check.probe_url أو محدد XPath)."
+    # فحص سريع عبر الكوكيز وطلب HTTP واحد، ولا يُفحص العنصر في الصفحة إلا عند الغموض
+    health = manager.check_session_health(**{**session_check, "dom_selector": session_check_xpath})
+    if health.is_valid:
+        return True, f"تم التحقق من تسجيل الدخول بنجاح ({health.detail}، {health.duration_ms:.0f} ms)."
+    return False, f"فشل التحقق من تسجيل الدخول ({health.detail}). تأكد من أنك على الصفحة الصحيحة بعد تسجيل الدخول."
+
 
-# --- الخيط الخاص بعمليات المتصفح ---
-class BrowserLoginThread(QThread):
+def save_session_command(manager: "BrowserManager", command: BrowserCommand) -> tuple[bool, str]:
+    if not manager.is_connected_to_persistent_cdp:
+        return False, "غير متصل بالمتصفح. لا يمكن حفظ الجلسة."
+    SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    if manager.save_current_session_state(str(BROWSER_SESSION_FILE)):
+        return True, f"تم حفظ الجلسة بنجاح في: {BROWSER_SESSION_FILE}"
+    return False, "فشل حفظ الجلسة."
+
+
+def prewarm_command(manager: "BrowserManager", command: BrowserCommand) -> tuple[bool, str]:
+    manager.prewarm()
+    return True, "Playwright المتزامن جاهز."
+
+
+class BrowserWorkerBridge(QObject):
+    # ينقل أحداث BrowserWorker (من خيطه) إلى خيط الواجهة عبر إشارات Qt
     log_signal = Signal(str)
-    connection_status_signal = Signal(bool, str, bool) 
-    login_check_status_signal = Signal(bool, str) 
-    session_save_status_signal = Signal(bool, str) 
+    command_started_signal = Signal(str)
+    command_finished_signal = Signal(str, bool, str) # (اسم الأمر، النجاح، الرسالة)
 
-    def __init__(self, operation: str, browser_manager: BrowserManager, 
-                 login_url: str | None = None, session_check_xpath: str | None = None,
-                 logger_instance: Logger | None = None):
+    def __init__(self, logger_instance: Logger | None = None):
         super().__init__()
-        self.operation = operation
-        self.browser_manager = browser_manager
-        self.login_url = login_url
-        self.session_check_xpath = session_check_xpath
-        self.logger = logger_instance if logger_instance else Logger(name=f"BrowserLoginThread-{operation}")
-        self.setObjectName(f"BrowserLoginThread-{operation}")
-
-    def run(self):
-        try:
-            if self.operation == "connect_and_navigate":
-                self.log_signal.emit("بدء عملية الاتصال بالمتصفح والانتقال لصفحة تسجيل الدخول...")
-                if not self.login_url:
-                    self.log_signal.emit("خطأ: رابط تسجيل الدخول (login_url) غير محدد.")
-                    self.connection_status_signal.emit(False, "رابط تسجيل الدخول غير محدد.", False)
-                    return
-
-                if self.browser_manager.connect_to_existing_cdp_browser():
-                    self.log_signal.emit("تم الاتصال بالمتصفح بنجاح.")
-                    if self.browser_manager.navigate_to_url(self.login_url):
-                        msg = f"تم الانتقال إلى: {self.login_url}. يرجى تسجيل الدخول يدويًا في المتصفح."
-                        self.log_signal.emit(msg)
-                        self.connection_status_signal.emit(True, msg, True)
-                    else:
-                        msg = f"فشل الانتقال إلى صفحة تسجيل الدخول ({self.login_url})."
-                        self.log_signal.emit(msg)
-                        self.connection_status_signal.emit(True, msg, False) 
-                else:
-                    msg = "فشل الاتصال بالمتصفح. تأكد من تشغيله يدويًا مع العلامات الصحيحة (--remote-debugging-port و --user-data-dir)."
-                    self.log_signal.emit(msg)
-                    self.connection_status_signal.emit(False, msg, False)
-
-            elif self.operation == "check_login_status":
-                self.log_signal.emit("بدء عملية التحقق من تسجيل الدخول...")
-                if not self.browser_manager.is_connected_to_persistent_cdp:
-                    self.log_signal.emit("غير متصل بالمتصفح. لا يمكن التحقق.")
-                    self.login_check_status_signal.emit(False, "غير متصل بالمتصفح.")
-                    return
-                if not self.session_check_xpath:
-                    self.log_signal.emit("تحذير: محدد XPath للتحقق من تسجيل الدخول غير متوفر. لا يمكن التحقق.")
-                    self.login_check_status_signal.emit(False, "محدد XPath للتحقق مفقود.")
-                    return
-
-                if self.browser_manager.check_element_exists(self.session_check_xpath):
-                    msg = "تم التحقق من تسجيل الدخول بنجاح (العنصر المطلوب موجود)."
-                    self.log_signal.emit(msg)
-                    self.login_check_status_signal.emit(True, msg)
-                else:
-                    msg = "فشل التحقق من تسجيل الدخول (العنصر المطلوب غير موجود). تأكد من أنك على الصفحة الصحيحة بعد تسجيل الدخول."
-                    self.log_signal.emit(msg)
-                    self.login_check_status_signal.emit(False, msg)
-            
-            elif self.operation == "save_session":
-                self.log_signal.emit("بدء عملية حفظ الجلسة...")
-                if not self.browser_manager.is_connected_to_persistent_cdp:
-                    self.log_signal.emit("غير متصل بالمتصفح. لا يمكن حفظ الجلسة.")
-                    self.session_save_status_signal.emit(False, "غير متصل بالمتصفح.")
-                    return
-
-                SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
-                if self.browser_manager.save_current_session_state(str(BROWSER_SESSION_FILE)):
-                    msg = f"تم حفظ الجلسة بنجاح في: {BROWSER_SESSION_FILE}"
-                    self.log_signal.emit(msg)
-                    self.session_save_status_signal.emit(True, msg)
-                else:
-                    msg = "فشل حفظ الجلسة."
-                    self.log_signal.emit(msg)
-                    self.session_save_status_signal.emit(False, msg)
-        except Exception as e:
-            error_msg = f"حدث خطأ فادح في خيط عمليات المتصفح ({self.operation}): {e}"
-            self.log_signal.emit(error_msg)
-            self.logger.error(error_msg, exc_info=True)
-            if self.operation == "connect_and_navigate":
-                self.connection_status_signal.emit(False, f"خطأ فادح: {e}", False)
-            elif self.operation == "check_login_status":
-                self.login_check_status_signal.emit(False, f"خطأ فادح: {e}")
-            elif self.operation == "save_session":
-                self.session_save_status_signal.emit(False, f"خطأ فادح: {e}")
-        finally:
-            self.log_signal.emit(f"انتهى عمل الخيط لعملية: {self.operation}")
+        self.worker = BrowserWorker(
+            logger_instance=logger_instance,
+            on_started=lambda command: self.command_started_signal.emit(command.name),
+            on_finished=lambda command: self.command_finished_signal.emit(command.name, command.success, command.message),
+            on_progress=lambda command, message: self.log_signal.emit(message),
+        )
+
+
+# --- جسر العمليات غير المتزامنة ---
+class AsyncOperationBridge(QObject):
+    # العمليات غير المتزامنة تعمل على حلقة asyncio في خيط خلفي واحد (AsyncLoopThread)،
+    # وهذا الجسر يعيد سجلاتها ونتائجها إلى خيط الواجهة عبر إشارات Qt.
+    log_signal = Signal(str)
+    operation_finished_signal = Signal(str, bool, str) # (اسم العملية، النجاح، الرسالة)
+
+    def __init__(self, loop_thread: AsyncLoopThread, logger_instance: Logger | None = None):
+        super().__init__()
+        self.loop_thread = loop_thread
+        self.logger = logger_instance if logger_instance else Logger(name="AsyncOperationBridge")
+        self.running_operations: dict = {}
+
+    def is_running(self, operation: str) -> bool:
+        future = self.running_operations.get(operation)
+        return future is not None and not future.done()
+
+    def submit(self, operation: str, coro):
+        # coro يجب أن يعيد (success: bool, message: str)
+        def on_done(future):
+            try:
+                success, message = future.result()
+            except Exception as e:
+                self.logger.error(f"حدث خطأ فادح في العملية غير المتزامنة ({operation}): {e}", exc_info=True)
+                success, message = False, f"خطأ فادح: {e}"
+            self.operation_finished_signal.emit(operation, success, message)
+
+        self.running_operations[operation] = self.loop_thread.submit(coro, callback=on_done)
+
+
+# --- عرض السجل في الواجهة على دفعات ---
+class GuiLogSink(QObject):
+    # append آمن من أي خيط ولا يلمس Qt (deque.append ذري)، ومؤقت في خيط الواجهة يضيف كل الأسطر
+    # المتراكمة دفعة واحدة. العرض محدود بعدد أسطر أقصى، فالأقدم يُحذف تلقائيًا.
+    def __init__(self, view: QPlainTextEdit, interval_ms: int = 100, max_lines: int = 5000):
+        super().__init__(view)
+        self.view = view
+        self.view.setMaximumBlockCount(max_lines)
+        self._pending: deque[str] = deque()
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def append(self, line: str):
+        self._pending.append(line)
+
+    def flush(self):
+        if not self._pending:
+            return
+        lines = []
+        while self._pending:
+            lines.append(self._pending.popleft())
+        max_lines = self.view.maximumBlockCount()
+        if len(lines) > max_lines: # ما سيُحذف من العرض على أي حال لا داعي لرسمه
+            lines = [f"... تم تخطي {len(lines) - max_lines + 1} سطر في العرض (موجودة في ملف السجل) ..."] + lines[-(max_lines - 1):]
+        scrollbar = self.view.verticalScrollBar()
+        follow = scrollbar.value() >= scrollbar.maximum() - 2 # لا نقفز للأسفل إذا كان المستخدم يقرأ سطرًا أقدم
+        self.view.appendPlainText("\n".join(lines))
+        if follow:
+            scrollbar.setValue(scrollbar.maximum())
+
+
+# --- لوحة إحصاءات الأداء ---
+class MetricsDialog(QDialog):
+    # تعرض p50/p95/p99 لكل عملية من سجل القياسات المشترك وتُحدث كل ثانية
+    def __init__(self, parent: QWidget | None = None):
+        super().__init__(parent)
+        self.setWindowTitle("إحصاءات الأداء")
+        self.resize(900, 400)
+        layout = QVBoxLayout(self)
+        self.table_view = QPlainTextEdit()
+        self.table_view.setReadOnly(True)
+        self.table_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.table_view.setLayoutDirection(Qt.LeftToRight)
+        self.table_view.setFont(QFont("Consolas", 9))
+        layout.addWidget(self.table_view)
+
+        buttons_layout = QHBoxLayout()
+        save_button = QPushButton("حفظ إلى ملف")
+        save_button.clicked.connect(self.save_to_file)
+        reset_button = QPushButton("تصفير")
+        reset_button.clicked.connect(self.reset)
+        buttons_layout.addWidget(save_button)
+        buttons_layout.addWidget(reset_button)
+        layout.addLayout(buttons_layout)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start()
+        self.refresh()
+
+    def refresh(self):
+        self.table_view.setPlainText(METRICS.format_table())
+
+    def save_to_file(self):
+        file_path = METRICS.dump()
+        QMessageBox.information(self, "تم الحفظ", f"تم حفظ الإحصاءات في:\n{file_path}")
+
+    def reset(self):
+        METRICS.reset()
+        self.refresh()
 
 
 class MainApplicationWindow(QWidget):
@@ -129,19 +234,120 @@ class MainApplicationWindow(QWidget):
         self.setGeometry(200, 200, 750, 550)
         
         self.logger = Logger(name="SehaCafmGUI") 
-        self.browser_manager = BrowserManager(logger_instance=self.logger)
-        self.active_thread: BrowserLoginThread | None = None
+        # مدير المتصفح المتزامن يملكه خيط عامل دائم واحد ينفذ أوامر الأزرار من طابور أولويات
+        self.worker_bridge = BrowserWorkerBridge(logger_instance=self.logger)
+        self.browser_worker = self.worker_bridge.worker
+        self.worker_bridge.log_signal.connect(self.log_to_gui)
+        self.worker_bridge.command_started_signal.connect(self.on_browser_command_started)
+        self.worker_bridge.command_finished_signal.connect(self.on_browser_command_finished)
+        # المدير غير المتزامن يُنشأ عند أول استخدام (انظر الخاصية async_browser_manager)
+        self._async_browser_manager: "AsyncBrowserManager | None" = None
+        # مشرف إعادة الاتصال للمدير غير المتزامن، يُنشأ مع أول إدخال أو مراقبة ويشتركان فيه
+        self._connection_supervisor: "AsyncConnectionSupervisor | None" = None
+        self._managers_lock = threading.Lock() # التجهيز المسبق ينشئ المدير غير المتزامن من خيط الحلقة
+        self._first_action_reported = False
+        self._queued_at: dict[str, float] = {} # وقت الضغط على الزر لكل عملية، لقياس زمن أول عملية
+        # حلقة asyncio واحدة في خيط خلفي لعمليات المتصفح المتوازية (مثل إدخال البيانات)
+        self.async_loop = AsyncLoopThread()
+        self.async_bridge = AsyncOperationBridge(self.async_loop, logger_instance=self.logger)
+        self.async_bridge.log_signal.connect(self.log_to_gui)
+        self.async_bridge.operation_finished_signal.connect(self.on_async_operation_finished)
+        self.monitoring_service: "MonitoringService | None" = None
+        self.metrics_dialog: MetricsDialog | None = None
         self.login_verified = False 
 
-        # --- قيم مؤقتة للإعدادات (لاحقًا من config.json) ---
-        self.login_url = "https://cafm.seha.ae/ADH/applogin.aspx" 
-        self.session_check_xpath = "xpath=/html/body/form/div[2]/table/tbody/tr[2]/td/table/tbody/tr/td[1]/table/tbody/tr/td/a" # إضافة xpath=
-        
+        # الإعدادات تُقرأ مرة واحدة وتُحدث تلقائيًا عند تعديل config.json (المراقبة الجارية تأخذ التعديل أيضًا)
+        self.config_manager = ConfigManager(CONFIG_FILE, logger_instance=self.logger)
+        try:
+            self.config_manager.load()
+        except ConfigError as e:
+            self.logger.error(str(e))
+        self.config_manager.subscribe(self._on_config_reloaded)
+        self.config_manager.start_watching()
+
         SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
 
         self.init_ui()
         self._update_button_states() 
 
+    def _app_config(self) -> "dict | None":
+        # None مع رسالة خطأ إذا كان config.json غير صالح
+        try:
+            return self.config_manager.current.raw
+        except ConfigError as e:
+            QMessageBox.critical(self, "خطأ في الإعدادات", str(e))
+            return None
+
+    def _on_config_reloaded(self, config):
+        # من خيط مراقبة الملف: السجل عبر الإشارة، والمراقبة تطبق التعديل داخل حلقتها
+        self.async_bridge.log_signal.emit(f"تم تحميل تعديلات الإعدادات (النسخة {config.version}).")
+        service = self.monitoring_service
+        if service is not None:
+            service.update_config(config.section("monitoring"))
+
+    @property
+    def async_browser_manager(self) -> "AsyncBrowserManager":
+        with self._managers_lock:
+            if self._async_browser_manager is None:
+                from utils.async_browser_manager import AsyncBrowserManager
+                self._async_browser_manager = AsyncBrowserManager(logger_instance=self.logger)
+            return self._async_browser_manager
+
+    def _get_connection_supervisor(self, app_config: dict, for_monitoring: bool = False) -> "AsyncConnectionSupervisor":
+        # في خيط الحلقة؛ السياسة تُقرأ من الإعدادات الحالية في كل عملية. المراقبة تعيد تشغيل
+        # المتصفح حسب monitoring.headless_monitoring وليس browser.headless
+        from utils.browser_manager import ReconnectPolicy, headless_from_config, session_check_options
+        from utils.connection_supervisor import AsyncConnectionSupervisor
+        if self._connection_supervisor is None:
+            self._connection_supervisor = AsyncConnectionSupervisor(
+                self.async_browser_manager, session_file=str(BROWSER_SESSION_FILE), logger_instance=self.logger)
+        supervisor = self._connection_supervisor
+        supervisor.policy = ReconnectPolicy.from_config(app_config)
+        supervisor.session_check = session_check_options(app_config)
+        supervisor.headless = headless_from_config(app_config, for_monitoring=for_monitoring)
+        return supervisor
+
+    def _is_cdp_connected(self) -> bool:
+        # قراءة حالة فقط؛ المدير نفسه يُستخدم من خيط العامل وحده
+        manager = self.browser_worker.manager
+        return manager is not None and manager.is_connected_to_persistent_cdp
+
+    def _connected_cdp_url(self) -> str | None:
+        return self.browser_worker.manager.cdp_url if self._is_cdp_connected() else None
+
+    # --- قياس بدء التشغيل والتجهيز المسبق ---
+    def on_first_paint(self):
+        # يُستدعى من مؤقت بزمن 0 بعد show()، أي بعد أن تعالج Qt أحداث الرسم الأولى
+        imports_ms = (_IMPORTS_DONE_AT - _PROCESS_STARTED_AT) * 1000
+        shown_ms = (time.perf_counter() - _PROCESS_STARTED_AT) * 1000
+        METRICS.record(TimingEvent("gui_imports", imports_ms))
+        METRICS.record(TimingEvent("gui_first_paint", shown_ms))
+        self.log_to_gui(f"ظهرت الواجهة خلال {shown_ms:.0f} ms (منها {imports_ms:.0f} ms استيراد الوحدات).")
+        self.browser_worker.submit("prewarm", prewarm_command, priority=PRIORITY_LOW)
+        self.async_bridge.submit("prewarm", self._prewarm_async())
+
+    async def _prewarm_async(self) -> tuple[bool, str]:
+        # في خيط الحلقة: استيراد وحدات المتصفح ثم تشغيل مشغل Playwright غير المتزامن مسبقًا.
+        # Playwright المتزامن يُجهز بأمر prewarm في خيط BrowserWorker لأنه مرتبط بالخيط الذي يبدأه.
+        started_at = time.perf_counter()
+        for module_name in PREWARM_MODULES:
+            importlib.import_module(module_name)
+        imports_ms = (time.perf_counter() - started_at) * 1000
+        METRICS.record(TimingEvent("prewarm_imports", imports_ms))
+        started_at = time.perf_counter()
+        await self.async_browser_manager.prewarm()
+        driver_ms = (time.perf_counter() - started_at) * 1000
+        return True, f"استيراد وحدات المتصفح {imports_ms:.0f} ms، تشغيل Playwright {driver_ms:.0f} ms."
+
+    def _report_first_action(self, operation_name: str):
+        started_at = self._queued_at.pop(operation_name, None)
+        if self._first_action_reported or started_at is None:
+            return
+        self._first_action_reported = True
+        duration_ms = (time.perf_counter() - started_at) * 1000
+        METRICS.record(TimingEvent("gui_first_action", duration_ms, target=operation_name))
+        self.log_to_gui(f"أول عملية ({operation_name}) استغرقت {duration_ms:.0f} ms.")
+
     def init_ui(self):
         main_layout = QVBoxLayout(self)
         login_actions_group = QGroupBox("خطوات تسجيل الدخول وحفظ الجلسة")
@@ -161,9 +367,28 @@ class MainApplicationWindow(QWidget):
         self.save_session_button.setToolTip("يحفظ الكوكيز وبيانات الجلسة الحالية.")
         self.save_session_button.clicked.connect(self.action_save_session)
         login_actions_layout.addWidget(self.save_session_button)
+
+        self.cancel_button = QPushButton("إلغاء عمليات المتصفح المنتظرة")
+        self.cancel_button.setToolTip("يلغي العمليات في الطابور، والعملية الجارية تتوقف عند أول نقطة آمنة.")
+        self.cancel_button.clicked.connect(self.action_cancel_browser_commands)
+        login_actions_layout.addWidget(self.cancel_button)
         
         main_layout.addWidget(login_actions_group)
 
+        data_entry_group = QGroupBox("إدخال البيانات")
+        data_entry_layout = QVBoxLayout(data_entry_group)
+        self.enter_data_button = QPushButton("4. أدخل بيانات ملف Excel في النموذج")
+        self.enter_data_button.setToolTip("يقرأ الملف المحدد في config.json ويدخل الصفوف بالتوازي عبر عدة صفحات.\n"
+                                          "إذا لم يكن هناك اتصال بالمتصفح، يُطلق متصفح من الجلسة المحفوظة.")
+        self.enter_data_button.clicked.connect(self.action_enter_data)
+        data_entry_layout.addWidget(self.enter_data_button)
+
+        self.monitoring_button = QPushButton("5. ابدأ مراقبة أوامر العمل")
+        self.monitoring_button.setToolTip("ينفذ خطوات الانتقال مرة واحدة ثم يفحص التغييرات كل monitoring.interval ثانية.")
+        self.monitoring_button.clicked.connect(self.action_toggle_monitoring)
+        data_entry_layout.addWidget(self.monitoring_button)
+        main_layout.addWidget(data_entry_group)
+
         self.status_label = QLabel("الحالة: جاهز. يرجى التأكد من تشغيل المتصفح يدويًا أولاً.")
         self.status_label.setAlignment(Qt.AlignCenter)
         font = self.status_label.font()
@@ -173,21 +398,36 @@ class MainApplicationWindow(QWidget):
 
         log_display_group = QGroupBox("سجل العمليات")
         log_display_layout = QVBoxLayout(log_display_group)
-        self.log_area = QTextEdit()
+        self.log_area = QPlainTextEdit()
         self.log_area.setReadOnly(True)
         self.log_area.setFont(QFont("Consolas", 9))
+        self.log_sink = GuiLogSink(self.log_area)
         log_display_layout.addWidget(self.log_area)
+        self.metrics_button = QPushButton("إحصاءات الأداء (p50/p95/p99)")
+        self.metrics_button.setToolTip("زمن كل عملية متصفح منذ بدء التشغيل. الأحداث التفصيلية في logs/events_*.jsonl")
+        self.metrics_button.clicked.connect(self.action_show_metrics)
+        log_display_layout.addWidget(self.metrics_button)
         main_layout.addWidget(log_display_group, 1)
 
         self.setLayout(main_layout)
 
     def _update_button_states(self):
-        is_thread_running = self.active_thread and self.active_thread.isRunning()
-        is_connected = self.browser_manager.is_connected_to_persistent_cdp
+        # الأزرار تضيف أوامر إلى طابور العامل، فتبقى متاحة ما دام الأمر ممكنًا بعد الأوامر المنتظرة
+        worker = self.browser_worker
+        is_connected = self._is_cdp_connected()
+        connect_pending = worker.has_pending("connect_and_navigate")
+        check_pending = worker.has_pending("check_login_status")
         
-        self.connect_button.setEnabled(not is_thread_running and not is_connected)
-        self.check_login_button.setEnabled(not is_thread_running and is_connected)
-        self.save_session_button.setEnabled(not is_thread_running and is_connected and self.login_verified) 
+        self.connect_button.setEnabled(not is_connected and not connect_pending)
+        self.check_login_button.setEnabled((is_connected or connect_pending) and not check_pending)
+        self.save_session_button.setEnabled((self.login_verified or check_pending) and not worker.has_pending("save_session"))
+        self.cancel_button.setEnabled(any(name != "prewarm" for name in worker.pending_names())
+                                      or (worker.current is not None and worker.current.name != "prewarm"))
+        is_entering_data = self.async_bridge.is_running("enter_data")
+        self.enter_data_button.setEnabled(not is_entering_data and (is_connected or BROWSER_SESSION_FILE.is_file()))
+        is_monitoring = self.async_bridge.is_running("monitoring")
+        self.monitoring_button.setText("5. أوقف مراقبة أوامر العمل" if is_monitoring else "5. ابدأ مراقبة أوامر العمل")
+        self.monitoring_button.setEnabled(is_monitoring or is_connected or BROWSER_SESSION_FILE.is_file())
 
     def log_to_gui(self, message: str):
         self.logger.info(f"[FromThreadLOG]: {message}")
@@ -197,86 +437,110 @@ class MainApplicationWindow(QWidget):
             name_from_object = current_thread_obj.objectName()
             if name_from_object: thread_name = name_from_object
             else: thread_name = f"QtThread-{id(current_thread_obj)}"
-        self.log_area.append(f"[{thread_name}] {message}")
-        self.log_area.ensureCursorVisible()
+        self.log_sink.append(f"[{thread_name}] {message}")
 
-    def handle_thread_start(self, operation_name: str):
-        self.log_to_gui(f"بدء عملية: {operation_name}...")
-        self._update_button_states() 
+    def action_show_metrics(self):
+        if self.metrics_dialog is None:
+            self.metrics_dialog = MetricsDialog(self)
+        self.metrics_dialog.show()
+        self.metrics_dialog.raise_()
 
-    def handle_thread_finish(self, operation_name: str, success: bool, message: str):
-        self.log_to_gui(f"انتهاء عملية '{operation_name}': {message} (النجاح: {success})")
-        if self.active_thread:
-            self.active_thread.finished.connect(self.active_thread.deleteLater) 
-            self.active_thread = None
+    def _queue_browser_command(self, name: str, title: str, func, status_text: str):
+        if self.browser_worker.has_pending(name):
+            self.log_to_gui(f"عملية '{title}' في الطابور بالفعل.")
+            return
+        self._queued_at[name] = time.perf_counter()
+        queued_before = [pending for pending in self.browser_worker.pending_names() if pending != "prewarm"]
+        self.browser_worker.submit(name, func, priority=PRIORITY_HIGH)
+        if queued_before or self.browser_worker.current is not None:
+            self.log_to_gui(f"تمت إضافة '{title}' إلى طابور عمليات المتصفح.")
+        self.status_label.setText(status_text)
+        self._update_button_states()
+
+    def on_browser_command_started(self, name: str):
+        if name != "prewarm":
+            self.log_to_gui(f"بدء عملية: {BROWSER_COMMAND_TITLES.get(name, name)}...")
+        self._update_button_states()
+
+    def on_browser_command_finished(self, name: str, success: bool, message: str):
+        title = BROWSER_COMMAND_TITLES.get(name, name)
+        self.log_to_gui(f"انتهاء عملية '{title}': {message} (النجاح: {success})")
+        self._report_first_action(name)
+        handler = {
+            "connect_and_navigate": self.on_connection_status_received,
+            "check_login_status": self.on_login_check_status_received,
+            "save_session": self.on_session_save_status_received,
+        }.get(name)
+        if handler is not None:
+            handler(success, message)
+        self._update_button_states()
+
+    def action_cancel_browser_commands(self):
+        cancelled = self.browser_worker.cancel()
+        self.log_to_gui(f"تم طلب إلغاء {cancelled} عملية متصفح.")
         self._update_button_states()
 
     def action_connect_and_navigate(self):
-        if self.active_thread and self.active_thread.isRunning():
-            QMessageBox.warning(self, "عملية جارية", "هناك عملية اتصال جارية بالفعل."); return
-        self.handle_thread_start("الاتصال والانتقال")
-        self.status_label.setText("الحالة: جاري الاتصال بالمتصفح والانتقال...")
         self.login_verified = False 
-        self.active_thread = BrowserLoginThread("connect_and_navigate", self.browser_manager, self.login_url, logger_instance=self.logger)
-        self.active_thread.log_signal.connect(self.log_to_gui)
-        self.active_thread.connection_status_signal.connect(self.on_connection_status_received)
-        self.active_thread.start()
+        from utils.browser_manager import cdp_options, ReconnectPolicy
+        app_config = self._app_config()
+        if app_config is None:
+            return
+        cdp = cdp_options(app_config)
+        # العامل يعيد الاتصال قبل الأمر التالي إذا أُغلق المتصفح أو أعيد تشغيله
+        self.browser_worker.reconnect_policy = ReconnectPolicy.from_config(app_config)
+        self._queue_browser_command("connect_and_navigate", "الاتصال والانتقال",
+                                    functools.partial(connect_and_navigate_command, login_url=app_config.get("login_url"),
+                                                      cdp_url=cdp["cdp_url"], cdp_timeout=cdp["timeout"]),
+                                    "الحالة: جاري الاتصال بالمتصفح والانتقال...")
 
-    def on_connection_status_received(self, success: bool, message: str, page_ready_for_login: bool):
-        self.handle_thread_finish("الاتصال والانتقال", success, message)
+    def on_connection_status_received(self, success: bool, message: str):
         if success:
-            if page_ready_for_login:
-                self.status_label.setText("الحالة: متصل. يرجى تسجيل الدخول يدويًا ثم الضغط 'تحقق'.")
+            self.status_label.setText("الحالة: متصل. يرجى تسجيل الدخول يدويًا ثم الضغط 'تحقق'.")
+            if not self.browser_worker.has_pending("check_login_status"):
                 QMessageBox.information(self, "نجاح الاتصال", "تم الاتصال بالمتصفح والانتقال لصفحة تسجيل الدخول.\nيرجى تسجيل الدخول يدويًا ثم الضغط '2. تحقق...'.")
-            else:
-                self.status_label.setText(f"الحالة: متصل لكن فشل الانتقال - {message}")
-                QMessageBox.warning(self, "مشكلة في الانتقال", f"تم الاتصال، لكن فشل الانتقال: {message}")
+        elif self._is_cdp_connected():
+            self.status_label.setText(f"الحالة: متصل لكن فشل الانتقال - {message}")
+            QMessageBox.warning(self, "مشكلة في الانتقال", message)
         else:
+            # التحقق والحفظ المنتظران يعتمدان على الاتصال
+            self.browser_worker.cancel("check_login_status")
+            self.browser_worker.cancel("save_session")
             self.status_label.setText(f"الحالة: فشل الاتصال - {message}")
             QMessageBox.critical(self, "فشل الاتصال", message)
-        self._update_button_states()
 
     def action_check_login_status(self):
-        if self.active_thread and self.active_thread.isRunning():
-            QMessageBox.warning(self, "عملية جارية", "هناك عملية أخرى جارية."); return
-        if not self.browser_manager.is_connected_to_persistent_cdp:
+        if not self._is_cdp_connected() and not self.browser_worker.has_pending("connect_and_navigate"):
             QMessageBox.warning(self, "غير متصل", "يجب الاتصال بالمتصفح أولاً."); return
-        self.handle_thread_start("التحقق من تسجيل الدخول")
-        self.status_label.setText("الحالة: جاري التحقق من تسجيل الدخول...")
         self.login_verified = False
-        self.active_thread = BrowserLoginThread("check_login_status", self.browser_manager, session_check_xpath=self.session_check_xpath, logger_instance=self.logger)
-        self.active_thread.log_signal.connect(self.log_to_gui)
-        self.active_thread.login_check_status_signal.connect(self.on_login_check_status_received)
-        self.active_thread.start()
+        from utils.browser_manager import session_check_options
+        app_config = self._app_config()
+        if app_config is None:
+            return
+        session_check = session_check_options(app_config)
+        self._queue_browser_command("check_login_status", "التحقق من تسجيل الدخول",
+                                    functools.partial(check_login_status_command, session_check_xpath=app_config.get("session_check_xpath"),
+                                                      session_check=session_check),
+                                    "الحالة: جاري التحقق من تسجيل الدخول...")
 
     def on_login_check_status_received(self, success: bool, message: str):
-        self.handle_thread_finish("التحقق من تسجيل الدخول", success, message)
         if success:
             self.status_label.setText("الحالة: تم التحقق من تسجيل الدخول. يمكنك الآن حفظ الجلسة.")
-            QMessageBox.information(self, "نجاح التحقق", "تم التحقق من تسجيل الدخول بنجاح.\nيمكنك الآن الضغط '3. احفظ الجلسة...'.")
             self.login_verified = True
+            if not self.browser_worker.has_pending("save_session"):
+                QMessageBox.information(self, "نجاح التحقق", "تم التحقق من تسجيل الدخول بنجاح.\nيمكنك الآن الضغط '3. احفظ الجلسة...'.")
         else:
+            self.browser_worker.cancel("save_session") # لا تُحفظ جلسة لم يُتحقق منها
             self.status_label.setText(f"الحالة: فشل التحقق - {message}")
             QMessageBox.warning(self, "فشل التحقق", message)
             self.login_verified = False
-        self._update_button_states()
 
     def action_save_session(self):
-        if self.active_thread and self.active_thread.isRunning():
-            QMessageBox.warning(self, "عملية جارية", "هناك عملية أخرى جارية."); return
-        if not self.browser_manager.is_connected_to_persistent_cdp:
-            QMessageBox.warning(self, "غير متصل", "يجب الاتصال بالمتصفح أولاً."); return
-        if not self.login_verified:
+        if not self.login_verified and not self.browser_worker.has_pending("check_login_status"):
             QMessageBox.warning(self, "لم يتم التحقق", "يرجى التحقق من تسجيل الدخول أولاً (الخطوة 2)."); return
-        self.handle_thread_start("حفظ الجلسة")
-        self.status_label.setText("الحالة: جاري حفظ الجلسة...")
-        self.active_thread = BrowserLoginThread("save_session", self.browser_manager, logger_instance=self.logger)
-        self.active_thread.log_signal.connect(self.log_to_gui)
-        self.active_thread.session_save_status_signal.connect(self.on_session_save_status_received)
-        self.active_thread.start()
+        self._queue_browser_command("save_session", "حفظ الجلسة", save_session_command, "الحالة: جاري حفظ الجلسة...")
 
     def on_session_save_status_received(self, success: bool, message: str):
-        self.handle_thread_finish("حفظ الجلسة", success, message)
         if success:
             self.status_label.setText(f"الحالة: تم حفظ الجلسة بنجاح في {BROWSER_SESSION_FILE}")
             QMessageBox.information(self, "نجاح الحفظ", message)
@@ -284,11 +548,117 @@ class MainApplicationWindow(QWidget):
         else:
             self.status_label.setText(f"الحالة: فشل حفظ الجلسة - {message}")
             QMessageBox.critical(self, "فشل الحفظ", message)
+
+    def action_enter_data(self):
+        if self.async_bridge.is_running("enter_data"):
+            QMessageBox.warning(self, "عملية جارية", "عملية إدخال البيانات جارية بالفعل."); return
+        if not self._is_cdp_connected() and not BROWSER_SESSION_FILE.is_file():
+            QMessageBox.warning(self, "غير متصل", "يجب الاتصال بالمتصفح أو حفظ جلسة أولاً."); return
+        app_config = self._app_config()
+        if app_config is None:
+            return
+
+        from utils.data_entry import DataEntryEngine
+        cdp_url = self._connected_cdp_url()
+        if cdp_url:
+            engine = DataEntryEngine.from_config(app_config, cdp_url=cdp_url, logger_instance=self.logger)
+        else:
+            # بدون متصفح يدوي: إطلاق متصفح جديد من الجلسة المحفوظة (بدون واجهة حسب browser.headless)
+            self.log_to_gui(f"غير متصل بمتصفح CDP، سيتم استخدام الجلسة المحفوظة: {BROWSER_SESSION_FILE}")
+            engine = DataEntryEngine.from_config(app_config, cdp_url=None, storage_state_file=str(BROWSER_SESSION_FILE),
+                                                 logger_instance=self.logger)
+
+        self.log_to_gui("بدء عملية: إدخال البيانات...")
+        self.status_label.setText("الحالة: جاري إدخال البيانات من ملف Excel...")
+        self._queued_at["enter_data"] = time.perf_counter()
+        self.async_bridge.submit("enter_data", self._enter_data_async(engine, app_config))
+        self._update_button_states()
+
+    async def _enter_data_async(self, engine: "DataEntryEngine", app_config: dict) -> tuple[bool, str]:
+        # يعمل في خيط حلقة asyncio؛ التواصل مع الواجهة عبر إشارات الجسر فقط
+        log = self.async_bridge.log_signal.emit
+        summary = await engine.run_async(
+            app_config.get("excel_file", ""), app_config.get("sheet_name", "Sheet1"),
+            progress_callback=lambda r: log(
+                f"الصف {r.row_number}: {r.status} ({r.duration_ms:.0f} ms، الإرسال {r.submit_ms:.0f} ms، محاولات: {r.attempts}) {r.error}"),
+            browser_manager=self.async_browser_manager,
+            supervisor=self._get_connection_supervisor(app_config),
+        )
+        msg = (f"اكتمل الإدخال: {summary.succeeded} ناجح، {summary.failed} فاشل، {summary.in_doubt} غير مؤكد "
+               f"من {summary.total} (تم تخطي {summary.skipped} صف منجز سابقًا) خلال {summary.elapsed_s:.1f} ث "
+               f"(زمن الإرسال p50 {summary.submit_p50_ms:.0f} ms، p95 {summary.submit_p95_ms:.0f} ms). "
+               f"ورقة النتائج: {summary.results_file}")
+        return summary.failed == 0 and summary.in_doubt == 0, msg
+
+    def action_toggle_monitoring(self):
+        if self.async_bridge.is_running("monitoring"):
+            if self.monitoring_service:
+                self.log_to_gui("جاري إيقاف المراقبة...")
+                self.monitoring_service.request_stop()
+            return
+        app_config = self._app_config()
+        if app_config is None:
+            return
+
+        from utils.monitoring_service import MonitoringService
+        from utils.network_profile import NetworkProfile
+        from utils.notifications import NotificationDispatcher
+        log = self.async_bridge.log_signal.emit
+        if self.async_browser_manager.network_profile is None:
+            self.async_browser_manager.network_profile = NetworkProfile.from_config(app_config, logger_instance=self.logger)
+        self.monitoring_service = MonitoringService(
+            self.async_browser_manager, app_config.get("monitoring", {}),
+            on_new_rows=lambda rows: log(f"المراقبة: {len(rows)} أمر عمل جديد: {rows[:5]}"),
+            on_updated_rows=lambda rows: log(f"المراقبة: {len(rows)} أمر عمل تغيرت بياناته."),
+            supervisor=self._get_connection_supervisor(app_config, for_monitoring=True),
+            notifier=NotificationDispatcher.from_config(app_config, logger_instance=self.logger),
+            logger_instance=self.logger,
+        )
+        self.log_to_gui("بدء عملية: المراقبة...")
+        self.status_label.setText("الحالة: المراقبة تعمل...")
+        self.async_bridge.submit("monitoring", self._monitoring_async(self.monitoring_service, app_config))
+        self._update_button_states()
+
+    async def _monitoring_async(self, service: "MonitoringService", app_config: dict) -> tuple[bool, str]:
+        from utils.browser_manager import headless_from_config
+        manager = self.async_browser_manager
+        if not manager.is_ready:
+            cdp_url = self._connected_cdp_url()
+            if cdp_url:
+                ready = await manager.connect_to_existing_cdp_browser(cdp_url, self.browser_worker.manager.cdp_timeout)
+            else:
+                ready = await manager.launch_new_browser_with_session(
+                    str(BROWSER_SESSION_FILE), headless=headless_from_config(app_config, for_monitoring=True))
+            if not ready:
+                return False, "تعذر تجهيز المتصفح للمراقبة."
+        service.supervisor.start()
+        await service.run_forever()
+        return True, "تم إيقاف المراقبة."
+
+    def on_async_operation_finished(self, operation: str, success: bool, message: str):
+        self.log_to_gui(f"انتهاء عملية '{operation}': {message} (النجاح: {success})")
+        self.async_bridge.running_operations.pop(operation, None)
+        if operation == "prewarm":
+            return # عملية خلفية لا تغير حالة الأزرار
+        if operation == "enter_data":
+            self._report_first_action(operation)
+            if success:
+                self.status_label.setText("الحالة: اكتمل إدخال البيانات بنجاح.")
+                QMessageBox.information(self, "اكتمل الإدخال", message)
+            else:
+                self.status_label.setText(f"الحالة: انتهى الإدخال مع أخطاء - {message}")
+                QMessageBox.warning(self, "انتهى الإدخال مع أخطاء", message)
+        elif operation == "monitoring":
+            self.monitoring_service = None
+            self.status_label.setText(f"الحالة: {message}")
         self._update_button_states()
 
     def closeEvent(self, event):
         self.logger.info("التعامل مع حدث إغلاق النافذة...")
-        if self.active_thread and self.active_thread.isRunning():
+        async_running = any(not f.done() for name, f in self.async_bridge.running_operations.items() if name != "prewarm")
+        browser_busy = any(name != "prewarm" for name in self.browser_worker.pending_names()) or \
+                       (self.browser_worker.current is not None and self.browser_worker.current.name != "prewarm")
+        if browser_busy or async_running:
             self.logger.warning("محاولة إغلاق الواجهة بينما لا يزال هناك خيط يعمل.")
             reply = QMessageBox.question(self, "تأكيد الإغلاق", 
                                          "هناك عملية متصفح جارية. هل أنت متأكد أنك تريد الإغلاق؟\n(قد يؤدي هذا إلى إنهاء العملية بشكل غير متوقع)",
@@ -299,11 +669,23 @@ class MainApplicationWindow(QWidget):
                  self.logger.info("وافق المستخدم على الإغلاق أثناء عمل الخيط.")
                  # لا يوجد إيقاف قسري للخيط، لكننا سنقوم بتنظيف اتصال المتصفح
         
-        if self.browser_manager.is_connected_to_persistent_cdp:
-            self.logger.info("إغلاق اتصال Playwright بالمتصفح الدائم عند إغلاق الواجهة...")
-            self.browser_manager.close_connection_to_persistent_browser()
+        self.config_manager.stop_watching()
+        # العامل يلغي أوامره المنتظرة ويغلق اتصال Playwright بالمتصفح في خيطه (المتصفح الدائم يبقى مفتوحًا)
+        self.browser_worker.stop()
+        if self.async_loop.is_running():
+            for future in self.async_bridge.running_operations.values():
+                future.cancel() # يلغي المهمة داخل الحلقة، وسجل التقدم يُغلق في finally
+            try:
+                if self._connection_supervisor is not None:
+                    self.async_loop.run(self._connection_supervisor.stop(), timeout=5)
+                if self._async_browser_manager is not None:
+                    self.async_loop.run(self._async_browser_manager.close(), timeout=10)
+            except Exception as e:
+                self.logger.warning(f"خطأ أثناء إغلاق مدير المتصفح غير المتزامن: {e}")
+            self.async_loop.stop()
         
         self.logger.info("تم إغلاق واجهة مدير تسجيل الدخول.")
+        self.log_sink.flush()
         super().closeEvent(event)
 
 if __name__ == "__main__":
@@ -313,4 +695,7 @@ if __name__ == "__main__":
     SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
     window = MainApplicationWindow()
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    QTimer.singleShot(0, window.on_first_paint)
+    exit_code = app.exec()
+    stop_logging()
+    sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,321 @@
+# benchmarks/bench_browser.py
+# قياس أداء عمليات المتصفح مقابل الخادم الوهمي المحلي (mock_cafm_server) بدون أي شبكة خارجية:
+#   connect / navigate / check_element / session_health / login_and_save / session_restore / scrape / bulk_submit
+#   (bulk_submit_no_pipeline للمقارنة بدون الملء المسبق للصف التالي)
+# النتائج تُكتب JSON في benchmarks/output ويمكن مقارنتها بنتيجة سابقة (--baseline) لاكتشاف التراجع.
+# مثال: python benchmarks/bench_browser.py --rows 1000 --submit-rows 200 --latency-ms 50 --baseline output/base.json
+import argparse
+import asyncio
+import json
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_cafm_server import MockCafmServer  # noqa: E402
+from utils.async_browser_manager import AsyncBrowserManager  # noqa: E402
+from utils.browser_manager import BrowserManager  # noqa: E402
+from utils.data_entry import DataEntryEngine  # noqa: E402
+from utils.metrics import METRICS  # noqa: E402
+from utils.monitoring_service import MonitoringService  # noqa: E402
+from utils.network_profile import NetworkProfile  # noqa: E402
+from utils.progress_journal import ProgressJournal  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent / "output"
+SESSION_CHECK_XPATH = "xpath=/html/body/form/div[2]/table/tbody/tr[2]/td/table/tbody/tr/td[1]/table/tbody/tr/td/a"
+FORM_FIELDS = {
+    "WorkOrderNo": "#txtWorkOrderNo",
+    "Site": "#txtSite",
+    "Description": "#txtDescription",
+}
+
+
+def _stats(samples_ms: list[float]) -> dict:
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {}
+    percentile = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {
+        "n": len(ordered),
+        "min_ms": round(ordered[0], 2),
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(percentile(0.95), 2),
+        "max_ms": round(ordered[-1], 2),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+    }
+
+
+def _measure(func, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started_at) * 1000)
+    return samples
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class CdpChromium:
+    # يحاكي المتصفح الذي يشغله المستخدم يدويًا مع --remote-debugging-port، لكن بدون واجهة
+    def __init__(self):
+        self.port = _free_port()
+        self.user_data_dir = tempfile.mkdtemp(prefix="bench_cdp_profile_")
+        self.process: subprocess.Popen | None = None
+
+    @property
+    def cdp_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "CdpChromium":
+        from playwright.sync_api import sync_playwright
+
+        with sync_playwright() as playwright:
+            executable = playwright.chromium.executable_path
+        self.process = subprocess.Popen(
+            [executable, "--headless=new", f"--remote-debugging-port={self.port}", f"--user-data-dir={self.user_data_dir}",
+             "--no-first-run", "--no-default-browser-check", "about:blank"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            try:
+                urllib.request.urlopen(f"{self.cdp_url}/json/version", timeout=1).read()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError("تعذر تشغيل Chromium مع منفذ CDP.")
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+# --- سيناريوهات المتصفح المتزامن (BrowserManager) ---
+def run_sync_scenarios(server: MockCafmServer, cdp_url: str, session_file: Path, repeat: int,
+                       network_profile: NetworkProfile | None) -> dict:
+    results = {}
+
+    def connect_once():
+        manager = BrowserManager()
+        assert manager.connect_to_existing_cdp_browser(cdp_url)
+        manager.close_connection_to_persistent_browser()
+    results["connect"] = _stats(_measure(connect_once, repeat))
+
+    manager = BrowserManager()
+    assert manager.connect_to_existing_cdp_browser(cdp_url)
+    try:
+        login_url = server.url("/ADH/applogin.aspx")
+        results["navigate"] = _stats(_measure(lambda: manager.navigate_to_url(login_url), repeat))
+
+        def login_and_save():
+            manager.navigate_to_url(login_url)
+            page = manager.get_current_page()
+            page.fill("#txtUserName", "bench")
+            page.fill("#txtPassword", "bench")
+            with page.expect_navigation(wait_until="domcontentloaded"):
+                page.click("#btnLogin")
+            assert manager.save_current_session_state(str(session_file))
+        results["login_and_save"] = _stats(_measure(login_and_save, 1))
+
+        manager.navigate_to_url(server.url("/ADH/apptop.aspx"))
+        results["check_element"] = _stats(_measure(lambda: manager.check_element_exists(SESSION_CHECK_XPATH), repeat))
+        probe_url = server.url("/ADH/apptop.aspx")
+        results["session_health"] = _stats(_measure(
+            lambda: manager.check_session_health(probe_url=probe_url, dom_selector=SESSION_CHECK_XPATH), repeat))
+    finally:
+        manager.close_connection_to_persistent_browser()
+
+    def restore_once():
+        launched = BrowserManager(network_profile=network_profile)
+        assert launched.launch_new_browser_with_session(str(session_file), headless=True)
+        assert launched.navigate_to_url(server.url("/ADH/apptop.aspx"))
+        launched.close_launched_browser()
+    results["session_restore"] = _stats(_measure(restore_once, max(1, repeat // 2)))
+    return results
+
+
+# --- سيناريوهات المتصفح غير المتزامن (المراقبة والإدخال) ---
+async def run_scrape(server: MockCafmServer, session_file: Path, repeat: int, work_dir: Path,
+                     network_profile: NetworkProfile | None) -> dict:
+    manager = AsyncBrowserManager(network_profile=network_profile)
+    assert await manager.launch_new_browser_with_session(str(session_file), headless=True)
+    service = MonitoringService(manager, {
+        "monitoring_page_url": server.url("/ADH/WorkOrders.aspx"),
+        "table_selector": "#gvWorkOrders",
+        "row_id_field": "work_order",
+        "data_extraction_rules": [
+            {"name": "work_order", "column": 0},
+            {"name": "site", "column": 1},
+            {"name": "status", "column": 2},
+        ],
+        "seen_data_ids_file": str(work_dir / "seen_ids.db"),
+    })
+    try:
+        service.seen_ids.open()
+        started_at = time.perf_counter()
+        first = await service.poll_once()
+        first_ms = (time.perf_counter() - started_at) * 1000
+        unchanged = []
+        changed = []
+        for index in range(repeat):
+            if index % 2:
+                server.state.work_order_version += 1 # يغير حالة خُمس الصفوف
+            started_at = time.perf_counter()
+            result = await service.poll_once()
+            (changed if result.changed else unchanged).append((time.perf_counter() - started_at) * 1000)
+        return {
+            "first_poll_ms": round(first_ms, 2),
+            "first_poll_rows": first.total_rows,
+            "unchanged_poll": _stats(unchanged),
+            "changed_poll": _stats(changed),
+            "network": network_profile.totals.summary() if network_profile else None,
+        }
+    finally:
+        service.seen_ids.close()
+        await manager.close()
+
+
+def generate_submit_workbook(file_path: Path, rows: int):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(list(FORM_FIELDS))
+    for index in range(rows):
+        sheet.append([f"WO-{index:07d}", f"Site {index % 37}", f"Bench row {index}"])
+    workbook.save(str(file_path))
+
+
+def run_bulk_submit(server: MockCafmServer, session_file: Path, rows: int, concurrency: int, work_dir: Path,
+                    network_profile: NetworkProfile | None, pipeline: bool = True) -> dict:
+    excel_file = work_dir / "bench_submit.xlsx"
+    generate_submit_workbook(excel_file, rows)
+    engine = DataEntryEngine(
+        data_entry_url=server.url("/ADH/DataEntry.aspx"),
+        field_selectors=FORM_FIELDS,
+        submit_selector="#btnSave",
+        cdp_url=None,
+        storage_state_file=str(session_file),
+        headless=True,
+        concurrency=concurrency,
+        max_retries=0,
+        resume=False,
+        network_profile=network_profile,
+        success_marker='id="lblMessage"',
+        error_marker='id="lblError"',
+        pipeline=pipeline,
+    )
+    submissions_before = len(server.state.submissions)
+    try:
+        summary = engine.run(str(excel_file), "Sheet1", results_file=str(work_dir / "bench_submit_results.xlsx"))
+    finally:
+        ProgressJournal.for_workbook(str(excel_file), "Sheet1").discard()
+    return {
+        "rows": rows,
+        "concurrency": concurrency,
+        "succeeded": summary.succeeded,
+        "failed": summary.failed,
+        "server_received": len(server.state.submissions) - submissions_before,
+        "elapsed_s": round(summary.elapsed_s, 2),
+        "rows_per_s": round(summary.succeeded / summary.elapsed_s, 2) if summary.elapsed_s else None,
+        "submit_p50_ms": round(summary.submit_p50_ms, 1),
+        "submit_p95_ms": round(summary.submit_p95_ms, 1),
+    }
+
+
+def compare_with_baseline(results: dict, baseline_file: Path):
+    baseline = json.loads(baseline_file.read_text(encoding="utf-8"))
+    print(f"\nمقارنة مع {baseline_file}:")
+
+    def walk(current, previous, prefix=""):
+        for key, value in current.items():
+            old = previous.get(key) if isinstance(previous, dict) else None
+            name = f"{prefix}{key}"
+            if isinstance(value, dict):
+                walk(value, old or {}, name + ".")
+            elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old and \
+                    (key.endswith("_ms") or key.endswith("_s") or key == "rows_per_s"):
+                change = (value - old) / old * 100
+                print(f"  {name:<45} {old:>10} -> {value:>10}  ({change:+.1f}%)")
+
+    walk(results["scenarios"], baseline.get("scenarios", {}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء عمليات المتصفح مقابل خادم CAFM وهمي")
+    parser.add_argument("--rows", type=int, default=500, help="عدد صفوف جدول أوامر العمل")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="تأخير كل صفحة في الخادم الوهمي")
+    parser.add_argument("--asset-latency-ms", type=float, default=0.0, help="تأخير كل ملف ثابت")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--submit-rows", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--no-network-profile", action="store_true", help="تحميل كل الموارد (للمقارنة)")
+    parser.add_argument("--scenarios", default="scrape,bulk_submit,bulk_submit_no_pipeline",
+                        help="سيناريوهات إضافية؛ سيناريوهات BrowserManager تعمل دائمًا لأنها تنشئ ملف الجلسة")
+    parser.add_argument("--baseline", type=Path, help="ملف نتائج سابق للمقارنة")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    scenarios = set(args.scenarios.split(","))
+    network_profile = None if args.no_network_profile else NetworkProfile()
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_browser_", dir=BENCH_DIR))
+    session_file = work_dir / "session.json"
+    results: dict = {
+        "settings": {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()},
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "scenarios": {},
+    }
+
+    server = MockCafmServer(rows=args.rows, latency_ms=args.latency_ms, asset_latency_ms=args.asset_latency_ms).start()
+    chromium = CdpChromium()
+    try:
+        chromium.start()
+        # تسجيل الدخول وحفظ الجلسة ضروريان لباقي السيناريوهات
+        results["scenarios"].update(run_sync_scenarios(server, chromium.cdp_url, session_file, args.repeat, network_profile))
+        if "scrape" in scenarios:
+            results["scenarios"]["scrape"] = asyncio.run(
+                run_scrape(server, session_file, args.repeat, work_dir, network_profile))
+        if "bulk_submit" in scenarios:
+            results["scenarios"]["bulk_submit"] = run_bulk_submit(
+                server, session_file, args.submit_rows, args.concurrency, work_dir, network_profile)
+        if "bulk_submit_no_pipeline" in scenarios:
+            # للمقارنة: صفحة واحدة لكل عامل، بدون ملء الصف التالي أثناء انتظار الإرسال
+            results["scenarios"]["bulk_submit_no_pipeline"] = run_bulk_submit(
+                server, session_file, args.submit_rows, args.concurrency, work_dir, network_profile, pipeline=False)
+    finally:
+        chromium.stop()
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results["server_requests"] = server.state.requests
+    results["operations"] = METRICS.snapshot()
+    output = args.output or BENCH_DIR / f"bench_browser_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps(results["scenarios"], ensure_ascii=False, indent=2))
+    print(f"\nالنتائج في: {output}")
+    if args.baseline:
+        compare_with_baseline(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
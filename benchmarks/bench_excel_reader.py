@@ -0,0 +1,114 @@
+# benchmarks/bench_excel_reader.py
+# قياس أداء القارئ التدفقي ExcelRowReader على ملف مولَّد بعدد كبير من الصفوف.
+# مثال: python benchmarks/bench_excel_reader.py --rows 500000 --columns 40
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.excel_reader import ExcelRowReader  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent / "output"
+
+
+def generate_workbook(file_path: Path, rows: int, columns: int):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append([f"Column{index}" for index in range(1, columns + 1)])
+    for row_index in range(rows):
+        sheet.append([f"WO-{row_index:07d}" if index == 0 else row_index * index for index in range(columns)])
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    workbook.save(str(file_path))
+
+
+def _peak_memory_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # ويندوز
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS يعيد القيمة بالبايت، لينكس بالكيلوبايت
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure_streaming(file_path: str, columns: list[str], result_queue):
+    started_at = time.perf_counter()
+    first_row_s = None
+    count = 0
+    for _ in ExcelRowReader(file_path, "Sheet1", columns=columns):
+        if first_row_s is None:
+            first_row_s = time.perf_counter() - started_at
+        count += 1
+    result_queue.put({
+        "method": "ExcelRowReader (read_only, projected)",
+        "rows": count,
+        "first_row_s": round(first_row_s or 0.0, 3),
+        "total_s": round(time.perf_counter() - started_at, 2),
+        "peak_rss_mb": _peak_memory_mb(),
+    })
+
+
+def _measure_full_load(file_path: str, columns: list[str], result_queue):
+    from openpyxl import load_workbook
+
+    started_at = time.perf_counter()
+    workbook = load_workbook(file_path, data_only=True)
+    rows = list(workbook["Sheet1"].iter_rows(values_only=True))
+    first_row_s = time.perf_counter() - started_at
+    result_queue.put({
+        "method": "openpyxl load_workbook (full)",
+        "rows": len(rows) - 1,
+        "first_row_s": round(first_row_s, 3),
+        "total_s": round(time.perf_counter() - started_at, 2),
+        "peak_rss_mb": _peak_memory_mb(),
+    })
+
+
+def _run_isolated(target, file_path: Path, columns: list[str]) -> dict:
+    # كل طريقة تعمل في عملية مستقلة حتى لا تتأثر قراءة الذاكرة القصوى بالطريقة الأخرى
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=target, args=(str(file_path), columns, result_queue))
+    process.start()
+    result = result_queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء قارئ Excel التدفقي")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--columns", type=int, default=40)
+    parser.add_argument("--selected", type=int, default=5, help="عدد الأعمدة المطلوبة (مثل form.fields)")
+    parser.add_argument("--compare-full-load", action="store_true", help="مقارنة مع التحميل الكامل (يستهلك ذاكرة كبيرة)")
+    parser.add_argument("--keep-file", action="store_true")
+    args = parser.parse_args()
+
+    file_path = BENCH_DIR / f"bench_{args.rows}x{args.columns}.xlsx"
+    if not file_path.exists():
+        print(f"توليد ملف الاختبار {file_path} ...")
+        started_at = time.perf_counter()
+        generate_workbook(file_path, args.rows, args.columns)
+        print(f"تم التوليد خلال {time.perf_counter() - started_at:.1f} ث")
+
+    # أعمدة موزعة على عرض الورقة لمحاكاة خريطة form.fields
+    step = max(1, args.columns // args.selected)
+    columns = [f"Column{index}" for index in range(1, args.columns + 1, step)][:args.selected]
+
+    results = [_run_isolated(_measure_streaming, file_path, columns)]
+    if args.compare_full_load:
+        results.append(_run_isolated(_measure_full_load, file_path, columns))
+
+    print(json.dumps({"rows": args.rows, "columns": args.columns, "selected_columns": columns, "results": results},
+                     ensure_ascii=False, indent=2))
+    if not args.keep_file:
+        file_path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_notifications.py
+# قياس مرسل التنبيهات على خادم Telegram وهمي: دورة مراقبة تجد عددًا كبيرًا من أوامر العمل الجديدة
+# يجب ألا تتأخر بسبب الإرسال (زمن submit)، والتنبيهات تُجمع في رسائل قليلة وتُعاد عند 429/500،
+# ودورة ثانية بنفس المعرفات لا ترسل شيئًا.
+# مثال: python benchmarks/bench_notifications.py --orders 300 --rate-limit-every 3 --latency-ms 150
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_telegram_server import FakeTelegramServer  # noqa: E402
+from utils.notifications import NotificationDispatcher, TelegramSender  # noqa: E402
+from utils.seen_ids_store import SeenIdStore  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent / "output"
+
+
+def _orders(count: int, offset: int = 0) -> list[dict]:
+    return [{"work_order_id": f"WO-{index:07d}", "site": f"Site {index % 37}", "status": "Open"}
+            for index in range(offset, offset + count)]
+
+
+async def run(server: FakeTelegramServer, orders: int, window: float, db_file: Path) -> dict:
+    db_file.unlink(missing_ok=True)
+    dispatcher = NotificationDispatcher(
+        TelegramSender("123:TEST", "42", server.api_url, timeout=5.0),
+        notified_store=SeenIdStore(db_file, table="notified_ids"),
+        digest_window=window, retry_initial_delay=0.2, retry_max_delay=2.0,
+    )
+    dispatcher.start()
+    rows = _orders(orders)
+
+    # ما تدفعه دورة المراقبة: إضافة التنبيهات للطابور فقط
+    started_at = time.perf_counter()
+    dispatcher.submit_rows(rows, id_field="work_order_id", source="bench")
+    submit_ms = (time.perf_counter() - started_at) * 1000
+
+    # حلقة المراقبة تبقى حرة أثناء الإرسال: أقصى تأخير لمؤقت 10 ms
+    max_lag_ms = 0.0
+    while dispatcher.stats.alerts_sent + dispatcher.stats.messages_failed == 0 and \
+            time.perf_counter() - started_at < 60:
+        tick = time.perf_counter()
+        await asyncio.sleep(0.01)
+        max_lag_ms = max(max_lag_ms, (time.perf_counter() - tick) * 1000 - 10)
+    delivered_at = time.perf_counter() - started_at
+
+    # نفس الأوامر في الدورة التالية (مثل إعادة تشغيل البرنامج): لا رسائل جديدة
+    messages_before = len(server.state.messages)
+    dispatcher.submit_rows(rows, id_field="work_order_id", source="bench")
+    await dispatcher.stop(flush_timeout=window + 10)
+    return {
+        "orders": orders,
+        "submit_ms": round(submit_ms, 3),
+        "event_loop_max_lag_ms": round(max_lag_ms, 2),
+        "delivered_s": round(delivered_at, 2),
+        "messages_sent": messages_before,
+        "requests": server.state.requests,
+        "rate_limited": server.state.rate_limited,
+        "retries": dispatcher.stats.retries,
+        "duplicates_suppressed": dispatcher.stats.deduplicated,
+        "messages_after_repeat": len(server.state.messages) - messages_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس مرسل التنبيهات على خادم Telegram وهمي")
+    parser.add_argument("--orders", type=int, default=300)
+    parser.add_argument("--window", type=float, default=1.0, help="نافذة التجميع بالثواني")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--rate-limit-every", type=int, default=3)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--fail-first", type=int, default=1)
+    args = parser.parse_args()
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    db_file = BENCH_DIR / "bench_notifications.db"
+    with FakeTelegramServer(latency_ms=args.latency_ms, rate_limit_every=args.rate_limit_every,
+                            retry_after=args.retry_after, fail_first=args.fail_first) as server:
+        result = asyncio.run(run(server, args.orders, args.window, db_file))
+        # المقارنة: رسالة لكل أمر عمل
+        result["messages_without_digest"] = args.orders
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    for leftover in BENCH_DIR.glob("bench_notifications.db*"):
+        leftover.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
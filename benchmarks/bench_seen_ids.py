@@ -0,0 +1,109 @@
+# benchmarks/bench_seen_ids.py
+# مقارنة مخزن المعرفات SeenIdStore (SQLite) مع طريقة ملف JSON (قراءة + مجموعة + إعادة كتابة كل دورة).
+# مثال: python benchmarks/bench_seen_ids.py --ids 5000000 --batch 300
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.seen_ids_store import SeenIdStore  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent / "output"
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def bench_sqlite(ids: list[str], batch: list[str], db_file: Path) -> dict:
+    db_file.unlink(missing_ok=True)
+    store = SeenIdStore(db_file).open()
+    started_at = time.perf_counter()
+    for start in range(0, len(ids), 100_000):
+        store.add_many(ids[start:start + 100_000], seen_at=0.0)
+    populate_s = time.perf_counter() - started_at
+    store.close()
+
+    # زمن الفتح: ما يدفعه البرنامج عند كل تشغيل
+    started_at = time.perf_counter()
+    store = SeenIdStore(db_file).open()
+    open_s = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    for item_id in batch:
+        _ = item_id in store
+    single_s = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    store.contains_many(batch)
+    batch_check_s = time.perf_counter() - started_at
+
+    fresh = [f"NEW-{index}" for index in range(len(batch))]
+    started_at = time.perf_counter()
+    store.add_many(fresh)
+    add_s = time.perf_counter() - started_at
+    store.close()
+    return {
+        "method": "SeenIdStore (SQLite, WITHOUT ROWID)",
+        "populate_s": round(populate_s, 2),
+        "open_ms": _ms(open_s),
+        "single_lookup_us": round(single_s / len(batch) * 1e6, 2),
+        "batch_check_ms": _ms(batch_check_s),
+        "add_batch_ms": _ms(add_s),
+        "file_mb": round(db_file.stat().st_size / (1024 * 1024), 1),
+    }
+
+
+def bench_json(ids: list[str], batch: list[str], json_file: Path) -> dict:
+    json_file.write_text(json.dumps(ids), encoding="utf-8")
+
+    # الطريقة القديمة: كل دورة مراقبة تقرأ الملف وتبني مجموعة ثم تعيد كتابته
+    started_at = time.perf_counter()
+    seen = set(json.loads(json_file.read_text(encoding="utf-8")))
+    open_s = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    for item_id in batch:
+        _ = item_id in seen
+    single_s = time.perf_counter() - started_at
+
+    seen.update(f"NEW-{index}" for index in range(len(batch)))
+    started_at = time.perf_counter()
+    json_file.write_text(json.dumps(sorted(seen)), encoding="utf-8")
+    save_s = time.perf_counter() - started_at
+    return {
+        "method": "JSON list + set",
+        "open_ms": _ms(open_s),
+        "single_lookup_us": round(single_s / len(batch) * 1e6, 2),
+        "add_batch_ms": _ms(save_s),
+        "file_mb": round(json_file.stat().st_size / (1024 * 1024), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء مخزن المعرفات مقارنة بملف JSON")
+    parser.add_argument("--ids", type=int, default=5_000_000)
+    parser.add_argument("--batch", type=int, default=300, help="عدد الصفوف المفحوصة في دورة مراقبة واحدة")
+    parser.add_argument("--skip-json", action="store_true")
+    args = parser.parse_args()
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    ids = [f"WO-{index:09d}" for index in range(args.ids)]
+    rng = random.Random(42)
+    batch = rng.sample(ids, min(args.batch // 2, len(ids))) + [f"MISSING-{index}" for index in range(args.batch // 2)]
+
+    results = [bench_sqlite(ids, batch, BENCH_DIR / "bench_seen_ids.db")]
+    if not args.skip_json:
+        results.append(bench_json(ids, batch, BENCH_DIR / "bench_seen_ids.json"))
+    print(json.dumps({"ids": args.ids, "batch": args.batch, "results": results}, ensure_ascii=False, indent=2))
+
+    for leftover in BENCH_DIR.glob("bench_seen_ids.*"):
+        leftover.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/bench_table_extraction.py
+# مقارنة سرعة استخراج جدول أوامر العمل (صف/ثانية) على الخادم الوهمي:
+#   locator       الطريقة القديمة: locator لكل خلية (رحلة CDP لكل قراءة)، تُقاس على عينة من الصفوف
+#   bulk          TableExtractor: استدعاء evaluate واحد لكل الجدول
+#   bulk_paged    نفس الاستدعاء على جدول مقسم لصفحات (GridView) يُقرأ بطلبات postback من داخل الصفحة
+# مثال: python benchmarks/bench_table_extraction.py --rows 5000 --page-size 500 --locator-rows 200
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_cafm_server import MockCafmServer  # noqa: E402
+from utils.table_extractor import TableExtractor  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent / "output"
+
+RULES = [
+    {"name": "work_order", "column": 0},
+    {"name": "site", "column": 1},
+    {"name": "status", "column": 2},
+    {"name": "date", "column": 3},
+    {"name": "description", "column": 4},
+]
+
+
+async def _login(page, server: MockCafmServer):
+    await page.goto(server.url("/ADH/applogin.aspx"), wait_until="domcontentloaded")
+    await page.fill("#txtUserName", "bench")
+    await page.fill("#txtPassword", "bench")
+    async with page.expect_navigation(wait_until="domcontentloaded"):
+        await page.click("#btnLogin")
+
+
+async def _open_table(page, server: MockCafmServer):
+    await page.goto(server.url("/ADH/WorkOrders.aspx"), wait_until="domcontentloaded")
+
+
+async def bench_locator(page, server: MockCafmServer, sample_rows: int) -> dict:
+    await _open_table(page, server)
+    rows = page.locator("#gvWorkOrders tr:has(td)")
+    total = await rows.count()
+    sample = min(sample_rows, total)
+    started_at = time.perf_counter()
+    records = []
+    for index in range(sample):
+        cells = rows.nth(index).locator("td")
+        records.append({rule["name"]: (await cells.nth(rule["column"]).inner_text()).strip() for rule in RULES})
+    elapsed = time.perf_counter() - started_at
+    return {
+        "rows_measured": sample,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(sample / elapsed, 1) if elapsed else None,
+        "estimated_full_table_s": round(elapsed / sample * total, 1) if sample else None,
+    }
+
+
+async def bench_bulk(page, server: MockCafmServer, repeat: int, expected_rows: int) -> dict:
+    extractor = TableExtractor("#gvWorkOrders", RULES, id_field="work_order", pager={"enabled": True})
+    samples = []
+    data = None
+    for _ in range(repeat):
+        await _open_table(page, server)
+        started_at = time.perf_counter()
+        data = await extractor.extract(page)
+        samples.append(time.perf_counter() - started_at)
+    assert data.row_count == expected_rows, f"{data.row_count} != {expected_rows} ({data.error})"
+    assert len(set(data.ids)) == expected_rows
+    best = min(samples)
+    return {
+        "rows": data.row_count,
+        "pages": data.pages,
+        "best_s": round(best, 3),
+        "mean_s": round(sum(samples) / len(samples), 3),
+        "rows_per_s": round(data.row_count / best, 1),
+    }
+
+
+async def run(args) -> dict:
+    from playwright.async_api import async_playwright
+
+    results = {}
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        try:
+            for name, page_size in (("single_page", 0), ("paged", args.page_size)):
+                with MockCafmServer(rows=args.rows, latency_ms=args.latency_ms, page_size=page_size) as server:
+                    context = await browser.new_context()
+                    page = await context.new_page()
+                    await _login(page, server)
+                    scenario = {"bulk": await bench_bulk(page, server, args.repeat, args.rows)}
+                    if page_size == 0:
+                        scenario["locator"] = await bench_locator(page, server, args.locator_rows)
+                        scenario["speedup"] = round(scenario["bulk"]["rows_per_s"] / scenario["locator"]["rows_per_s"], 1)
+                    scenario["server_requests"] = server.state.requests
+                    results[name] = scenario
+                    await context.close()
+        finally:
+            await browser.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس استخراج الجدول: evaluate واحد مقابل locator لكل خلية")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=500, help="حجم صفحة الجدول في سيناريو الترقيم")
+    parser.add_argument("--locator-rows", type=int, default=200, help="عدد الصفوف المقاسة بطريقة locator")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="تأخير كل صفحة في الخادم الوهمي")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = {
+        "settings": {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()},
+        "scenarios": asyncio.run(run(args)),
+    }
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    output = args.output or BENCH_DIR / f"bench_table_extraction_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps(results["scenarios"], ensure_ascii=False, indent=2))
+    print(f"\nالنتائج في: {output}")
+
+
+if __name__ == "__main__":
+    main()
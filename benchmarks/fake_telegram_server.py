@@ -0,0 +1,119 @@
+# benchmarks/fake_telegram_server.py
+# خادم HTTP محلي يحاكي واجهة Telegram Bot (sendMessage فقط) لاختبار مرسل التنبيهات بدون شبكة:
+#   POST /bot<token>/sendMessage   يحفظ الرسالة ويعيد {"ok": true, ...}
+# يمكن محاكاة حد المعدل (429 مع retry_after كل N رسالة) وأخطاء الخادم (500 لأول N طلب) والتأخير.
+# مثال: python benchmarks/fake_telegram_server.py --port 8766 --rate-limit-every 5
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTelegramState:
+    def __init__(self, latency_ms: float = 0.0, rate_limit_every: int = 0, retry_after: float = 1.0,
+                 fail_first: int = 0):
+        self.latency_ms = latency_ms
+        self.rate_limit_every = rate_limit_every # 0 = بدون 429
+        self.retry_after = retry_after
+        self.fail_first = fail_first # عدد الطلبات الأولى التي ترد بـ 500
+        self.messages: list[dict] = []
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def next_response(self, payload: dict) -> tuple[int, dict]:
+        with self._lock:
+            self.requests += 1
+            if self.requests <= self.fail_first:
+                return 500, {"ok": False, "error_code": 500, "description": "Internal Server Error"}
+            if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                return 429, {"ok": False, "error_code": 429,
+                             "description": f"Too Many Requests: retry after {self.retry_after}",
+                             "parameters": {"retry_after": self.retry_after}}
+            self.messages.append({**payload, "received_at": time.time()})
+            return 200, {"ok": True, "result": {"message_id": len(self.messages), "text": payload.get("text", "")}}
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> FakeTelegramState:
+        return self.server.state # type: ignore[attr-defined]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            payload = {}
+        if self.state.latency_ms:
+            time.sleep(self.state.latency_ms / 1000)
+        if not self.path.endswith("/sendMessage") or not payload.get("chat_id"):
+            status, body = 400, {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"}
+        else:
+            status, body = self.state.next_response(payload)
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeTelegramServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **state_options):
+        self.state = FakeTelegramState(**state_options)
+        self._httpd = ThreadingHTTPServer((host, port), FakeTelegramHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.state = self.state # type: ignore[attr-defined]
+        self._thread: threading.Thread | None = None
+
+    @property
+    def api_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeTelegramServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="FakeTelegramServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(5)
+
+    def __enter__(self) -> "FakeTelegramServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="خادم Telegram وهمي لاختبار التنبيهات محليًا")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="رد 429 كل N طلب")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--fail-first", type=int, default=0, help="رد 500 لأول N طلب")
+    args = parser.parse_args()
+    server = FakeTelegramServer(port=args.port, latency_ms=args.latency_ms, rate_limit_every=args.rate_limit_every,
+                                retry_after=args.retry_after, fail_first=args.fail_first).start()
+    print(f"خادم Telegram الوهمي يعمل على {server.api_url} (اضبط notifications.telegram_api_url عليه)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
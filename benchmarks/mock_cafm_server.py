@@ -0,0 +1,318 @@
+# benchmarks/mock_cafm_server.py
+# خادم HTTP محلي يحاكي صفحات CAFM (ASP.NET WebForms) لقياس الأداء بدون شبكة:
+#   /ADH/applogin.aspx      نموذج تسجيل الدخول (POST يضع كوكي .ASPXAUTH ويعيد التوجيه إلى apptop)
+#   /ADH/apptop.aspx        الصفحة الرئيسية بجداول متداخلة (تطابق session_check_xpath) ورابط "Site wise Work Orders"
+#   /ADH/WorkOrders.aspx    جدول أوامر العمل بعدد صفوف قابل للتحديد، مقسم لصفحات (GridView) إن حُدد page_size:
+#                           POST بـ __EVENTTARGET=gvWorkOrders و __EVENTARGUMENT=Page$N يعيد الصفحة N
+#   /ADH/DataEntry.aspx     نموذج إدخال (POST يحفظ الصف ويعرض صفحة تأكيد، أو رسالة خطأ إذا كان رقم أمر العمل
+#                           يحتوي INVALID، دون حفظ)
+#   /static/*               صور وخطوط و CSS بأحجام قابلة للتحديد (لقياس أثر ملف تعريف الشبكة)
+# الصفحات المحمية تعيد التوجيه إلى صفحة الدخول بدون الكوكي، كما يفعل الخادم الحقيقي.
+# مثال تشغيل مستقل: python benchmarks/mock_cafm_server.py --port 8765 --rows 500 --latency-ms 80
+import argparse
+import html
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+AUTH_COOKIE = ".ASPXAUTH"
+SESSION_COOKIE = "ASP.NET_SessionId"
+
+STATIC_ASSETS = {
+    # المسار: (نوع المحتوى، الحجم بالبايت)
+    "/static/site.css": ("text/css", 60_000),
+    "/static/logo.png": ("image/png", 80_000),
+    "/static/banner.jpg": ("image/jpeg", 250_000),
+    "/static/font.woff2": ("font/woff2", 90_000),
+    "/static/analytics.js": ("application/javascript", 40_000),
+}
+
+_ASSET_TAGS = """
+<link rel="stylesheet" href="/static/site.css">
+<link rel="preload" href="/static/font.woff2" as="font" type="font/woff2" crossorigin>
+<script src="/static/analytics.js?collect=1"></script>
+"""
+
+
+def _viewstate() -> str:
+    # قيمة متغيرة مع كل طلب مثل __VIEWSTATE الحقيقي
+    return secrets.token_urlsafe(96)
+
+
+def _page(title: str, body: str, with_assets: bool = True) -> bytes:
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>{_ASSET_TAGS if with_assets else ""}</head>
+<body>
+<form method="post" id="form1">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{_viewstate()}">
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{_viewstate()}">
+{body}
+</form>
+</body></html>""".encode("utf-8")
+
+
+def _pager_links(page_number: int, page_count: int) -> str:
+    # مثل PagerSettings.Mode=Numeric في GridView: مجموعات من 10 صفحات مع "..." للمجموعة السابقة/التالية
+    first = (page_number - 1) // 10 * 10 + 1
+    last = min(first + 9, page_count)
+    link = "<td><a href=\"javascript:__doPostBack('gvWorkOrders','Page${0}')\">{1}</a></td>"
+    cells = [link.format(first - 1, "...")] if first > 1 else []
+    cells += [f"<td><span>{number}</span></td>" if number == page_number else link.format(number, number)
+              for number in range(first, last + 1)]
+    if last < page_count:
+        cells.append(link.format(last + 1, "..."))
+    return f"<table><tr>{''.join(cells)}</tr></table>"
+
+
+class MockCafmState:
+    def __init__(self, rows: int = 200, latency_ms: float = 0.0, asset_latency_ms: float = 0.0, page_size: int = 0):
+        self.rows = rows
+        self.page_size = page_size # 0 = كل الصفوف في صفحة واحدة
+        self.latency_ms = latency_ms
+        self.asset_latency_ms = asset_latency_ms
+        self.sessions: set[str] = set()
+        self.submissions: list[dict[str, str]] = []
+        self.requests = 0
+        self.work_order_version = 0 # يزداد لمحاكاة تغير الجدول
+        self._lock = threading.Lock()
+
+    def record_submission(self, fields: dict[str, str]):
+        with self._lock:
+            self.submissions.append(fields)
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+
+class MockCafmHandler(BaseHTTPRequestHandler):
+    server_version = "Microsoft-IIS/10.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> MockCafmState:
+        return self.server.state # type: ignore[attr-defined]
+
+    def log_message(self, format, *args):
+        pass # بدون طباعة لكل طلب حتى لا تؤثر على القياس
+
+    # --- أدوات ---
+    def _cookies(self) -> dict[str, str]:
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return {name: morsel.value for name, morsel in cookie.items()}
+
+    def _is_authenticated(self) -> bool:
+        return self._cookies().get(AUTH_COOKIE) in self.state.sessions
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/html; charset=utf-8",
+              headers: dict[str, str] | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "private")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _redirect(self, location: str, headers: dict[str, str] | None = None):
+        self._send(302, f'<a href="{location}">moved</a>'.encode(), headers={"Location": location, **(headers or {})})
+
+    def _read_form(self) -> dict[str, str]:
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        data = self.rfile.read(length).decode("utf-8") if length else ""
+        return {name: values[-1] for name, values in parse_qs(data, keep_blank_values=True).items()}
+
+    def _delay(self, path: str):
+        delay_ms = self.state.asset_latency_ms if path.startswith("/static/") else self.state.latency_ms
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+    # --- التوجيه ---
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self.state.count_request()
+        url = urlsplit(self.path)
+        self._delay(url.path)
+        if url.path in STATIC_ASSETS:
+            content_type, size = STATIC_ASSETS[url.path]
+            self._send(200, b"\0" * size, content_type, {"Cache-Control": "no-store"})
+        elif url.path in ("/", "/ADH/applogin.aspx"):
+            self._send(200, self._login_page())
+        elif not self._is_authenticated():
+            self._redirect("/ADH/applogin.aspx?ReturnUrl=" + url.path)
+        elif url.path == "/ADH/apptop.aspx":
+            self._send(200, self._apptop_page())
+        elif url.path == "/ADH/WorkOrders.aspx":
+            self._send(200, self._work_orders_page())
+        elif url.path == "/ADH/DataEntry.aspx":
+            saved = parse_qs(url.query).get("saved", [""])[0]
+            self._send(200, self._data_entry_page(saved))
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def do_POST(self):
+        self.state.count_request()
+        url = urlsplit(self.path)
+        self._delay(url.path)
+        form = self._read_form()
+        if url.path == "/ADH/applogin.aspx":
+            if form.get("txtUserName") and form.get("txtPassword"):
+                token = secrets.token_hex(16)
+                self.state.sessions.add(token)
+                self._redirect("/ADH/apptop.aspx", {"Set-Cookie": f"{AUTH_COOKIE}={token}; Path=/; HttpOnly"})
+            else:
+                self._send(200, self._login_page("اسم المستخدم أو كلمة المرور غير صحيحة"))
+        elif not self._is_authenticated():
+            self._redirect("/ADH/applogin.aspx")
+        elif url.path == "/ADH/DataEntry.aspx":
+            fields = {name: value for name, value in form.items() if not name.startswith("__")}
+            if "INVALID" in fields.get("txtWorkOrderNo", ""):
+                # مثل فشل التحقق في ASP.NET: نفس النموذج مع رسالة خطأ (200) دون حفظ
+                self._send(200, self._data_entry_page("", error="رقم أمر العمل غير صحيح"))
+                return
+            self.state.record_submission(fields)
+            # نمط Post/Redirect/Get كما في صفحات ASP.NET الحقيقية
+            self._redirect(f"/ADH/DataEntry.aspx?saved={len(self.state.submissions)}")
+        elif url.path == "/ADH/WorkOrders.aspx":
+            # ASP.NET يرفض الـ postback بدون __VIEWSTATE
+            if "__VIEWSTATE" not in form:
+                self._send(500, b"Validation of viewstate MAC failed.", "text/plain")
+                return
+            page_number = 1
+            if form.get("__EVENTTARGET") == "gvWorkOrders" and form.get("__EVENTARGUMENT", "").startswith("Page$"):
+                page_number = int(form["__EVENTARGUMENT"][5:] or 1)
+            self._send(200, self._work_orders_page(page_number))
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    # --- الصفحات ---
+    def _login_page(self, error: str = "") -> bytes:
+        return _page("Login", f"""
+<div class="login">
+  <img src="/static/logo.png" alt="logo"><img src="/static/banner.jpg" alt="banner">
+  <span id="lblError">{html.escape(error)}</span>
+  <input type="text" name="txtUserName" id="txtUserName">
+  <input type="password" name="txtPassword" id="txtPassword">
+  <input type="submit" name="btnLogin" id="btnLogin" value="Login" formaction="/ADH/applogin.aspx">
+</div>""")
+
+    def _apptop_page(self) -> bytes:
+        # بنية متداخلة تطابق session_check_xpath في config.json:
+        # /html/body/form/div[2]/table/tbody/tr[2]/td/table/tbody/tr/td[1]/table/tbody/tr/td/a
+        return _page("CAFM", """
+<div class="header"><img src="/static/logo.png" alt="logo"></div>
+<div class="menu">
+  <table><tbody>
+    <tr><td>CAFM</td></tr>
+    <tr><td><table><tbody><tr>
+      <td><table><tbody><tr><td><a href="/ADH/apptop.aspx?home=1">Home</a></td></tr></tbody></table></td>
+      <td><a href="/ADH/WorkOrders.aspx" target="_blank">Site wise Work Orders</a></td>
+      <td><a href="/ADH/DataEntry.aspx">Data Entry</a></td>
+    </tr></tbody></table></td></tr>
+  </tbody></table>
+</div>""")
+
+    def _work_orders_page(self, page_number: int = 1) -> bytes:
+        version = self.state.work_order_version
+        page_size = self.state.page_size or max(self.state.rows, 1)
+        page_count = max(1, -(-self.state.rows // page_size))
+        page_number = min(max(page_number, 1), page_count)
+        first = (page_number - 1) * page_size
+        rows = "\n".join(
+            f"<tr><td>WO-{index:07d}</td><td>Site {index % 37}</td><td>{'Open' if (index + version) % 5 else 'Closed'}</td>"
+            f"<td>2024-01-{index % 28 + 1:02d}</td><td>Description of work order {index}</td></tr>"
+            for index in range(first, min(first + page_size, self.state.rows))
+        )
+        pager = f'\n  <tr class="pager"><td colspan="5">{_pager_links(page_number, page_count)}</td></tr>' if page_count > 1 else ""
+        return _page("Site wise Work Orders", f"""
+<img src="/static/banner.jpg" alt="banner">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="">
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="">
+<script>
+function __doPostBack(eventTarget, eventArgument) {{
+  var form = document.forms['form1'];
+  form.__EVENTTARGET.value = eventTarget;
+  form.__EVENTARGUMENT.value = eventArgument;
+  form.submit();
+}}
+</script>
+<table id="gvWorkOrders">
+  <tr><th>WO No</th><th>Site</th><th>Status</th><th>Date</th><th>Description</th></tr>
+{rows}{pager}
+</table>""")
+
+    def _data_entry_page(self, saved: str, error: str = "") -> bytes:
+        message = f'<span id="lblMessage">تم الحفظ بنجاح ({html.escape(saved)})</span>' if saved else ""
+        if error:
+            message = f'<span id="lblError">{html.escape(error)}</span>'
+        return _page("Data Entry", f"""
+<img src="/static/logo.png" alt="logo">
+{message}
+<input type="text" name="txtWorkOrderNo" id="txtWorkOrderNo">
+<input type="text" name="txtSite" id="txtSite">
+<textarea name="txtDescription" id="txtDescription"></textarea>
+<input type="submit" name="btnSave" id="btnSave" value="Save" formaction="/ADH/DataEntry.aspx">""")
+
+
+class MockCafmServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, rows: int = 200, latency_ms: float = 0.0,
+                 asset_latency_ms: float = 0.0, page_size: int = 0):
+        self.state = MockCafmState(rows, latency_ms, asset_latency_ms, page_size)
+        self._httpd = ThreadingHTTPServer((host, port), MockCafmHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.state = self.state # type: ignore[attr-defined]
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def start(self) -> "MockCafmServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="MockCafmServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(5)
+
+    def __enter__(self) -> "MockCafmServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="خادم CAFM وهمي لقياس الأداء محليًا")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=200, help="عدد صفوف جدول أوامر العمل")
+    parser.add_argument("--page-size", type=int, default=0, help="عدد الصفوف في كل صفحة من الجدول (0 = بدون تقسيم)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="تأخير كل صفحة")
+    parser.add_argument("--asset-latency-ms", type=float, default=0.0, help="تأخير كل ملف ثابت (صور، CSS...)")
+    args = parser.parse_args()
+    server = MockCafmServer(port=args.port, rows=args.rows, latency_ms=args.latency_ms,
+                            asset_latency_ms=args.asset_latency_ms, page_size=args.page_size).start()
+    print(f"الخادم الوهمي يعمل على {server.base_url}/ADH/applogin.aspx (Ctrl+C للإيقاف)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
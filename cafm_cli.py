@@ -0,0 +1,447 @@
+# cafm_cli.py
+# نقطة تشغيل من سطر الأوامر بدون واجهة (لا تستورد PySide6) لخوادم الجدولة:
+#   python cafm_cli.py login-check              فحص صلاحية الجلسة المحفوظة (رمز الخروج 0 = صالحة)
+#   python cafm_cli.py save-session             حفظ جلسة المتصفح المفتوح (CDP) إلى sessions/
+#   python cafm_cli.py enter-data               إدخال ملف Excel المحدد في config.json
+#   python cafm_cli.py monitor                  مراقبة أوامر العمل حتى Ctrl+C
+#   python cafm_cli.py daemon                   عملية دائمة تبقي Playwright ومتصفحًا واحدًا جاهزين وتنفذ
+#                                               المهام التي توضع كملفات JSON في jobs/incoming
+#   python cafm_cli.py sessions                 فحص كل جلسات sessions/*.json في متصفح واحد مع تقرير الذاكرة
+# Playwright ووحدات المتصفح تُستورد عند تنفيذ الأمر فقط، فزمن بدء التشغيل (حتى جاهزية الأمر)
+# يقاس ويُقارن بميزانية محددة (--startup-budget-ms).
+import time
+
+_STARTED_AT = time.perf_counter()
+
+import argparse
+import asyncio
+import json
+import signal
+import sys
+from pathlib import Path
+from typing import Callable
+
+from utils.config_manager import ConfigManager, ConfigError
+from utils.logger import Logger, stop_logging
+from utils.metrics import METRICS, TimingEvent
+
+APP_BASE_DIR = Path(__file__).resolve().parent
+SESSIONS_DIR = APP_BASE_DIR / 'sessions'
+BROWSER_SESSION_FILE = SESSIONS_DIR / "browser_session.json"
+CONFIG_FILE = APP_BASE_DIR / 'config' / 'config.json'
+JOBS_DIR = APP_BASE_DIR / 'jobs'
+
+DEFAULT_STARTUP_BUDGET_MS = 250
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+logger = Logger(name="SehaCafmCLI")
+
+
+def load_config(config_file: Path) -> ConfigManager:
+    config_manager = ConfigManager(config_file, logger_instance=logger)
+    try:
+        config_manager.load()
+    except ConfigError as e:
+        raise SystemExit(str(e))
+    return config_manager
+
+
+def _cdp_options(args, config: dict) -> tuple[str, int]:
+    from utils.browser_manager import cdp_options
+
+    options = cdp_options(config)
+    return args.cdp_url or options["cdp_url"], options["timeout"]
+
+
+# --- أوامر التشغيل الواحد ---
+def cmd_login_check(args, config: dict) -> int:
+    from utils.browser_manager import BrowserManager, session_check_options
+
+    manager = BrowserManager(logger_instance=logger)
+    try:
+        if args.cdp:
+            ready = manager.connect_to_existing_cdp_browser(*_cdp_options(args, config))
+        else:
+            ready = manager.launch_new_browser_with_session(str(args.session), headless=True) is not None
+        if not ready:
+            logger.error("تعذر تجهيز المتصفح للفحص.")
+            return EXIT_FAILED
+        health = manager.check_session_health(**session_check_options(config))
+        print(json.dumps({"status": health.status, "method": health.method,
+                          "duration_ms": round(health.duration_ms, 1), "detail": health.detail}, ensure_ascii=False))
+        return EXIT_OK if health.is_valid else EXIT_FAILED
+    finally:
+        if manager.is_launched_browser:
+            manager.close_launched_browser()
+        if manager.is_connected_to_persistent_cdp:
+            manager.close_connection_to_persistent_browser()
+
+
+def cmd_save_session(args, config: dict) -> int:
+    from utils.browser_manager import BrowserManager
+
+    manager = BrowserManager(logger_instance=logger)
+    try:
+        if not manager.connect_to_existing_cdp_browser(*_cdp_options(args, config)):
+            return EXIT_FAILED
+        return EXIT_OK if manager.save_current_session_state(str(args.session)) else EXIT_FAILED
+    finally:
+        manager.close_connection_to_persistent_browser()
+
+
+def cmd_enter_data(args, config: dict) -> int:
+    from utils.data_entry import DataEntryEngine
+
+    engine = DataEntryEngine.from_config(
+        config,
+        cdp_url=_cdp_options(args, config)[0] if args.cdp else None,
+        storage_state_file=None if args.cdp else str(args.session),
+        logger_instance=logger,
+    )
+    summary = engine.run(args.excel or config.get("excel_file", ""), args.sheet or config.get("sheet_name", "Sheet1"),
+                         progress_callback=lambda r: logger.info(
+                             f"الصف {r.row_number}: {r.status} ({r.duration_ms:.0f} ms، الإرسال {r.submit_ms:.0f} ms) {r.error}"))
+    print(json.dumps({"total": summary.total, "succeeded": summary.succeeded, "failed": summary.failed,
+                      "in_doubt": summary.in_doubt, "skipped": summary.skipped,
+                      "elapsed_s": round(summary.elapsed_s, 2), "submit_p50_ms": round(summary.submit_p50_ms, 1),
+                      "submit_p95_ms": round(summary.submit_p95_ms, 1), "results_file": summary.results_file},
+                     ensure_ascii=False))
+    return EXIT_OK if summary.failed == 0 and summary.in_doubt == 0 else EXIT_FAILED
+
+
+def _install_stop_handlers(loop: asyncio.AbstractEventLoop, stop: Callable[[], None]):
+    for signal_name in ("SIGINT", "SIGTERM"):
+        if hasattr(signal, signal_name):
+            try:
+                loop.add_signal_handler(getattr(signal, signal_name), stop)
+            except (NotImplementedError, RuntimeError):
+                pass # ويندوز: Ctrl+C يصل كـ KeyboardInterrupt
+
+
+async def _prepare_async_manager(args, config: dict, for_monitoring: bool = False):
+    from utils.async_browser_manager import AsyncBrowserManager
+    from utils.browser_manager import headless_from_config
+    from utils.network_profile import NetworkProfile
+
+    started_at = time.perf_counter()
+    manager = AsyncBrowserManager(logger_instance=logger, network_profile=NetworkProfile.from_config(config, logger))
+    if args.cdp:
+        ready = await manager.connect_to_existing_cdp_browser(*_cdp_options(args, config))
+    else:
+        ready = await manager.launch_new_browser_with_session(
+            str(args.session), headless=headless_from_config(config, for_monitoring=for_monitoring) or args.headless)
+    if not ready:
+        raise SystemExit("تعذر تجهيز المتصفح (اتصال CDP أو إطلاق من الجلسة).")
+    logger.info(f"المتصفح جاهز خلال {(time.perf_counter() - started_at) * 1000:.0f} ms.")
+    return manager
+
+
+def _start_supervisor(manager, args, config: dict, for_monitoring: bool = False):
+    # إعادة الاتصال تلقائيًا إذا أُغلق المتصفح أو أعيد تشغيله أثناء التشغيل الطويل
+    from utils.browser_manager import ReconnectPolicy, headless_from_config, session_check_options
+    from utils.connection_supervisor import AsyncConnectionSupervisor
+
+    supervisor = AsyncConnectionSupervisor(
+        manager, ReconnectPolicy.from_config(config), session_file=str(args.session),
+        session_check=session_check_options(config),
+        headless=headless_from_config(config, for_monitoring=for_monitoring) or args.headless, logger_instance=logger)
+    supervisor.start()
+    return supervisor
+
+
+def cmd_monitor(args, config: dict) -> int:
+    from utils.monitoring_service import MonitoringService
+    from utils.notifications import NotificationDispatcher
+
+    async def run() -> int:
+        manager = await _prepare_async_manager(args, config, for_monitoring=True)
+        supervisor = _start_supervisor(manager, args, config, for_monitoring=True)
+        service = MonitoringService(
+            manager, config.get("monitoring", {}),
+            on_new_rows=lambda rows: logger.info(f"المراقبة: {len(rows)} أمر عمل جديد: {rows[:5]}"),
+            on_updated_rows=lambda rows: logger.info(f"المراقبة: {len(rows)} أمر عمل تغيرت بياناته."),
+            supervisor=supervisor,
+            notifier=NotificationDispatcher.from_config(config, logger_instance=logger),
+            logger_instance=logger,
+        )
+        _install_stop_handlers(asyncio.get_running_loop(), service.request_stop)
+        # تعديل config.json أثناء التشغيل (المحددات، الفترة...) يُطبق دون إعادة تشغيل
+        config_manager = args.config_manager.start_watching()
+        unsubscribe = config_manager.subscribe(lambda new_config: service.update_config(new_config.section("monitoring")))
+        try:
+            await service.run_forever()
+        finally:
+            unsubscribe()
+            config_manager.stop_watching()
+            await supervisor.stop()
+            await manager.close()
+        return EXIT_OK
+
+    return asyncio.run(run())
+
+
+# --- العملية الدائمة ---
+class JobDaemon:
+    # يبقي مثيل Playwright ومتصفحًا واحدًا جاهزين بين المهام. كل مهمة ملف JSON في jobs/incoming مثل:
+    #   {"command": "enter-data", "excel_file": "...", "sheet_name": "Sheet1"}
+    #   {"command": "login-check", "session": "site_b"}
+    # تُنقل بعد التنفيذ إلى jobs/done أو jobs/failed مع ملف نتيجة بنفس الاسم (.result.json).
+    # "session" يوجه المهمة إلى جلسة في مجمع الجلسات (سياق معزول في نفس المتصفح وحد معدل حسابها).
+    # مهام الجلسة الواحدة تُنفذ بالترتيب، ومهام الجلسات المختلفة بالتوازي.
+    def __init__(self, args, config: dict):
+        self.args = args
+        self.config = config
+        self.jobs_dir = Path(args.jobs_dir)
+        self.poll_interval = args.poll_interval
+        # مع --pool (أو session_pool.enabled) تعمل المهام بلا "session" على جلسة --session داخل المجمع
+        self.use_pool = args.pool or bool(config.get("session_pool", {}).get("enabled", False))
+        self.default_session = Path(args.session).stem
+        self.manager = None
+        self.supervisor = None
+        self.pool = None
+        self.monitoring_service = None
+        self._lanes: dict[str, asyncio.Task] = {}
+        self._stop_event: asyncio.Event | None = None
+
+    def request_stop(self):
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self.monitoring_service is not None:
+            self.monitoring_service.request_stop()
+
+    def _on_config_reloaded(self, new_config):
+        # من خيط مراقبة الملف؛ استبدال المرجع ذري، والمراقبة تنقل التطبيق لحلقتها
+        self.config = new_config.raw
+        if self.monitoring_service is not None:
+            self.monitoring_service.update_config(new_config.section("monitoring"))
+
+    def _get_pool(self):
+        if self.pool is None:
+            from utils.session_pool import SessionPool
+            self.pool = SessionPool.from_config(self.config, headless=True if self.args.headless else None,
+                                                logger_instance=logger)
+            logger.info(f"مجمع الجلسات: {', '.join(self.pool.names) or 'لا توجد جلسات'}")
+        return self.pool
+
+    async def run(self) -> int:
+        self._stop_event = asyncio.Event()
+        _install_stop_handlers(asyncio.get_running_loop(), self.request_stop)
+        for folder in ("incoming", "done", "failed"):
+            (self.jobs_dir / folder).mkdir(parents=True, exist_ok=True)
+        monitor_task = None
+        # المهام الجديدة تستخدم آخر نسخة من config.json، والمراقبة تطبق تعديلاتها فورًا
+        config_manager = self.args.config_manager.start_watching()
+        unsubscribe = config_manager.subscribe(self._on_config_reloaded)
+        try:
+            rate_limiter = None
+            if self.use_pool:
+                monitor_manager = await self._get_pool().manager_for(self.default_session)
+                rate_limiter = self.pool.rate_limiter(self.default_session)
+            else:
+                self.manager = monitor_manager = await _prepare_async_manager(self.args, self.config)
+                self.supervisor = _start_supervisor(self.manager, self.args, self.config)
+            if self.args.monitor:
+                from utils.monitoring_service import MonitoringService
+                from utils.notifications import NotificationDispatcher
+                self.monitoring_service = MonitoringService(
+                    monitor_manager, self.config.get("monitoring", {}), supervisor=self.supervisor,
+                    rate_limiter=rate_limiter, notifier=NotificationDispatcher.from_config(self.config, logger),
+                    logger_instance=logger)
+                monitor_task = asyncio.create_task(self.monitoring_service.run_forever())
+            logger.info(f"العملية الدائمة تعمل، بانتظار المهام في {self.jobs_dir / 'incoming'}")
+            while not self._stop_event.is_set():
+                for job_file in sorted((self.jobs_dir / "incoming").glob("*.json")):
+                    if self._stop_event.is_set():
+                        break
+                    self._dispatch(job_file)
+                await self._wait_for_work()
+        finally:
+            unsubscribe()
+            config_manager.stop_watching()
+            await asyncio.gather(*self._lanes.values(), return_exceptions=True)
+            if monitor_task is not None:
+                self.monitoring_service.request_stop()
+                await asyncio.gather(monitor_task, return_exceptions=True)
+            if self.supervisor is not None:
+                await self.supervisor.stop()
+            if self.manager is not None:
+                await self.manager.close()
+            if self.pool is not None:
+                logger.info(f"مجمع الجلسات: {(await self.pool.memory_report()).summary()}")
+                await self.pool.close()
+        return EXIT_OK
+
+    def _dispatch(self, job_file: Path):
+        try:
+            job = json.loads(job_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            self._finish_job(job_file, False, {"error": f"ملف مهمة غير صالح: {e}", "duration_s": 0.0})
+            return
+        lane = job.get("session") or (self.default_session if self.use_pool else "")
+        task = self._lanes.get(lane)
+        if task is not None and not task.done():
+            return # تبقى في incoming حتى تنتهي مهمة الجلسة الجارية
+        self._lanes[lane] = asyncio.create_task(self._run_job(job_file, job))
+
+    async def _wait_for_work(self):
+        # حتى الإيقاف أو انتهاء مهمة (ليبدأ ما بعدها في نفس الجلسة فورًا) أو مرور فترة الفحص
+        stop_waiter = asyncio.ensure_future(self._stop_event.wait())
+        running = [task for task in self._lanes.values() if not task.done()]
+        try:
+            await asyncio.wait([stop_waiter, *running], timeout=self.poll_interval,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop_waiter.cancel()
+
+    async def _resolve_session(self, job: dict):
+        # (مدير المتصفح، الإعدادات، حد المعدل، مشرف الاتصال) للمهمة
+        session = job.get("session") or (self.default_session if self.use_pool else None)
+        if session is None:
+            if not await self.supervisor.wait_until_ready(should_stop=self._stop_event.is_set):
+                raise RuntimeError("المتصفح غير متصل وتعذرت إعادة الاتصال.")
+            return self.manager, self.config, None, self.supervisor
+        pool = self._get_pool()
+        return (await pool.manager_for(session), pool.config_for(session, self.config),
+                pool.rate_limiter(session), None)
+
+    async def _run_job(self, job_file: Path, job: dict):
+        started_at = time.perf_counter()
+        try:
+            command = job.get("command")
+            logger.info(f"بدء المهمة {job_file.name} ({command}{', ' + job['session'] if job.get('session') else ''})")
+            manager, base_config, rate_limiter, supervisor = await self._resolve_session(job)
+            if command == "login-check":
+                from utils.browser_manager import session_check_options
+                if rate_limiter is not None:
+                    await rate_limiter.acquire()
+                health = await manager.check_session_health(**session_check_options(base_config))
+                success, result = health.is_valid, {"status": health.status, "detail": health.detail}
+            elif command == "enter-data":
+                from utils.data_entry import DataEntryEngine
+                config = {**base_config, **{key: value for key, value in job.items() if key not in ("command", "session")}}
+                engine = DataEntryEngine.from_config(config, cdp_url=None, rate_limiter=rate_limiter,
+                                                     logger_instance=logger)
+                summary = await engine.run_async(config.get("excel_file", ""), config.get("sheet_name", "Sheet1"),
+                                                 browser_manager=manager, supervisor=supervisor)
+                success = summary.failed == 0 and summary.in_doubt == 0
+                result = {"total": summary.total, "succeeded": summary.succeeded, "failed": summary.failed,
+                          "in_doubt": summary.in_doubt, "submit_p50_ms": round(summary.submit_p50_ms, 1),
+                          "results_file": summary.results_file}
+            else:
+                success, result = False, {"error": f"أمر غير معروف: {command!r}"}
+        except Exception as e:
+            logger.error(f"فشلت المهمة {job_file.name}: {e}", exc_info=True)
+            success, result = False, {"error": str(e)}
+        result["duration_s"] = round(time.perf_counter() - started_at, 2)
+        self._finish_job(job_file, success, result)
+
+    def _finish_job(self, job_file: Path, success: bool, result: dict):
+        target_dir = self.jobs_dir / ("done" if success else "failed")
+        job_file.replace(target_dir / job_file.name)
+        (target_dir / f"{job_file.stem}.result.json").write_text(json.dumps(result, ensure_ascii=False, indent=2),
+                                                                 encoding="utf-8")
+        logger.info(f"انتهت المهمة {job_file.name}: {'نجاح' if success else 'فشل'} خلال {result['duration_s']} ث.")
+
+
+def cmd_sessions(args, config: dict) -> int:
+    # يفتح كل جلسات المجمع في متصفح واحد، ويفحص صلاحيتها بالتوازي، ويطبع الذاكرة لكل سياق
+    from utils.browser_manager import session_check_options
+    from utils.session_pool import SessionPool
+
+    async def run() -> int:
+        pool = SessionPool.from_config(config, headless=True if args.headless else None, logger_instance=logger)
+        try:
+            opened = await pool.open_all()
+
+            async def check(name: str) -> dict:
+                if not opened[name]:
+                    return {"status": "not_opened"}
+                await pool.rate_limiter(name).acquire()
+                manager = await pool.manager_for(name)
+                health = await manager.check_session_health(**session_check_options(pool.config_for(name, config)))
+                return {"status": health.status, "detail": health.detail, "duration_ms": round(health.duration_ms, 1),
+                        "open_ms": round(pool.sessions[name].open_ms, 1)}
+
+            results = await asyncio.gather(*(check(name) for name in pool.names))
+            report = await pool.memory_report()
+            logger.info(report.summary())
+            print(json.dumps({"sessions": dict(zip(pool.names, results)), "memory": report.to_dict()},
+                             ensure_ascii=False))
+            return EXIT_OK if all(result["status"] == "valid" for result in results) else EXIT_FAILED
+        finally:
+            await pool.close()
+
+    return asyncio.run(run())
+
+
+def cmd_daemon(args, config: dict) -> int:
+    return asyncio.run(JobDaemon(args, config).run())
+
+
+COMMANDS = {
+    "login-check": cmd_login_check,
+    "save-session": cmd_save_session,
+    "enter-data": cmd_enter_data,
+    "monitor": cmd_monitor,
+    "daemon": cmd_daemon,
+    "sessions": cmd_sessions,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    # خيارات مشتركة تقبلها كل الأوامر بعد اسم الأمر
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", type=Path, default=CONFIG_FILE)
+    common.add_argument("--session", type=Path, default=BROWSER_SESSION_FILE, help="ملف الجلسة المحفوظة (storage_state)")
+    common.add_argument("--cdp", action="store_true", help="الاتصال بمتصفح مفتوح عبر CDP بدل إطلاق متصفح من الجلسة")
+    common.add_argument("--cdp-url", help="افتراضيًا browser.cdp_url من الإعدادات")
+    common.add_argument("--headless", action="store_true", help="إجبار التشغيل بدون واجهة حتى لو كان browser.headless=false")
+    common.add_argument("--startup-budget-ms", type=float, default=DEFAULT_STARTUP_BUDGET_MS)
+    parser = argparse.ArgumentParser(prog="cafm_cli", description="SehaCafmHelper بدون واجهة رسومية")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("login-check", parents=[common], help="فحص صلاحية الجلسة")
+    subparsers.add_parser("save-session", parents=[common], help="حفظ جلسة المتصفح المفتوح (يتطلب CDP)")
+    enter_data = subparsers.add_parser("enter-data", parents=[common], help="إدخال بيانات ملف Excel")
+    enter_data.add_argument("--excel", help="افتراضيًا excel_file من الإعدادات")
+    enter_data.add_argument("--sheet", help="افتراضيًا sheet_name من الإعدادات")
+    subparsers.add_parser("monitor", parents=[common], help="مراقبة أوامر العمل حتى الإيقاف")
+    daemon = subparsers.add_parser("daemon", parents=[common], help="عملية دائمة تنفذ المهام من مجلد jobs")
+    daemon.add_argument("--jobs-dir", default=str(JOBS_DIR))
+    daemon.add_argument("--poll-interval", type=float, default=1.0)
+    daemon.add_argument("--monitor", action="store_true", help="تشغيل المراقبة بالتوازي مع المهام")
+    daemon.add_argument("--pool", action="store_true", help="تشغيل كل المهام على مجمع الجلسات (متصفح واحد لكل الحسابات)")
+    subparsers.add_parser("sessions", parents=[common], help="فحص كل جلسات المجمع وقياس الذاكرة لكل سياق")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "save-session":
+        args.cdp = True
+    # الأوامر الدائمة (monitor، daemon) تراقب الملف عبر args.config_manager
+    args.config_manager = load_config(args.config)
+    config = args.config_manager.current.raw
+
+    startup_ms = (time.perf_counter() - _STARTED_AT) * 1000
+    METRICS.record(TimingEvent("cli_startup", startup_ms, target=args.command))
+    if startup_ms > args.startup_budget_ms:
+        logger.warning(f"زمن بدء التشغيل {startup_ms:.0f} ms تجاوز الميزانية ({args.startup_budget_ms:.0f} ms).")
+    else:
+        logger.debug(f"زمن بدء التشغيل {startup_ms:.0f} ms (الميزانية {args.startup_budget_ms:.0f} ms).")
+    if "PySide6" in sys.modules:
+        logger.warning("تم تحميل PySide6 في وضع سطر الأوامر، وهذا يبطئ بدء التشغيل.")
+
+    try:
+        return COMMANDS[args.command](args, config)
+    except KeyboardInterrupt:
+        logger.info("تم الإيقاف بواسطة المستخدم.")
+        return EXIT_FAILED
+    finally:
+        stop_logging()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
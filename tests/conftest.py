@@ -0,0 +1,17 @@
+# tests/conftest.py
+# الاختبارات تعمل من جذر المستودع بدون تثبيت الحزمة (مثل benchmarks)
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import metrics  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _no_events_file(monkeypatch, tmp_path):
+    # الدوال المقاسة تسجل في METRICS المشترك؛ لا يُكتب ملف أحداث في logs/ أثناء الاختبارات
+    monkeypatch.setattr(metrics.METRICS, "write_events", False)
+    monkeypatch.setattr(metrics, "LOGS_DIR", tmp_path / "logs")
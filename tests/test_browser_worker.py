@@ -0,0 +1,71 @@
+# tests/test_browser_worker.py
+# مدير متصفح وهمي: يسجل فحوص الاتصال وإعادة الاتصال بدل متصفح حقيقي
+import threading
+
+from utils.browser_manager import ReconnectPolicy
+from utils.browser_worker import BrowserWorker, STATUS_DONE
+
+
+class _FakeManager:
+    is_connected_to_persistent_cdp = True
+    is_launched_browser = False
+    playwright_instance = None
+
+    def __init__(self, lost: bool = False):
+        self.lost = lost
+        self.checks = []
+        self.reconnects = 0
+
+    def cdp_connection_lost(self, probe: bool = False) -> bool:
+        self.checks.append(probe)
+        return self.lost
+
+    def reconnect_cdp(self, policy, should_stop=None) -> bool:
+        self.reconnects += 1
+        self.lost = False
+        return True
+
+    def close_connection_to_persistent_browser(self):
+        pass
+
+
+def _run(manager: _FakeManager, func):
+    finished = threading.Event()
+    worker = BrowserWorker(reconnect_policy=ReconnectPolicy(), on_finished=lambda command: finished.set())
+    worker.manager = manager
+    command = worker.submit("test", func)
+    assert finished.wait(5)
+    worker.stop()
+    return command
+
+
+def test_successful_command_needs_no_browser_round_trip():
+    manager = _FakeManager()
+    command = _run(manager, lambda manager, command: (True, "ok"))
+    assert command.status == STATUS_DONE and command.success
+    assert manager.checks == [False] # حالة الاتصال المعروفة فقط، بلا probe
+    assert manager.reconnects == 0
+
+
+def test_failed_command_is_retried_after_reconnect():
+    manager = _FakeManager()
+    calls = []
+
+    def func(manager, command):
+        calls.append(len(calls))
+        if len(calls) == 1:
+            manager.lost = True
+            raise RuntimeError("Target page, context or browser has been closed")
+        return True, "ok"
+
+    command = _run(manager, func)
+    assert command.success and command.message == "ok"
+    assert len(calls) == 2 and manager.reconnects == 1
+    assert manager.checks == [False, True]
+
+
+def test_failure_without_lost_connection_is_reported():
+    manager = _FakeManager()
+    command = _run(manager, lambda manager, command: (False, "لم يتم العثور على العنصر"))
+    assert not command.success and command.message == "لم يتم العثور على العنصر"
+    assert manager.reconnects == 0
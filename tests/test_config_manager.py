@@ -0,0 +1,124 @@
+# tests/test_config_manager.py
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from utils.config_manager import ConfigError, ConfigManager, parse_config
+
+REPO_CONFIG = Path(__file__).resolve().parent.parent / "config" / "config.json"
+
+
+def _write(path: Path, data: dict):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    # وقت تعديل مختلف حتى على أنظمة ملفات دقتها ثانية
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def _problems(data: dict) -> list[str]:
+    with pytest.raises(ConfigError) as error:
+        parse_config(data, Path("config.json"))
+    return error.value.problems
+
+
+def test_repo_config_is_valid():
+    config = ConfigManager(REPO_CONFIG).load()
+    assert config.version == 1
+    assert config.section("monitoring")["pager"]["max_pages"] == 200
+
+
+def test_all_problems_are_reported_together():
+    problems = _problems({
+        "browser": {"timeout": 0, "reconnect": {"initial_delay": 5, "max_delay": 1}},
+        "data_entry": {"pipeline": "yes"},
+        "monitoring": {"pager": {"max_pages": -1}, "seen_ids_retention_days": "365", "row_id_field": "wo"},
+        "notifications": {"telegram_enabled": True, "max_requeues": -1},
+        "session_check": {"timeout": "5s"},
+        "network_profile": {"block_url_patterns": ["("]},
+        "session_pool": {"sessions": {"a": {"burst": 0}}},
+    })
+    for key in ("browser.timeout", "browser.reconnect.max_delay", "data_entry.pipeline", "monitoring.pager.max_pages",
+                "monitoring.seen_ids_retention_days", "monitoring.row_id_field", "notifications: telegram_enabled",
+                "notifications.max_requeues", "session_check.timeout", "network_profile.block_url_patterns",
+                "session_pool.sessions.a.burst"):
+        assert any(problem.startswith(key) for problem in problems), key
+
+
+def test_optional_values_accept_null():
+    config = parse_config({"monitoring": {"seen_ids_retention_days": None, "pager": {"event_target": None}},
+                           "data_entry": {"retry_delay": 1}}, Path("config.json"))
+    assert config.section("data_entry")["retry_delay"] == 1
+    assert config.section("browser") == {}
+
+
+def test_reload_applies_valid_changes_and_keeps_previous_on_error(tmp_path):
+    config_file = tmp_path / "config.json"
+    _write(config_file, {"monitoring": {"interval": 60}})
+    manager = ConfigManager(config_file)
+    manager.load()
+    received = []
+    manager.subscribe(received.append)
+
+    assert not manager.reload_if_changed()
+    _write(config_file, {"monitoring": {"interval": 30}})
+    assert manager.reload_if_changed()
+    assert manager.current.version == 2
+    assert received[-1].section("monitoring")["interval"] == 30
+
+    _write(config_file, {"monitoring": {"interval": -1}})
+    assert not manager.reload_if_changed()
+    config_file.write_text("{", encoding="utf-8")
+    assert not manager.reload_if_changed()
+    assert manager.current.section("monitoring")["interval"] == 30
+    assert len(received) == 1
+
+
+def test_watcher_reloads_in_background(tmp_path):
+    config_file = tmp_path / "config.json"
+    _write(config_file, {"sheet_name": "A"})
+    manager = ConfigManager(config_file, check_interval=0.02)
+    manager.load()
+    manager.start_watching()
+    try:
+        _write(config_file, {"sheet_name": "B"})
+        deadline = time.monotonic() + 5
+        while manager.current.raw["sheet_name"] != "B" and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        manager.stop_watching()
+    assert manager.current.raw["sheet_name"] == "B"
+
+
+STEP_SAMPLES = [
+    {"action": "goto", "url": "https://cafm.test/apptop.aspx"},
+    {"action": "click", "selector": "#menu", "new_tab": True, "url_contains_check": "WorkOrder", "timeout": 1500.0},
+    {"action": "wait_for_selector", "selector": "#grid", "wait_until": "load"},
+    {"action": "goto"},
+    {"action": "click", "selector": "  "},
+    {"action": "wait_for_selector", "selector": "#grid", "new_tab": True},
+    {"action": "hover", "selector": "#menu"},
+    {"action": "goto", "url": "https://cafm.test", "wait_until": "idle"},
+    {"action": "click", "selector": "#menu", "timeout": 0},
+    "goto",
+]
+
+
+@pytest.mark.parametrize("step", STEP_SAMPLES)
+def test_navigation_step_checks_match_compile_steps(step):
+    from utils.navigation_steps import NavigationStepError, compile_steps
+
+    try:
+        compile_steps([step])
+        compiles = True
+    except NavigationStepError:
+        compiles = False
+    try:
+        parse_config({"monitoring": {"navigation_steps": [step]}}, Path("config.json"))
+        valid = True
+    except ConfigError as error:
+        assert all(problem.startswith("monitoring.navigation_steps[1]") for problem in error.problems)
+        valid = False
+    assert valid == compiles
@@ -0,0 +1,68 @@
+# tests/test_data_entry.py
+# مدير المتصفح والصفحات وهمية؛ الصفوف تُقرأ من ملف Excel صغير في tmp_path
+import asyncio
+
+import pytest
+from openpyxl import Workbook
+
+from utils import progress_journal
+from utils.data_entry import DataEntryEngine, _put_while_workers_run
+
+
+class _StubPage:
+    async def close(self):
+        pass
+
+
+class _StubManager:
+    network_profile = None
+    is_ready = True
+
+    async def new_page(self):
+        return _StubPage()
+
+
+@pytest.fixture
+def workbook_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(progress_journal, "JOURNALS_DIR", tmp_path / "journals")
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Rows"
+    sheet.append(["Name"])
+    for index in range(50):
+        sheet.append([f"row {index}"])
+    path = tmp_path / "rows.xlsx"
+    workbook.save(path)
+    return path
+
+
+def test_put_raises_worker_error_instead_of_blocking():
+    async def scenario():
+        queue = asyncio.Queue(maxsize=1)
+        queue.put_nowait("full")
+
+        async def failing_worker():
+            raise ValueError("خطأ في العامل")
+
+        workers = [asyncio.create_task(failing_worker())]
+        await asyncio.wait_for(_put_while_workers_run(queue, "item", workers), 2)
+
+    with pytest.raises(ValueError, match="خطأ في العامل"):
+        asyncio.run(scenario())
+
+
+def test_batch_fails_when_all_workers_fail(workbook_file, tmp_path):
+    engine = DataEntryEngine("http://cafm.test/entry.aspx", {"Name": "#name"}, "#save", concurrency=2, pipeline=False)
+
+    async def broken_row(*args, **kwargs):
+        raise KeyError("عمود غير متوقع")
+
+    engine._process_row = broken_row
+
+    async def scenario():
+        return await asyncio.wait_for(
+            engine._run_batch(_StubManager(), None, str(workbook_file), "Rows", tmp_path / "results.xlsx", None), 5)
+
+    with pytest.raises(KeyError, match="عمود غير متوقع"):
+        asyncio.run(scenario())
+    assert (tmp_path / "results.xlsx").exists()
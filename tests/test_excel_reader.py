@@ -0,0 +1,48 @@
+# tests/test_excel_reader.py
+import pytest
+from openpyxl import Workbook
+
+from utils import excel_reader
+from utils.excel_reader import ExcelColumnsMissingError, ExcelRowReader
+
+
+@pytest.fixture
+def workbook_file(tmp_path):
+    workbook = Workbook()
+    workbook.active.title = "Other"
+    sheet = workbook.create_sheet("Orders")
+    sheet.append(["Work Order", "Site", "Notes"])
+    sheet.append(["WO-1", "A", "x"])
+    sheet.append([None, None, None])
+    sheet.append(["WO-2", "B", "y"])
+    path = tmp_path / "orders.xlsx"
+    workbook.save(path)
+    return path
+
+
+def test_reads_requested_columns(workbook_file):
+    rows = list(ExcelRowReader(str(workbook_file), "Orders", ["Site", "Work Order"]))
+    assert rows == [(2, {"Site": "A", "Work Order": "WO-1"}), (4, {"Site": "B", "Work Order": "WO-2"})]
+
+
+def test_resume_from_start_row(workbook_file):
+    rows = list(ExcelRowReader(str(workbook_file), "Orders", ["Work Order"], start_row=4))
+    assert rows == [(4, {"Work Order": "WO-2"})]
+
+
+def test_missing_sheet_and_columns(workbook_file):
+    with pytest.raises(KeyError):
+        list(ExcelRowReader(str(workbook_file), "Missing"))
+    with pytest.raises(ExcelColumnsMissingError):
+        list(ExcelRowReader(str(workbook_file), "Orders", ["Status"]))
+
+
+def test_falls_back_when_openpyxl_internals_change(workbook_file, monkeypatch):
+    def broken(excel_file, sheet_name):
+        raise AttributeError("'ExcelReader' object has no attribute 'find_sheets'")
+
+    monkeypatch.setattr(excel_reader, "_open_sheet_lazy", broken)
+    rows = list(ExcelRowReader(str(workbook_file), "Orders", ["Work Order"]))
+    assert rows == [(2, {"Work Order": "WO-1"}), (4, {"Work Order": "WO-2"})]
+    with pytest.raises(KeyError):
+        list(ExcelRowReader(str(workbook_file), "Missing"))
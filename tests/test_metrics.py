@@ -0,0 +1,60 @@
+# tests/test_metrics.py
+import asyncio
+
+import pytest
+
+from utils import metrics
+from utils.metrics import (MetricsRegistry, OUTCOME_CANCELLED, OUTCOME_ERROR, OUTCOME_FAIL, OUTCOME_OK, timed,
+                           timed_operation)
+
+
+@pytest.fixture
+def registry(monkeypatch) -> MetricsRegistry:
+    # سجل مستقل لكل اختبار بدل METRICS المشترك، ولا يكتب ملف أحداث
+    registry = MetricsRegistry(write_events=False)
+    monkeypatch.setattr(metrics, "METRICS", registry)
+    return registry
+
+
+def _outcomes(registry: MetricsRegistry, operation: str) -> dict[str, int]:
+    return registry.snapshot()[operation]["outcomes"]
+
+
+def test_async_outcomes_are_recorded(registry):
+    @timed_operation("test_async_outcomes")
+    async def operation(value):
+        if value == "boom":
+            raise RuntimeError("boom")
+        return value
+
+    asyncio.run(operation(True))
+    asyncio.run(operation(None))
+    with pytest.raises(RuntimeError):
+        asyncio.run(operation("boom"))
+    assert _outcomes(registry, "test_async_outcomes") == {OUTCOME_OK: 1, OUTCOME_FAIL: 1, OUTCOME_ERROR: 1}
+
+
+def test_cancelled_operation_is_recorded_and_reraised(registry):
+    @timed_operation("test_async_cancelled")
+    async def operation():
+        await asyncio.sleep(10)
+
+    async def scenario():
+        task = asyncio.create_task(operation())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert _outcomes(registry, "test_async_cancelled") == {OUTCOME_CANCELLED: 1}
+
+
+def test_timed_context_records_cancel(registry):
+    async def scenario():
+        with timed("test_timed_cancelled", registry=registry):
+            raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(scenario())
+    assert _outcomes(registry, "test_timed_cancelled") == {OUTCOME_CANCELLED: 1}
@@ -0,0 +1,90 @@
+# tests/test_monitoring_service.py
+import asyncio
+
+from utils.monitoring_service import MonitoringService, MonitoringPageError, PollResult
+from utils.navigation_steps import NavigationStepError
+
+
+def _service(tmp_path, **config) -> MonitoringService:
+    return MonitoringService(None, {"interval": 0.01, "seen_data_ids_file": str(tmp_path / "seen.db"), **config})
+
+
+def test_navigation_failure_is_retried_next_interval(tmp_path):
+    service = _service(tmp_path)
+    errors = [NavigationStepError(2, "انتهت المهلة"), MonitoringPageError("لا يوجد سياق")]
+    calls = []
+
+    async def poll_once():
+        calls.append(len(calls))
+        if errors:
+            raise errors.pop(0)
+        service.request_stop()
+        return PollResult(False)
+
+    service.poll_once = poll_once
+    asyncio.run(asyncio.wait_for(service.run_forever(), 5))
+    assert len(calls) == 3
+    assert service.page is None
+
+
+class _StubPage:
+    url = "http://cafm.test/WorkOrders.aspx"
+
+    def __init__(self, response=None):
+        self.closed = False
+        self.context = self
+        self.request = self
+        self.response = response
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+    async def get(self, url, **kwargs):
+        return self.response
+
+
+class _StubResponse:
+    def __init__(self, status: int, body: str = ""):
+        self.status = status
+        self.body = body
+        self.disposed = False
+
+    async def text(self):
+        return self.body
+
+    async def dispose(self):
+        self.disposed = True
+
+
+def test_failed_poll_closes_the_page(tmp_path):
+    service = _service(tmp_path)
+    page = service.page = _StubPage()
+
+    async def poll_once():
+        if not page.closed:
+            raise NavigationStepError(1, "انتهت المهلة")
+        service.request_stop()
+        return PollResult(False)
+
+    service.poll_once = poll_once
+    asyncio.run(asyncio.wait_for(service.run_forever(), 5))
+    assert page.closed
+    assert service.page is None
+
+
+def test_probe_disposes_response(tmp_path):
+    service = _service(tmp_path)
+    responses = [_StubResponse(200, "<table>1</table>"), _StubResponse(200, "<table>1</table>"), _StubResponse(500)]
+
+    async def scenario():
+        results = []
+        for response in responses:
+            service.page = _StubPage(response)
+            results.append(await service._probe_unchanged())
+        return results
+
+    assert asyncio.run(scenario()) == [False, True, False]
+    assert all(response.disposed for response in responses)
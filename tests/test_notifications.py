@@ -0,0 +1,123 @@
+# tests/test_notifications.py
+# مرسل وهمي بدل Telegram، ومخزن المعرفات في tmp_path
+import asyncio
+
+from utils.notifications import Alert, NotificationDispatcher, NotificationError, format_digest
+from utils.seen_ids_store import SeenIdStore
+
+
+class _FakeSender:
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on) # أرقام الاستدعاءات (من 1) التي تفشل
+        self.calls = 0
+        self.messages = []
+
+    def send(self, text: str):
+        self.calls += 1
+        if self.calls in self.fail_on:
+            raise NotificationError("HTTP 502", permanent=True)
+        self.messages.append(text)
+
+
+def _alerts(count: int, source: str = "") -> list[Alert]:
+    return [Alert(f"WO-{index}", "new", {"wo": f"WO-{index}"}, source) for index in range(count)]
+
+
+def _dispatcher(tmp_path, sender, **options) -> NotificationDispatcher:
+    options = {"digest_window": 0.01, "max_retries": 0, "retry_max_delay": 0.01, **options}
+    return NotificationDispatcher(sender, SeenIdStore(tmp_path / "notified.db", table="notified_ids"), **options)
+
+
+async def _until(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "انتهت المهلة"
+        await asyncio.sleep(0.01)
+
+
+def test_format_digest_excludes_tail_alerts():
+    alerts = _alerts(7)
+    messages = format_digest(alerts, max_items_per_message=2, max_messages=2)
+    assert [[alert.item_id for alert in message.alerts] for message in messages] == \
+        [["WO-0", "WO-1"], ["WO-2", "WO-3"]]
+    assert messages[-1].text.endswith("و 3 أخرى (تُرسل لاحقًا)")
+
+
+def test_format_digest_groups_by_source():
+    messages = format_digest(_alerts(2, "A") + _alerts(1, "B"))
+    assert len(messages) == 2
+    assert "(A)" in messages[0].text and len(messages[0].alerts) == 2
+
+
+def test_failed_message_records_only_sent_ids_and_requeues_rest(tmp_path):
+    sender = _FakeSender(fail_on={2})
+    dispatcher = _dispatcher(tmp_path, sender, max_items_per_message=2, max_messages_per_digest=3,
+                             retry_max_delay=60)
+
+    async def scenario():
+        dispatcher.start()
+        requeued = await dispatcher._deliver(_alerts(7))
+        stored = dispatcher.notified_store.contains_many(f"WO-{index}" for index in range(7))
+        waiting = len(dispatcher._requeued)
+        sent = dispatcher.stats.alerts_sent
+        # الإيقاف يرسل المنتظر لإعادة المحاولة دون انتظار تأخيره
+        await dispatcher.stop(flush_timeout=1)
+        return requeued, stored, waiting, sent
+
+    requeued, stored, waiting, sent = asyncio.run(scenario())
+    assert stored == {"WO-0", "WO-1"}
+    assert [alert.item_id for alert in requeued] == ["WO-2", "WO-3", "WO-4", "WO-5", "WO-6"]
+    assert all(alert.attempts == 1 for alert in requeued)
+    assert waiting == 1 and sent == 2
+    assert dispatcher.stats.alerts_sent == 7
+    assert sum(text.count("• WO-") for text in sender.messages) == 7
+
+
+def test_failed_alerts_are_delivered_after_backoff(tmp_path):
+    sender = _FakeSender(fail_on={1})
+    dispatcher = _dispatcher(tmp_path, sender)
+
+    async def scenario():
+        dispatcher.start()
+        assert dispatcher.submit(_alerts(3)) == 3
+        await _until(lambda: dispatcher.stats.alerts_sent == 3)
+        # المعاد للطابور لا يُضاف مرة ثانية قبل إرساله، وما أُرسل لا يتكرر
+        assert dispatcher.submit(_alerts(3)) == 3
+        await dispatcher.stop(flush_timeout=1)
+
+    asyncio.run(scenario())
+    assert len(sender.messages) == 1
+    assert dispatcher.stats.requeued == 3
+    assert dispatcher.stats.deduplicated == 3
+    assert dispatcher.stats.undelivered == 0
+
+
+def test_tail_alerts_go_out_in_next_digest(tmp_path):
+    sender = _FakeSender()
+    dispatcher = _dispatcher(tmp_path, sender, max_items_per_message=2, max_messages_per_digest=1)
+
+    async def scenario():
+        dispatcher.start()
+        dispatcher.submit(_alerts(5))
+        await _until(lambda: dispatcher.stats.alerts_sent == 5)
+        await dispatcher.stop(flush_timeout=1)
+
+    asyncio.run(scenario())
+    assert len(sender.messages) == 3
+    with SeenIdStore(tmp_path / "notified.db", table="notified_ids") as store:
+        assert len(store) == 5
+
+
+def test_alerts_are_given_up_after_max_requeues(tmp_path):
+    sender = _FakeSender(fail_on=range(1, 100))
+    dispatcher = _dispatcher(tmp_path, sender, max_requeues=2)
+
+    async def scenario():
+        dispatcher.start()
+        dispatcher.submit(_alerts(2))
+        await _until(lambda: dispatcher.stats.undelivered == 2)
+        await dispatcher.stop(flush_timeout=1)
+
+    asyncio.run(scenario())
+    assert sender.calls == 3
+    assert dispatcher.stats.alerts_sent == 0
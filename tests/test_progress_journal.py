@@ -0,0 +1,93 @@
+# tests/test_progress_journal.py
+from utils.progress_journal import STATE_FAILED, STATE_STARTED, STATE_SUCCESS, ProgressJournal
+
+
+def _run(journal: ProgressJournal, rows: dict[int, str | None]):
+    # rows: رقم الصف -> النتيجة (None = بدأ ولم ينتهِ)
+    for row_number, outcome in rows.items():
+        key = f"K{row_number}"
+        journal.mark_started(key, row_number)
+        if outcome is not None:
+            journal.mark_finished(key, row_number, outcome == STATE_SUCCESS, "خطأ\tفي\nالنموذج")
+
+
+def test_resume_after_crash_without_checkpoint(tmp_path):
+    journal = ProgressJournal(tmp_path / "run.journal")
+    _run(journal, {2: STATE_SUCCESS, 3: STATE_SUCCESS, 4: STATE_FAILED, 5: None, 6: STATE_SUCCESS})
+    journal._file.close() # انهيار: لا close ولا نقطة تفتيش
+
+    resumed = ProgressJournal(tmp_path / "run.journal").load()
+    assert resumed.resume_row == 4
+    assert resumed.is_done("K3") and not resumed.is_done("K4")
+    assert resumed.is_in_doubt("K5")
+    assert resumed.counts() == {STATE_SUCCESS: 3, STATE_FAILED: 1, STATE_STARTED: 1}
+
+
+def test_checkpoint_compacts_done_rows_and_keeps_exceptions(tmp_path):
+    journal = ProgressJournal(tmp_path / "run.journal", checkpoint_every=4)
+    _run(journal, {2: STATE_SUCCESS, 3: STATE_FAILED, 4: STATE_SUCCESS, 5: STATE_SUCCESS})
+    _run(journal, {6: STATE_SUCCESS, 7: None})
+    journal.close()
+    assert (tmp_path / "run.journal.ckpt").exists()
+
+    resumed = ProgressJournal(tmp_path / "run.journal").load()
+    assert "K2" not in resumed._entries # الناجحة قبل العلامة المائية لا تبقى في الذاكرة
+    assert resumed.is_done("K2", 2) and resumed.is_done("K6", 6)
+    assert resumed.state("K3", 3) == STATE_FAILED
+    assert resumed.is_in_doubt("K7", 7)
+    assert resumed.resume_row == 3
+
+    # إعادة الصف الفاشل ثم الاستئناف من جديد
+    resumed.mark_started("K3", 3)
+    resumed.mark_finished("K3", 3, True)
+    resumed.mark_finished("K7", 7, True)
+    resumed.close()
+    assert ProgressJournal(tmp_path / "run.journal").load().resume_row == 8
+
+
+def test_truncated_tail_and_stale_checkpoint(tmp_path):
+    journal = ProgressJournal(tmp_path / "run.journal")
+    _run(journal, {2: STATE_SUCCESS, 3: STATE_SUCCESS})
+    journal.close()
+    with open(tmp_path / "run.journal", "ab") as f:
+        f.write(b"success\t4\tK4") # سطر مبتور بسبب انهيار أثناء الكتابة
+    assert ProgressJournal(tmp_path / "run.journal").load().resume_row == 4
+
+    # نقطة تفتيش تشير بعد نهاية السجل تُتجاهل ويُقرأ السجل كاملًا
+    (tmp_path / "run.journal.ckpt").write_text('{"offset": 999999, "entries": {}}', encoding="utf-8")
+    resumed = ProgressJournal(tmp_path / "run.journal").load()
+    assert resumed.is_done("K3") and resumed.resume_row == 4
+
+
+def test_discard_starts_over(tmp_path):
+    journal = ProgressJournal(tmp_path / "run.journal")
+    _run(journal, {2: STATE_SUCCESS})
+    journal.discard()
+    assert not (tmp_path / "run.journal").exists()
+    assert ProgressJournal(tmp_path / "run.journal").load().resume_row is None
+
+
+def test_replayed_keys_are_counted_once(tmp_path):
+    journal = ProgressJournal(tmp_path / "run.journal")
+    _run(journal, {2: STATE_SUCCESS, 3: STATE_FAILED, 4: STATE_SUCCESS})
+    _run(journal, {2: STATE_SUCCESS, 3: STATE_SUCCESS})
+    assert journal.counts() == {STATE_SUCCESS: 3}
+    journal._file.close() # بلا نقطة تفتيش: الاستئناف يعيد قراءة كل السجلات المكررة
+    assert ProgressJournal(tmp_path / "run.journal").load().counts() == {STATE_SUCCESS: 3}
+
+
+def test_replayed_keys_after_checkpoint_are_counted_once(tmp_path):
+    journal = ProgressJournal(tmp_path / "run.journal", checkpoint_every=2)
+    _run(journal, {2: STATE_SUCCESS, 3: STATE_SUCCESS, 4: STATE_SUCCESS, 5: STATE_SUCCESS})
+    journal.close()
+
+    resumed = ProgressJournal(tmp_path / "run.journal", checkpoint_every=2).load()
+    assert resumed._entries == {} and resumed.counts() == {STATE_SUCCESS: 4}
+    # الصفان 2 و 3 يُعاد إرسالهما (مثل تشغيل بدون resume على نفس السجل)
+    _run(resumed, {2: STATE_SUCCESS, 3: None})
+    assert resumed.counts() == {STATE_SUCCESS: 3, STATE_STARTED: 1}
+    resumed.close()
+
+    reloaded = ProgressJournal(tmp_path / "run.journal").load()
+    assert reloaded.counts() == {STATE_SUCCESS: 3, STATE_STARTED: 1}
+    assert reloaded.is_in_doubt("K3", 3) and reloaded.resume_row == 3
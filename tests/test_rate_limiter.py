@@ -0,0 +1,41 @@
+# tests/test_rate_limiter.py
+import asyncio
+import time
+
+from utils.rate_limiter import TokenBucket
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(0)
+    assert not bucket.is_limited
+    assert asyncio.run(bucket.acquire()) == 0.0
+
+
+def test_per_minute_converts_rate():
+    bucket = TokenBucket.per_minute(120, burst=3, name="acct")
+    assert bucket.rate == 2.0 and bucket.capacity == 3.0 and bucket.name == "acct"
+    assert TokenBucket(1, capacity=0).capacity == 1.0
+
+
+def test_burst_then_steady_rate():
+    bucket = TokenBucket(20, capacity=2, name="test_burst")
+
+    async def scenario():
+        return [await bucket.acquire() for _ in range(4)]
+
+    waits = asyncio.run(scenario())
+    assert waits[0] < 0.01 and waits[1] < 0.01 # الدفعة الأولى حتى capacity بلا انتظار
+    assert all(0.03 < wait < 0.2 for wait in waits[2:]) # ثم رمز كل 50 ms
+    assert bucket.waits == 2
+
+
+def test_concurrent_acquires_share_the_rate():
+    bucket = TokenBucket(50, capacity=1)
+
+    async def scenario():
+        started_at = time.perf_counter()
+        await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+        return time.perf_counter() - started_at
+
+    # رمز فوري ثم 5 رموز بمعدل 50 في الثانية
+    assert asyncio.run(scenario()) >= 0.09
@@ -0,0 +1,59 @@
+# tests/test_seen_ids_store.py
+import json
+import time
+
+import pytest
+
+from utils.seen_ids_store import SeenIdStore, resolve_store_path
+
+
+def test_add_and_contains(tmp_path):
+    with SeenIdStore(tmp_path / "seen.db") as store:
+        assert store.add_many(["WO-1", "WO-2", "WO-1", 3]) == ["WO-1", "WO-2", "3"]
+        assert store.add_many(["WO-2", "WO-4"]) == ["WO-4"]
+        assert not store.add("WO-1") and store.add("WO-5")
+        assert "WO-1" in store and 3 in store and "WO-9" not in store
+        assert store.contains_many(["WO-1", "WO-9", "WO-4"]) == {"WO-1", "WO-4"}
+        assert len(store) == 5
+    # المعرفات باقية بعد إعادة الفتح
+    with SeenIdStore(tmp_path / "seen.db") as store:
+        assert len(store) == 5
+
+
+def test_contains_many_beyond_variable_limit(tmp_path):
+    ids = [f"WO-{index}" for index in range(2500)]
+    with SeenIdStore(tmp_path / "seen.db") as store:
+        assert len(store.add_many(ids)) == 2500
+        assert store.contains_many(ids + ["missing"]) == set(ids)
+
+
+def test_prune_by_age(tmp_path):
+    now = time.time()
+    with SeenIdStore(tmp_path / "seen.db") as store:
+        store.add_many(["old"], seen_at=now - 10 * 86400)
+        store.add_many(["new"], seen_at=now)
+        assert store.evict_older_than(5 * 86400) == 1
+        assert "old" not in store and "new" in store
+        store.add_many(["old"], seen_at=now - 10 * 86400)
+    # الفتح يحذف ما تجاوز retention_days
+    with SeenIdStore(tmp_path / "seen.db", retention_days=5) as store:
+        assert "old" not in store and "new" in store
+        assert store.evict_expired() == 0
+
+
+def test_tables_are_separate(tmp_path):
+    with SeenIdStore(tmp_path / "ids.db") as seen, SeenIdStore(tmp_path / "ids.db", table="notified_ids") as notified:
+        seen.add("WO-1")
+        assert "WO-1" not in notified
+    with pytest.raises(ValueError):
+        SeenIdStore(tmp_path / "ids.db", table="x; DROP TABLE seen_ids")
+
+
+def test_import_legacy_json(tmp_path):
+    db_file, json_file = resolve_store_path(tmp_path / "seen_work_orders.json")
+    json_file.write_text(json.dumps(["WO-1", "WO-2"]), encoding="utf-8")
+    with SeenIdStore(db_file) as store:
+        assert store.import_json(json_file) == 2
+        assert store.import_json(json_file) == 0
+        assert "WO-2" in store
+    assert json_file.with_suffix(".json.migrated").exists()
@@ -0,0 +1,60 @@
+# tests/test_table_extractor.py
+# page.evaluate مستبدل بدالة تعيد نتيجة السكربت مباشرة، فلا حاجة لمتصفح
+import asyncio
+
+import pytest
+
+from utils.monitoring_service import MonitoringService
+from utils.table_extractor import TableExtractor
+
+
+class _StubPage:
+    url = "http://cafm.test/WorkOrders.aspx"
+
+    def __init__(self, raw: dict):
+        self.raw = raw
+        self.calls = []
+
+    async def evaluate(self, script, arg):
+        self.calls.append(arg)
+        return self.raw
+
+
+def _raw(ids, hashes, columns=None, extracted=None):
+    return {"found": True, "pages": 1, "error": None, "fingerprint": "f", "ids": ids, "hashes": hashes,
+            "extracted": list(range(len(hashes))) if extracted is None else extracted, "columns": columns or {}}
+
+
+def test_ids_fall_back_to_row_hash_without_id_rule():
+    extractor = TableExtractor("#gv", [])
+    page = _StubPage(_raw([None, None], ["h1", "h2"]))
+    data = asyncio.run(extractor.extract(page))
+    assert page.calls[0]["idRule"] is None
+    assert data.ids == ["h1", "h2"]
+
+
+def test_empty_id_cell_falls_back_to_row_hash():
+    extractor = TableExtractor("#gv", [{"name": "wo", "column": 0}], id_field="wo")
+    page = _StubPage(_raw(["WO-1", None, ""], ["h1", "h2", "h3"], {"wo": ["WO-1", None, ""]}))
+    data = asyncio.run(extractor.extract(page))
+    assert data.ids == ["WO-1", "h2", "h3"]
+    assert data.records()[0] == {"wo": "WO-1"}
+
+
+def test_invalid_rule_is_rejected():
+    with pytest.raises(ValueError):
+        TableExtractor("#gv", [{"name": "wo"}])
+
+
+def test_monitor_poll_without_extraction_rules(tmp_path):
+    # table_selector بدون data_extraction_rules: كانت الدورة تفشل بـ IndexError
+    service = MonitoringService(None, {"table_selector": "#gv", "seen_data_ids_file": str(tmp_path / "seen.db")})
+    service.page = _StubPage(_raw([None, None], ["h1", "h2"]))
+    service.page.is_closed = lambda: False
+    service.seen_ids.open()
+    try:
+        result = asyncio.run(service.poll_once())
+    finally:
+        service.seen_ids.close()
+    assert result.changed and result.total_rows == 2
+    assert len(result.new_rows) == 2
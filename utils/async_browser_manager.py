@@ -0,0 +1,324 @@
+# utils/async_browser_manager.py
+# نسخة غير متزامنة من BrowserManager مبنية على playwright.async_api.
+# كل العمليات تعمل على حلقة أحداث واحدة في خيط خلفي (AsyncLoopThread)، لذلك يمكن تنفيذ
+# عشرات عمليات الانتقال والتحقق والإدخال بالتوازي دون إنشاء خيط جديد لكل عملية.
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable
+
+from playwright.async_api import async_playwright, Playwright, Browser, BrowserContext, Page, Error as PlaywrightError
+
+from utils.async_loop_thread import AsyncLoopThread # يبقى متاحًا من هذه الوحدة كما كان
+from utils.network_profile import NetworkProfile
+from utils.metrics import timed_operation
+from utils.browser_manager import (launch_options, SessionHealth, SESSION_VALID, SESSION_INVALID, SESSION_UNKNOWN,
+                                   SESSION_BODY_SCAN_BYTES, DEFAULT_CDP_URL, DEFAULT_CDP_TIMEOUT,
+                                   classify_session_cookies, classify_session_response)
+
+
+class AsyncBrowserManager:
+    def __init__(self, logger_instance=None, network_profile: NetworkProfile | None = None):
+        self.playwright_instance: Playwright | None = None
+        self.browser: Browser | None = None
+        self.context: BrowserContext | None = None
+        self.page: Page | None = None
+
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+        self.is_connected_to_persistent_cdp = False
+        self.is_launched_browser = False
+        self.cdp_url: str | None = None
+        self._lock: asyncio.Lock | None = None
+        # في المتصفح المُطلق يُطبق على السياق كله، وفي متصفح CDP على الصفحات التي يفتحها البرنامج فقط
+        self.network_profile = network_profile
+        # طريقة آخر اتصال ناجح، لتعيد reconnect إنشاءه: ("cdp", url, timeout) أو ("session", file, headless)
+        self.connection_target: tuple | None = None
+        self._disconnect_listeners: list[Callable[[], None]] = []
+        self._expected_disconnect = False # إغلاق يطلبه البرنامج لا يُعامل كانقطاع
+
+    @classmethod
+    def for_context(cls, browser: Browser, context: BrowserContext, network_profile: NetworkProfile | None = None,
+                    logger_instance=None) -> "AsyncBrowserManager":
+        # مدير لسياق يملكه غيره (مثل مجمع الجلسات): يفتح الصفحات ويفحص الجلسة، وإغلاقه لا يغلق السياق ولا المتصفح
+        manager = cls(logger_instance=logger_instance, network_profile=network_profile)
+        manager.browser = browser
+        manager.context = context
+        return manager
+
+    def _get_lock(self) -> asyncio.Lock:
+        # القفل يُنشأ داخل الحلقة التي تستخدمه
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def is_ready(self) -> bool:
+        return self.context is not None and self.browser is not None and self.browser.is_connected()
+
+    async def _ensure_playwright(self) -> Playwright:
+        if not self.playwright_instance:
+            self.playwright_instance = await async_playwright().start()
+        return self.playwright_instance
+
+    @timed_operation("prewarm_playwright")
+    async def prewarm(self) -> bool:
+        # يشغل عملية مشغل Playwright مسبقًا (مثلًا بعد ظهور الواجهة) حتى لا يدفع أول اتصال أو إطلاق زمن بدئها
+        async with self._get_lock():
+            if self.playwright_instance:
+                return True
+            started_at = time.perf_counter()
+            await self._ensure_playwright()
+            self.logger.info(f"(async) تم تشغيل Playwright مسبقًا خلال {(time.perf_counter() - started_at) * 1000:.0f} ms.")
+            return True
+
+    # --- مراقبة الانقطاع ---
+    def add_disconnect_listener(self, listener: Callable[[], None]):
+        # listener يُستدعى في حلقة المدير عند انقطاع المتصفح بشكل غير متوقع (أُغلق أو انهار أو أعيد تشغيله)
+        if listener not in self._disconnect_listeners:
+            self._disconnect_listeners.append(listener)
+
+    def remove_disconnect_listener(self, listener: Callable[[], None]):
+        if listener in self._disconnect_listeners:
+            self._disconnect_listeners.remove(listener)
+
+    def _watch_browser(self):
+        self.browser.on("disconnected", self._on_browser_disconnected)
+
+    def _on_browser_disconnected(self, browser: Browser):
+        if self._expected_disconnect or browser is not self.browser:
+            return
+        self.logger.warning("(async) انقطع الاتصال بالمتصفح.")
+        for listener in list(self._disconnect_listeners):
+            try:
+                listener()
+            except Exception as e:
+                self.logger.error(f"(async) خطأ في معالج انقطاع المتصفح: {e}", exc_info=True)
+
+    @timed_operation("connect_cdp", url_arg="cdp_url")
+    async def connect_to_existing_cdp_browser(self, cdp_url: str = DEFAULT_CDP_URL,
+                                              timeout: int = DEFAULT_CDP_TIMEOUT) -> bool:
+        async with self._get_lock():
+            if self.is_ready and self.is_connected_to_persistent_cdp:
+                return True
+            try:
+                playwright = await self._ensure_playwright()
+                self.logger.info(f"(async) محاولة الاتصال بالمتصفح على {cdp_url}...")
+                self.browser = await playwright.chromium.connect_over_cdp(cdp_url, timeout=timeout)
+                self.context = self.browser.contexts[0] if self.browser.contexts else await self.browser.new_context()
+                self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
+                self.is_connected_to_persistent_cdp = True
+                self.cdp_url = cdp_url
+                self.connection_target = ("cdp", cdp_url, timeout)
+                self._watch_browser()
+                self.logger.info("(async) تم الاتصال بالمتصفح الموجود (CDP) بنجاح!")
+                return True
+            except PlaywrightError as e:
+                self.logger.error(f"(async) فشل الاتصال بالمتصفح الموجود على {cdp_url}: {e}")
+            except Exception as e:
+                self.logger.error(f"(async) خطأ غير متوقع أثناء الاتصال بالمتصفح: {e}", exc_info=True)
+            await self._drop_browser()
+            return False
+
+    @timed_operation("launch_browser", target_arg="session_file_path")
+    async def launch_new_browser_with_session(self, session_file_path: str, headless: bool = True,
+                                              timeout: int = 30000) -> bool:
+        async with self._get_lock():
+            if self.is_ready:
+                return True
+            session_file = Path(session_file_path)
+            if not session_file.is_file():
+                self.logger.error(f"(async) ملف الجلسة غير موجود: {session_file}")
+                return False
+            try:
+                started_at = time.perf_counter()
+                playwright = await self._ensure_playwright()
+                self.browser = await playwright.chromium.launch(timeout=timeout, **launch_options(headless))
+                self.is_launched_browser = True # يُغلق عند فشل ما بعده
+                self.context = await self.browser.new_context(storage_state=str(session_file))
+                if self.network_profile is not None:
+                    await self.network_profile.attach_async(self.context)
+                self.page = await self.context.new_page()
+                self.connection_target = ("session", str(session_file), headless)
+                self._watch_browser()
+                self.logger.info(f"(async) تم إطلاق متصفح من الجلسة {session_file} خلال {time.perf_counter() - started_at:.2f} ث.")
+                return True
+            except PlaywrightError as e:
+                self.logger.error(f"(async) خطأ Playwright أثناء إطلاق المتصفح من الجلسة {session_file}: {e}")
+            except Exception as e:
+                self.logger.error(f"(async) خطأ عام أثناء إطلاق المتصفح من الجلسة: {e}", exc_info=True)
+            await self._drop_browser()
+            return False
+
+    async def new_page(self) -> Page | None:
+        if not self.is_ready:
+            self.logger.warning("(async) لا يوجد سياق متصفح صالح لفتح صفحة جديدة.")
+            return None
+        page = await self.context.new_page()
+        if self.network_profile is not None and not self.is_launched_browser:
+            await self.network_profile.attach_async(page)
+        return page
+
+    async def get_current_page(self) -> Page | None:
+        if self.page and not self.page.is_closed():
+            return self.page
+        self.page = await self.new_page()
+        return self.page
+
+    @timed_operation("navigate", url_arg="url")
+    async def navigate_to_url(self, url: str, page: Page | None = None, timeout: int = 60000,
+                              wait_until: str = "domcontentloaded") -> bool:
+        page = page or await self.get_current_page()
+        if not page:
+            self.logger.error("(async) لا توجد صفحة صالحة للانتقال إليها.")
+            return False
+        try:
+            if self.network_profile is not None:
+                self.network_profile.reset_page_stats(page)
+            await page.goto(url, timeout=timeout, wait_until=wait_until) # type: ignore
+            self.logger.info(f"(async) تم الانتقال بنجاح إلى: {page.url}")
+            if self.network_profile is not None:
+                self.logger.info(f"(async) الشبكة: {self.network_profile.stats_for(page).summary()}")
+            return True
+        except PlaywrightError as e:
+            self.logger.error(f"(async) خطأ Playwright أثناء الانتقال إلى {url}: {e}")
+        except Exception as e:
+            self.logger.error(f"(async) خطأ عام أثناء الانتقال إلى {url}: {e}", exc_info=True)
+        return False
+
+    @timed_operation("check_element", target_arg="selector")
+    async def check_element_exists(self, selector: str, page: Page | None = None, timeout: int = 10000) -> bool:
+        page = page or await self.get_current_page()
+        if not page:
+            self.logger.error("(async) لا توجد صفحة صالحة للتحقق من العنصر.")
+            return False
+        try:
+            await page.locator(selector).wait_for(state="visible", timeout=timeout)
+            return True
+        except PlaywrightError:
+            self.logger.warning(f"(async) العنصر '{selector}' لم يتم العثور عليه أو لم يصبح مرئيًا خلال المهلة المحددة.")
+            return False
+
+    async def check_elements_exist(self, selectors: list[str], page: Page | None = None,
+                                   timeout: int = 10000) -> dict[str, bool]:
+        # كل الانتظارات تعمل بالتوازي، فالزمن الكلي هو زمن أبطأ عنصر لا مجموع الأزمنة
+        page = page or await self.get_current_page()
+        results = await asyncio.gather(*(self.check_element_exists(selector, page, timeout) for selector in selectors))
+        return dict(zip(selectors, results))
+
+    @timed_operation("check_session", url_arg="probe_url")
+    async def check_session_health(self, probe_url: str | None = None, auth_cookie_names: tuple[str, ...] = (),
+                                   login_url_marker: str = "applogin", login_body_marker: str = 'type="password"',
+                                   timeout: int = 5000, dom_selector: str | None = None,
+                                   dom_timeout: int = 10000) -> SessionHealth:
+        # نفس منطق BrowserManager.check_session_health: كوكيز ثم طلب HTTP واحد ثم DOM عند الغموض فقط
+        started_at = time.perf_counter()
+        if not self.is_ready:
+            return SessionHealth(SESSION_INVALID, "cookies", 0.0, "لا يوجد سياق متصفح صالح")
+
+        method, status, detail = "cookies", SESSION_UNKNOWN, ""
+        try:
+            cookies = await self.context.cookies([probe_url]) if probe_url else await self.context.cookies()
+            status, detail = classify_session_cookies(cookies, auth_cookie_names)
+            if status == SESSION_UNKNOWN and probe_url:
+                method = "request"
+                response = await self.context.request.get(probe_url, timeout=timeout, max_redirects=0,
+                                                          fail_on_status_code=False)
+                try:
+                    body = (await response.body())[:SESSION_BODY_SCAN_BYTES].decode("utf-8", errors="replace") \
+                        if login_body_marker and 200 <= response.status < 300 else ""
+                    status, detail = classify_session_response(response.status, response.url,
+                                                                response.headers.get("location", ""), body,
+                                                                login_url_marker, login_body_marker)
+                finally:
+                    await response.dispose()
+        except PlaywrightError as e:
+            status, detail = SESSION_UNKNOWN, f"خطأ أثناء الفحص السريع: {e}"
+
+        # صفحة فارغة لا تفيد في فحص DOM، فتبقى النتيجة غير حاسمة
+        if status == SESSION_UNKNOWN and dom_selector and self.page and self.page.url != "about:blank":
+            method = "dom"
+            found = await self.check_element_exists(dom_selector, timeout=dom_timeout)
+            status = SESSION_VALID if found else SESSION_INVALID
+            detail = f"{detail}؛ فحص الصفحة: {'العنصر موجود' if found else 'العنصر غير موجود'}"
+        health = SessionHealth(status, method, (time.perf_counter() - started_at) * 1000, detail)
+        self.logger.info(f"(async) فحص الجلسة ({health.method}): {health.status} خلال {health.duration_ms:.0f} ms - {health.detail}")
+        return health
+
+    @timed_operation("save_session", target_arg="file_path")
+    async def save_current_session_state(self, file_path: str) -> bool:
+        if not self.context:
+            self.logger.warning("(async) لا يوجد سياق متصفح صالح لحفظ حالته.")
+            return False
+        try:
+            session_file = Path(file_path)
+            session_file.parent.mkdir(parents=True, exist_ok=True)
+            await self.context.storage_state(path=str(session_file))
+            self.logger.info(f"(async) تم حفظ حالة الجلسة بنجاح إلى: {session_file}")
+            return True
+        except Exception as e:
+            self.logger.error(f"(async) خطأ في حفظ حالة الجلسة إلى {file_path}: {e}", exc_info=True)
+            return False
+
+    @timed_operation("restore_session_cookies", target_arg="session_file_path")
+    async def restore_session_cookies(self, session_file_path: str) -> bool:
+        # يعيد كوكيز ملف الجلسة المحفوظ إلى السياق الحالي (مثلًا بعد إعادة تشغيل متصفح CDP بملف تعريف فقد جلسته)
+        if not self.context:
+            return False
+        try:
+            state = json.loads(Path(session_file_path).read_text(encoding="utf-8"))
+            cookies = state.get("cookies", [])
+            if cookies:
+                await self.context.add_cookies(cookies)
+            self.logger.info(f"(async) تمت استعادة {len(cookies)} كوكي من {session_file_path}.")
+            return bool(cookies)
+        except (OSError, ValueError, PlaywrightError) as e:
+            self.logger.error(f"(async) تعذرت استعادة الجلسة من {session_file_path}: {e}")
+            return False
+
+    async def reconnect(self, session_file_path: str | None = None, headless: bool = True) -> bool:
+        # يعيد إنشاء الاتصال المفقود بنفس طريقة آخر اتصال (CDP أو إطلاق من الجلسة) مع إبقاء Playwright يعمل.
+        # session_file_path: إطلاق متصفح من الجلسة المحفوظة بدل انتظار عودة متصفح CDP
+        target = self.connection_target
+        async with self._get_lock():
+            await self._drop_browser()
+        if session_file_path is not None:
+            return await self.launch_new_browser_with_session(session_file_path, headless)
+        if target is None:
+            return False
+        if target[0] == "session":
+            return await self.launch_new_browser_with_session(target[1], target[2])
+        return await self.connect_to_existing_cdp_browser(target[1], target[2])
+
+    async def close(self):
+        async with self._get_lock():
+            await self._reset()
+            self.connection_target = None
+
+    async def _drop_browser(self):
+        # المتصفح المُطلق يُغلق، أما متصفح CDP الدائم فيبقى مفتوحًا ويُقطع الاتصال به فقط.
+        # Playwright نفسه يبقى يعمل لإعادة الاتصال بسرعة.
+        if self.is_launched_browser and self.browser:
+            self._expected_disconnect = True
+            try:
+                await self.browser.close()
+            except Exception as e:
+                self.logger.warning(f"(async) خطأ أثناء إغلاق المتصفح المُطلق: {e}")
+            finally:
+                self._expected_disconnect = False
+        self.page = None
+        self.context = None
+        self.browser = None
+        self.is_connected_to_persistent_cdp = False
+        self.is_launched_browser = False
+        self.cdp_url = None
+
+    async def _reset(self):
+        await self._drop_browser()
+        if self.playwright_instance:
+            try:
+                await self.playwright_instance.stop()
+            except Exception as e:
+                self.logger.warning(f"(async) خطأ أثناء إيقاف Playwright: {e}")
+        self.playwright_instance = None
@@ -0,0 +1,69 @@
+# utils/async_loop_thread.py
+# حلقة asyncio في خيط خلفي واحد. منفصلة عن async_browser_manager حتى يمكن إنشاؤها (مثلًا عند بناء
+# الواجهة) دون استيراد Playwright.
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable
+
+
+class AsyncLoopThread:
+    # يستضيف حلقة asyncio في خيط خلفي واحد. الاستدعاء من أي خيط (مثل خيط واجهة Qt)
+    # يتم عبر submit الذي يعيد concurrent.futures.Future دون أن يحجب الخيط المستدعي.
+    def __init__(self, name: str = "BrowserAsyncLoop"):
+        self.name = name
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._ready = threading.Event()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop | None:
+        return self._loop
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_loop, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+            self._loop = None
+
+    def submit(self, coro: Awaitable, callback: Callable[[concurrent.futures.Future], None] | None = None
+               ) -> concurrent.futures.Future:
+        # callback يُستدعى في خيط الحلقة عند انتهاء العملية؛ إرسال إشارة Qt منه آمن
+        # لأن Qt ينقل الإشارات بين الخيوط عبر طابور أحداث الخيط المستقبِل.
+        if not self.is_running():
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        if callback:
+            future.add_done_callback(callback)
+        return future
+
+    def run(self, coro: Awaitable, timeout: float | None = None) -> Any:
+        # نسخة حاجبة لاستخدامها من خيوط غير خيط الواجهة
+        return self.submit(coro).result(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        if not self.is_running():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
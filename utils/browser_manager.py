@@ -1,18 +1,165 @@
 # utils/browser_manager.py
 from playwright.sync_api import sync_playwright, Playwright, Browser, Page, Error as PlaywrightError
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Iterator
+from urllib.parse import urlsplit
+import random
 import time 
 import logging 
 
+from utils.network_profile import NetworkProfile
+from utils.metrics import timed_operation
+
 # اسم مجلد بيانات المستخدم للمتصفح الدائم الذي يشغله المستخدم يدويًا
 # يجب أن يكون هذا المسار متوافقًا مع ما يستخدمه المستخدم عند تشغيل المتصفح يدويًا
 # هذا الكلاس لا يُطلق هذا المتصفح، بل يتصل به فقط.
 # USER_DATA_DIR_CDP_PERSISTENT = Path(r"C:\MyPersistentChromeProfileForLoginManager") # كمثال، هذا يجب أن يحدده المستخدم
 
+DEFAULT_CDP_URL = "http://localhost:9222"
+DEFAULT_CDP_TIMEOUT = 15000 # ms
+
+# علامات تشغيل Chromium للمهام غير المرئية: بدون GPU وبدون خدمات خلفية لا نحتاجها
+HEADLESS_LAUNCH_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--mute-audio",
+]
+
+
+def headless_from_config(config: dict, for_monitoring: bool = False) -> bool:
+    # المراقبة لها إعداد مستقل (monitoring.headless_monitoring)، وباقي المهام تتبع browser.headless
+    browser_headless = bool(config.get("browser", {}).get("headless", False))
+    if for_monitoring:
+        return bool(config.get("monitoring", {}).get("headless_monitoring", browser_headless))
+    return browser_headless
+
+
+def launch_options(headless: bool) -> dict:
+    return {"headless": headless, "args": HEADLESS_LAUNCH_ARGS if headless else []}
+
+
+def cdp_options(config: dict) -> dict:
+    # عنوان المتصفح الدائم ومهلة الاتصال من browser.cdp_url و browser.cdp_connect_timeout
+    browser_config = config.get("browser", {})
+    return {
+        "cdp_url": browser_config.get("cdp_url") or DEFAULT_CDP_URL,
+        "timeout": int(browser_config.get("cdp_connect_timeout", DEFAULT_CDP_TIMEOUT)),
+    }
+
+
+@dataclass(frozen=True)
+class ReconnectPolicy:
+    # إعادة الاتصال بعد انقطاع المتصفح: تأخير أسي يبدأ من initial_delay ويتضاعف حتى max_delay
+    enabled: bool = True
+    initial_delay: float = 1.0
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+    jitter: float = 0.1 # نسبة عشوائية من التأخير حتى لا تتزامن عدة عمليات في إعادة الاتصال
+    max_attempts: int = 0 # 0 = بلا حد (للتشغيل الليلي دون مراقبة)
+    fallback_to_session_after: int = 3 # بعدها يُطلق متصفح من الجلسة المحفوظة بدل انتظار متصفح CDP؛ 0 = أبدًا
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ReconnectPolicy":
+        options = config.get("browser", {}).get("reconnect", {})
+        return cls(
+            enabled=bool(options.get("enabled", True)),
+            initial_delay=float(options.get("initial_delay", 1.0)),
+            max_delay=float(options.get("max_delay", 30.0)),
+            multiplier=float(options.get("multiplier", 2.0)),
+            jitter=float(options.get("jitter", 0.1)),
+            max_attempts=int(options.get("max_attempts", 0)),
+            fallback_to_session_after=int(options.get("fallback_to_session_after", 3)),
+        )
+
+    def delays(self) -> Iterator[float]:
+        attempt = 0
+        delay = self.initial_delay
+        while not self.max_attempts or attempt < self.max_attempts:
+            attempt += 1
+            yield delay * (1 + random.uniform(-self.jitter, self.jitter))
+            delay = min(delay * self.multiplier, self.max_delay)
+
+
+# نتائج فحص صلاحية الجلسة
+SESSION_VALID = "valid"
+SESSION_INVALID = "invalid"
+SESSION_UNKNOWN = "unknown" # الفحص السريع غير حاسم (مثل خطأ خادم)، فيُلجأ لفحص الصفحة
+
+# حجم ما يُفحص من بداية رد الطلب بحثًا عن نموذج تسجيل الدخول
+SESSION_BODY_SCAN_BYTES = 65536
+
+
+@dataclass
+class SessionHealth:
+    status: str
+    method: str # cookies / request / dom
+    duration_ms: float
+    detail: str = ""
+
+    @property
+    def is_valid(self) -> bool:
+        return self.status == SESSION_VALID
+
+
+def session_check_options(config: dict) -> dict:
+    # إعدادات session_check مع محدد الصفحة القديم (session_check_xpath) كفحص احتياطي فقط
+    options = config.get("session_check", {})
+    return {
+        "probe_url": options.get("probe_url") or None,
+        "auth_cookie_names": tuple(options.get("auth_cookie_names", [])),
+        "login_url_marker": options.get("login_url_marker", "applogin"),
+        "login_body_marker": options.get("login_body_marker", 'type="password"'),
+        "timeout": int(options.get("timeout", 5000)),
+        "dom_selector": config.get("session_check_xpath") or None,
+    }
+
+
+def classify_session_cookies(cookies: list[dict], auth_cookie_names: tuple[str, ...] = (),
+                             now: float | None = None) -> tuple[str, str]:
+    # غياب كوكيز الموقع أو انتهاؤها يعني جلسة منتهية بلا حاجة لأي طلب. وجودها لا يثبت صلاحيتها
+    # على الخادم، لذلك يُعاد SESSION_UNKNOWN ما لم تكن أسماء كوكيز المصادقة محددة وموجودة.
+    now = time.time() if now is None else now
+    live = {cookie["name"] for cookie in cookies if cookie.get("expires", -1) in (-1, None) or cookie["expires"] > now}
+    if not live:
+        return SESSION_INVALID, "لا توجد كوكيز صالحة للموقع"
+    if auth_cookie_names:
+        missing = [name for name in auth_cookie_names if name not in live]
+        if missing:
+            return SESSION_INVALID, f"كوكيز المصادقة مفقودة أو منتهية: {', '.join(missing)}"
+        return SESSION_VALID, "كوكيز المصادقة موجودة"
+    return SESSION_UNKNOWN, f"{len(live)} كوكي للموقع"
+
+
+def classify_session_response(status: int, url: str, location: str, body: str,
+                              login_url_marker: str, login_body_marker: str) -> tuple[str, str]:
+    marker = login_url_marker.lower()
+    if 300 <= status < 400:
+        if marker and marker in (location or "").lower():
+            return SESSION_INVALID, f"إعادة توجيه إلى صفحة تسجيل الدخول ({status})"
+        return SESSION_UNKNOWN, f"إعادة توجيه غير متوقعة ({status}) إلى {location}"
+    if status in (401, 403):
+        return SESSION_INVALID, f"الخادم رفض الطلب ({status})"
+    if 200 <= status < 300:
+        if marker and marker in url.lower():
+            return SESSION_INVALID, "الرد من صفحة تسجيل الدخول"
+        if login_body_marker and login_body_marker in body:
+            return SESSION_INVALID, "الرد يحتوي على نموذج تسجيل الدخول"
+        return SESSION_VALID, f"الطلب نجح ({status})"
+    return SESSION_UNKNOWN, f"رد غير حاسم من الخادم ({status})"
+
+
 class BrowserManager:
-    def __init__(self, logger_instance=None):
+    def __init__(self, logger_instance=None, network_profile: NetworkProfile | None = None):
         self.playwright_instance: Playwright | None = None
         self.browser_connection: Browser | None = None 
+        self.launched_browser: Browser | None = None # متصفح يطلقه البرنامج بنفسه من جلسة محفوظة
         self.context = None
         self.page: Page | None = None
         
@@ -21,8 +168,25 @@ class BrowserManager:
             logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
         self.is_connected_to_persistent_cdp = False
+        self._cdp_disconnected = False # من حدث "disconnected" لاتصال CDP الحالي
+        self.cdp_url: str | None = None # يحتاجه محرك الإدخال لفتح صفحات إضافية في نفس المتصفح
+        self.cdp_timeout = DEFAULT_CDP_TIMEOUT
+        self.is_launched_browser = False
+        # يُطبق على المتصفحات التي يطلقها البرنامج فقط، لا على متصفح المستخدم المتصل عبر CDP
+        self.network_profile = network_profile
+
+    @timed_operation("prewarm_playwright_sync")
+    def prewarm(self) -> bool:
+        # يشغل مشغل Playwright مسبقًا حتى لا يدفع أول اتصال زمن بدئه. Playwright المتزامن مرتبط
+        # بالخيط الذي بدأه، لذا يُستدعى من نفس الخيط الذي سينفذ عمليات المتصفح (BrowserWorker).
+        if not self.playwright_instance:
+            started_at = time.perf_counter()
+            self.playwright_instance = sync_playwright().start()
+            self.logger.info(f"تم تشغيل Playwright مسبقًا خلال {(time.perf_counter() - started_at) * 1000:.0f} ms.")
+        return True
 
-    def connect_to_existing_cdp_browser(self, cdp_url: str = "http://localhost:9222") -> bool:
+    @timed_operation("connect_cdp", url_arg="cdp_url")
+    def connect_to_existing_cdp_browser(self, cdp_url: str = DEFAULT_CDP_URL, timeout: int = DEFAULT_CDP_TIMEOUT) -> bool:
         if self.is_connected_to_persistent_cdp and self.browser_connection and self.browser_connection.is_connected():
             self.logger.info(f"متصل بالفعل بالمتصفح على {cdp_url}")
             if not self.page or self.page.is_closed():
@@ -51,10 +215,13 @@ class BrowserManager:
             return True
 
         try:
-            self.logger.info(f"محاولة بدء Playwright للاتصال بـ CDP...")
-            self.playwright_instance = sync_playwright().start()
+            if not self.playwright_instance: # قد يكون شُغل مسبقًا عبر prewarm
+                self.logger.info(f"محاولة بدء Playwright للاتصال بـ CDP...")
+                self.playwright_instance = sync_playwright().start()
             self.logger.info(f"محاولة الاتصال بالمتصفح على {cdp_url}...")
-            self.browser_connection = self.playwright_instance.chromium.connect_over_cdp(cdp_url, timeout=15000)
+            self.browser_connection = self.playwright_instance.chromium.connect_over_cdp(cdp_url, timeout=timeout)
+            self._cdp_disconnected = False
+            self.browser_connection.on("disconnected", self._on_cdp_disconnected)
             self.logger.info("تم الاتصال بالمتصفح الموجود (CDP) بنجاح!")
 
             if not self.browser_connection.contexts:
@@ -73,27 +240,75 @@ class BrowserManager:
                 self.logger.info("تم فتح صفحة جديدة في السياق.")
             
             self.is_connected_to_persistent_cdp = True
+            self.cdp_url = cdp_url
+            self.cdp_timeout = timeout
             return True
             
+        # Playwright يبقى يعمل بعد الفشل حتى لا تدفع المحاولة التالية (أو إعادة الاتصال) زمن بدئه من جديد
         except PlaywrightError as e:
             self.logger.error(f"فشل الاتصال بالمتصفح الموجود على {cdp_url}.")
-            self.logger.error(f"يرجى التأكد من أنك قمت بتشغيل المتصفح يدويًا بالأمر المناسب مع منفذ CDP ({CDP_PORT}) ومجلد بيانات مستخدم (--user-data-dir).")
+            self.logger.error(f"يرجى التأكد من أنك قمت بتشغيل المتصفح يدويًا بالأمر المناسب مع منفذ CDP "
+                              f"(--remote-debugging-port={urlsplit(cdp_url).port or 9222}) ومجلد بيانات مستخدم (--user-data-dir).")
             self.logger.error(f"تفاصيل خطأ Playwright: {e}")
-            if self.playwright_instance:
-                self.playwright_instance.stop()
-                self.playwright_instance = None
             return False
         except Exception as e:
             self.logger.error(f"حدث خطأ عام غير متوقع أثناء محاولة الاتصال بالمتصفح: {e}", exc_info=True)
-            if self.playwright_instance:
-                self.playwright_instance.stop()
-                self.playwright_instance = None
             return False
 
+    def _on_cdp_disconnected(self, browser: Browser):
+        if browser is self.browser_connection:
+            self._cdp_disconnected = True
+
+    def cdp_connection_lost(self, probe: bool = False) -> bool:
+        # هل كان هناك اتصال CDP وانقطع (أُغلق المتصفح أو أعيد تشغيله)؟ بدون probe يُكتفى بحدث
+        # "disconnected" و is_connected() دون أي رحلة إلى المتصفح. أحداث Playwright المتزامن لا تُعالج
+        # إلا أثناء استدعاءاته، فبعد فشل أمر يُرسل أمر CDP صغير (probe) للتأكد
+        if not self.is_connected_to_persistent_cdp:
+            return False
+        if self._cdp_disconnected or not (self.browser_connection and self.browser_connection.is_connected()):
+            return True
+        if not probe:
+            return False
+        try:
+            self.browser_connection.new_browser_cdp_session().detach()
+            return False
+        except PlaywrightError:
+            return True
+
+    @timed_operation("reconnect_cdp")
+    def reconnect_cdp(self, policy: ReconnectPolicy, should_stop: Callable[[], bool] | None = None) -> bool:
+        # يعيد الاتصال بنفس العنوان بتأخير أسي؛ should_stop يسمح بإلغاء الانتظار (مثل إلغاء الأمر الجاري)
+        cdp_url, timeout = self.cdp_url or DEFAULT_CDP_URL, self.cdp_timeout
+        self.logger.warning(f"انقطع الاتصال بالمتصفح على {cdp_url}.")
+        self.page = None
+        self.context = None
+        self.browser_connection = None
+        self.is_connected_to_persistent_cdp = False
+        if not policy.enabled:
+            return False
+        for attempt, delay in enumerate(policy.delays(), 1):
+            self.logger.info(f"إعادة الاتصال بالمتصفح: المحاولة {attempt} بعد {delay:.1f} ث...")
+            wait_until = time.monotonic() + delay
+            while time.monotonic() < wait_until:
+                if should_stop and should_stop():
+                    return False
+                time.sleep(max(0.0, min(0.25, wait_until - time.monotonic())))
+            if self.connect_to_existing_cdp_browser(cdp_url, timeout):
+                self.logger.info(f"تمت إعادة الاتصال بالمتصفح على {cdp_url} بعد {attempt} محاولة.")
+                return True
+        self.logger.error(f"تعذرت إعادة الاتصال بالمتصفح على {cdp_url} بعد {policy.max_attempts} محاولة.")
+        return False
+
+    def _active_browser(self) -> Browser | None:
+        for browser in (self.browser_connection, self.launched_browser):
+            if browser and browser.is_connected():
+                return browser
+        return None
+
     def get_current_page(self) -> Page | None:
         if self.page and not self.page.is_closed():
             return self.page
-        elif self.context and self.browser_connection and self.browser_connection.is_connected(): 
+        elif self.context and self._active_browser(): 
             try:
                 # محاولة استخدام السياق لإنشاء صفحة جديدة
                 self.page = self.context.new_page()
@@ -105,13 +320,19 @@ class BrowserManager:
         self.logger.warning("لا يمكن الحصول على صفحة حالية (لا يوجد سياق صالح أو اتصال بالمتصفح).")
         return None
 
+    @timed_operation("navigate", url_arg="url")
     def navigate_to_url(self, url: str, timeout: int = 60000, wait_until: str = "domcontentloaded") -> bool:
         page = self.get_current_page()
         if page:
             try:
                 self.logger.info(f"الانتقال إلى: {url} (wait_until: {wait_until})")
+                profiled = self.network_profile is not None and self.is_launched_browser
+                if profiled:
+                    self.network_profile.reset_page_stats(page)
                 page.goto(url, timeout=timeout, wait_until=wait_until) # type: ignore
                 self.logger.info(f"تم الانتقال بنجاح إلى: {page.url}")
+                if profiled:
+                    self.logger.info(f"الشبكة: {self.network_profile.stats_for(page).summary()}")
                 return True
             except PlaywrightError as e:
                 self.logger.error(f"خطأ Playwright أثناء الانتقال إلى {url}: {e}")
@@ -121,6 +342,7 @@ class BrowserManager:
             self.logger.error("لا توجد صفحة صالحة للانتقال إليها.")
         return False
 
+    @timed_operation("check_element", target_arg="selector")
     def check_element_exists(self, selector: str, timeout: int = 10000) -> bool:
         page = self.get_current_page()
         if page:
@@ -142,6 +364,45 @@ class BrowserManager:
             self.logger.error("لا توجد صفحة صالحة للتحقق من العنصر.")
             return False
             
+    @timed_operation("check_session", url_arg="probe_url")
+    def check_session_health(self, probe_url: str | None = None, auth_cookie_names: tuple[str, ...] = (),
+                             login_url_marker: str = "applogin", login_body_marker: str = 'type="password"',
+                             timeout: int = 5000, dom_selector: str | None = None,
+                             dom_timeout: int = 10000) -> SessionHealth:
+        # فحص سريع لصلاحية الجلسة دون عرض أي صفحة: كوكيز السياق أولًا (رحلة CDP واحدة)، ثم طلب HTTP
+        # واحد عبر context.request الذي يشارك كوكيز المتصفح، ولا يُفحص DOM إلا إذا كانت النتيجة غير حاسمة.
+        started_at = time.perf_counter()
+        if not self.context or not self._active_browser():
+            return SessionHealth(SESSION_INVALID, "cookies", 0.0, "لا يوجد سياق متصفح صالح")
+
+        method, status, detail = "cookies", SESSION_UNKNOWN, ""
+        try:
+            cookies = self.context.cookies([probe_url]) if probe_url else self.context.cookies()
+            status, detail = classify_session_cookies(cookies, auth_cookie_names)
+            if status == SESSION_UNKNOWN and probe_url:
+                method = "request"
+                response = self.context.request.get(probe_url, timeout=timeout, max_redirects=0,
+                                                    fail_on_status_code=False)
+                try:
+                    body = response.body()[:SESSION_BODY_SCAN_BYTES].decode("utf-8", errors="replace") \
+                        if login_body_marker and 200 <= response.status < 300 else ""
+                    status, detail = classify_session_response(response.status, response.url,
+                                                                response.headers.get("location", ""), body,
+                                                                login_url_marker, login_body_marker)
+                finally:
+                    response.dispose()
+        except PlaywrightError as e:
+            status, detail = SESSION_UNKNOWN, f"خطأ أثناء الفحص السريع: {e}"
+
+        if status == SESSION_UNKNOWN and dom_selector:
+            method = "dom"
+            status = SESSION_VALID if self.check_element_exists(dom_selector, dom_timeout) else SESSION_INVALID
+            detail = f"{detail}؛ فحص الصفحة: {'العنصر موجود' if status == SESSION_VALID else 'العنصر غير موجود'}"
+        health = SessionHealth(status, method, (time.perf_counter() - started_at) * 1000, detail)
+        self.logger.info(f"فحص الجلسة ({health.method}): {health.status} خلال {health.duration_ms:.0f} ms - {health.detail}")
+        return health
+
+    @timed_operation("save_session", target_arg="file_path")
     def save_current_session_state(self, file_path: str) -> bool:
         if self.context: 
             try:
@@ -182,12 +443,64 @@ class BrowserManager:
         self.is_connected_to_persistent_cdp = False
         self.logger.info("اكتمل تنظيف اتصال Playwright بالمتصفح الدائم.")
 
-    # --- دوال لإدارة المتصفحات التي يطلقها البرنامج (إذا احتجنا إليها لاحقًا) ---
-    # def launch_new_browser_with_session(self, session_file_path: str, headless: bool = False) -> Page | None:
-    #     # ... منطق لإطلاق متصفح جديد وتحميل الجلسة ...
-    #     # self.is_connected_to_persistent_cdp = False لهذه الحالة
-    #     pass
+    # --- دوال لإدارة المتصفحات التي يطلقها البرنامج ---
+    @timed_operation("launch_browser", target_arg="session_file_path")
+    def launch_new_browser_with_session(self, session_file_path: str, headless: bool = True,
+                                        timeout: int = 30000) -> Page | None:
+        # يطلق Chromium جديدًا (بدون واجهة افتراضيًا) بسياق محمّل من ملف storage_state المحفوظ،
+        # لتعمل المراقبة ومهام الإدخال دون متصفح يدوي مفتوح على سطح المكتب.
+        session_file = Path(session_file_path)
+        if not session_file.is_file():
+            self.logger.error(f"ملف الجلسة غير موجود: {session_file}. يرجى حفظ الجلسة أولاً (الخطوة 3).")
+            return None
+        if self.is_connected_to_persistent_cdp:
+            self.logger.warning("متصل حاليًا بمتصفح CDP دائم. يجب قطع الاتصال قبل إطلاق متصفح جديد.")
+            return None
+        if self.is_launched_browser and self.launched_browser and self.launched_browser.is_connected():
+            self.logger.info("المتصفح المُطلق من الجلسة يعمل بالفعل.")
+            return self.get_current_page()
 
-    # def close_launched_browser(self):
-    #     # ... منطق لإغلاق المتصفح الذي أطلقه البرنامج ...
-    #     pass
\ No newline at end of file
+        try:
+            started_at = time.perf_counter()
+            if not self.playwright_instance:
+                self.playwright_instance = sync_playwright().start()
+            self.launched_browser = self.playwright_instance.chromium.launch(timeout=timeout, **launch_options(headless))
+            self.context = self.launched_browser.new_context(storage_state=str(session_file))
+            if self.network_profile is not None:
+                self.network_profile.attach(self.context)
+            self.page = self.context.new_page()
+            self.is_launched_browser = True
+            self.logger.info(f"تم إطلاق متصفح {'بدون واجهة' if headless else 'مرئي'} من الجلسة المحفوظة "
+                             f"{session_file} خلال {time.perf_counter() - started_at:.2f} ث.")
+            return self.page
+        except PlaywrightError as e:
+            self.logger.error(f"خطأ Playwright أثناء إطلاق المتصفح من الجلسة {session_file}: {e}")
+        except Exception as e:
+            self.logger.error(f"خطأ عام أثناء إطلاق المتصفح من الجلسة {session_file}: {e}", exc_info=True)
+        self.close_launched_browser()
+        return None
+
+    def close_launched_browser(self):
+        self.logger.info("إغلاق المتصفح الذي أطلقه البرنامج...")
+        self.page = None
+        if self.context:
+            try:
+                self.context.close()
+            except Exception as e:
+                self.logger.warning(f"خطأ أثناء إغلاق سياق المتصفح المُطلق: {e}")
+        self.context = None
+        if self.launched_browser:
+            try:
+                self.launched_browser.close()
+            except Exception as e:
+                self.logger.warning(f"خطأ أثناء إغلاق المتصفح المُطلق: {e}", exc_info=True)
+        self.launched_browser = None
+        self.is_launched_browser = False
+
+        if self.playwright_instance and not self.is_connected_to_persistent_cdp:
+            try:
+                self.playwright_instance.stop()
+            except Exception as e:
+                self.logger.warning(f"خطأ أثناء إيقاف Playwright: {e}", exc_info=True)
+            self.playwright_instance = None
+        self.logger.info("تم إغلاق المتصفح المُطلق.")
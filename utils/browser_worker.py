@@ -0,0 +1,232 @@
+# utils/browser_worker.py
+# خيط عامل واحد طويل العمر يملك مدير المتصفح المتزامن (BrowserManager). كائنات Playwright المتزامنة
+# مرتبطة بالخيط الذي أنشأها، لذلك كل أوامر المتصفح (اتصال، تحقق، حفظ...) تمر بطابور أولويات
+# وتُنفذ في هذا الخيط بالترتيب، بدل إنشاء خيط جديد لكل ضغطة زر.
+# الواجهة تضيف الأوامر إلى الطابور دون انتظار، وتستقبل البدء والتقدم والنتيجة عبر دوال الاستدعاء
+# (تُستدعى في خيط العامل).
+import itertools
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+PRIORITY_HIGH = 0 # أوامر المستخدم المباشرة
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20 # التجهيز المسبق والأعمال الخلفية
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_CANCELLED = "cancelled"
+
+MESSAGE_CANCELLED = "تم إلغاء العملية."
+
+
+class CommandCancelled(Exception):
+    pass
+
+
+@dataclass(eq=False)
+class BrowserCommand:
+    # func(manager, command) -> (success, message)، وتستدعي command.check_cancelled() بين الخطوات
+    # الطويلة و command.report() لرسائل التقدم
+    name: str
+    func: Callable[[Any, "BrowserCommand"], tuple[bool, str]]
+    priority: int = PRIORITY_NORMAL
+    status: str = STATUS_PENDING
+    success: bool = False
+    message: str = ""
+    _cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    _report: Callable[[str], None] | None = field(default=None, repr=False)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise CommandCancelled(self.name)
+
+    def report(self, message: str):
+        if self._report is not None:
+            self._report(message)
+
+
+class BrowserWorker:
+    def __init__(self, logger_instance=None, name: str = "BrowserWorker",
+                 on_started: Callable[[BrowserCommand], None] | None = None,
+                 on_finished: Callable[[BrowserCommand], None] | None = None,
+                 on_progress: Callable[[BrowserCommand, str], None] | None = None,
+                 reconnect_policy=None):
+        self.name = name
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+        self.on_started = on_started
+        self.on_finished = on_finished
+        self.on_progress = on_progress
+        # ReconnectPolicy: إذا انقطع اتصال CDP يُعاد ويكمل الأمر على المتصفح الجديد. قبل الأمر يُقرأ
+        # حال الاتصال المعروف فقط (بلا رحلة إلى المتصفح)، والفحص الفعلي بعد فشل الأمر ثم يُعاد مرة واحدة
+        self.reconnect_policy = reconnect_policy
+        # يُنشأ داخل خيط العامل عند أول أمر (استيراد Playwright لا يحدث في خيط الواجهة)
+        self.manager = None
+        self.current: BrowserCommand | None = None
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._counter = itertools.count() # يحفظ ترتيب الإضافة بين الأوامر متساوية الأولوية
+        self._pending: list[BrowserCommand] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.is_running():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    # --- الطابور ---
+    def submit(self, name: str, func: Callable[[Any, BrowserCommand], tuple[bool, str]],
+               priority: int = PRIORITY_NORMAL, unique: bool = True) -> BrowserCommand:
+        # unique: إذا كان أمر بنفس الاسم في الطابور (ولم يبدأ) يُعاد بدل إضافة نسخة ثانية
+        with self._lock:
+            if unique:
+                existing = next((command for command in self._pending
+                                 if command.name == name and not command.cancelled), None)
+                if existing is not None:
+                    return existing
+            command = BrowserCommand(name, func, priority)
+            command._report = lambda message: self._progress(command, message)
+            self._pending.append(command)
+            self._queue.put((priority, next(self._counter), command))
+        self.start()
+        return command
+
+    def has_pending(self, name: str | None = None) -> bool:
+        # يشمل الأمر الجاري تنفيذه
+        with self._lock:
+            commands = self._pending + ([self.current] if self.current is not None else [])
+        return any(not command.cancelled and (name is None or command.name == name) for command in commands)
+
+    def pending_names(self) -> list[str]:
+        with self._lock:
+            return [command.name for command in self._pending if not command.cancelled]
+
+    def cancel(self, name: str | None = None, include_running: bool = True) -> int:
+        # الأوامر المنتظرة لا تُنفذ، والجاري يتوقف عند أول check_cancelled
+        with self._lock:
+            commands = list(self._pending)
+            if include_running and self.current is not None:
+                commands.append(self.current)
+        cancelled = 0
+        for command in commands:
+            if (name is None or command.name == name) and not command.cancelled:
+                command.cancel()
+                cancelled += 1
+        return cancelled
+
+    def stop(self, timeout: float = 10.0):
+        # يلغي كل الأوامر، ثم يغلق العامل المتصفح (في خيطه) وينتهي
+        if not self.is_running():
+            return
+        self.cancel()
+        self._queue.put((PRIORITY_HIGH - 1, next(self._counter), None))
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.logger.warning(f"{self.name}: لم ينتهِ الأمر الجاري خلال {timeout} ث.")
+
+    # --- خيط العامل ---
+    def _get_manager(self):
+        if self.manager is None:
+            from utils.browser_manager import BrowserManager
+            self.manager = BrowserManager(logger_instance=self.logger)
+        return self.manager
+
+    def _progress(self, command: BrowserCommand, message: str):
+        if self.on_progress is not None:
+            self.on_progress(command, message)
+
+    def _notify(self, callback: Callable[[BrowserCommand], None] | None, command: BrowserCommand):
+        if callback is None:
+            return
+        try:
+            callback(command)
+        except Exception as e:
+            self.logger.error(f"{self.name}: خطأ في دالة الاستدعاء للأمر {command.name}: {e}", exc_info=True)
+
+    def _run(self):
+        try:
+            while True:
+                _, _, command = self._queue.get()
+                if command is None:
+                    break
+                with self._lock:
+                    self._pending.remove(command)
+                    self.current = command
+                try:
+                    self._execute(command)
+                finally:
+                    with self._lock:
+                        self.current = None
+                self._notify(self.on_finished, command)
+        finally:
+            self._close_manager()
+
+    def _execute(self, command: BrowserCommand):
+        if command.cancelled:
+            command.status, command.success, command.message = STATUS_CANCELLED, False, MESSAGE_CANCELLED
+            return
+        command.status = STATUS_RUNNING
+        self._notify(self.on_started, command)
+        try:
+            manager = self._get_manager()
+            if self.reconnect_policy is not None and manager.cdp_connection_lost():
+                self._reconnect(manager, command)
+            try:
+                command.success, command.message = command.func(manager, command)
+            except CommandCancelled:
+                raise
+            except Exception:
+                if not self._recover_connection(manager, command):
+                    raise
+                command.success, command.message = command.func(manager, command)
+            else:
+                if not command.success and self._recover_connection(manager, command):
+                    command.success, command.message = command.func(manager, command)
+            command.status = STATUS_DONE
+        except CommandCancelled:
+            command.status, command.success, command.message = STATUS_CANCELLED, False, MESSAGE_CANCELLED
+        except Exception as e:
+            self.logger.error(f"حدث خطأ فادح في خيط عمليات المتصفح ({command.name}): {e}", exc_info=True)
+            command.status, command.success, command.message = STATUS_DONE, False, f"خطأ فادح: {e}"
+
+    def _reconnect(self, manager, command: BrowserCommand) -> bool:
+        command.report("انقطع الاتصال بالمتصفح، جاري إعادة الاتصال...")
+        reconnected = manager.reconnect_cdp(self.reconnect_policy, should_stop=lambda: command.cancelled)
+        command.check_cancelled()
+        return reconnected
+
+    def _recover_connection(self, manager, command: BrowserCommand) -> bool:
+        # بعد فشل الأمر: هل السبب انقطاع CDP؟ عندها يُعاد الاتصال ويُعاد الأمر مرة واحدة
+        if self.reconnect_policy is None or command.cancelled or not manager.cdp_connection_lost(probe=True):
+            return False
+        return self._reconnect(manager, command)
+
+    def _close_manager(self):
+        manager = self.manager
+        if manager is None:
+            return
+        try:
+            if manager.is_connected_to_persistent_cdp:
+                manager.close_connection_to_persistent_browser()
+            if manager.is_launched_browser:
+                manager.close_launched_browser()
+            if manager.playwright_instance: # شُغل مسبقًا ولم يُستخدم
+                manager.playwright_instance.stop()
+                manager.playwright_instance = None
+        except Exception as e:
+            self.logger.warning(f"{self.name}: خطأ أثناء إغلاق المتصفح: {e}", exc_info=True)
@@ -0,0 +1,362 @@
+# utils/config_manager.py
+# قراءة config/config.json مرة واحدة والتحقق من كل أقسامه، مع إعادة التحميل تلقائيًا عند تعديل الملف
+# أثناء التشغيل.
+# القراءة من current لا تلمس القرص: خيط مراقبة يفحص وقت تعديل الملف (os.stat فقط، بدون قراءة)
+# ويعيد التحميل عند تغيره. الإعدادات غير الصالحة بعد التعديل لا تُطبق وتبقى النسخة السابقة.
+# لا توجد كائنات أقسام ثابتة الأنواع: كل الوحدات تستقبل القواميس (from_config وتحديث الإعدادات
+# أثناء التشغيل)، فالتحقق هنا يفحص أنواع وحدود كل مفتاح تقرؤه تلك الدوال، ويعيد AppConfig بالقاموس
+# نفسه بعد التحقق، فلا يصل إلى الوحدات ملف يكسرها أثناء التشغيل.
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+DEFAULT_CHECK_INTERVAL = 2.0
+
+
+class ConfigError(ValueError):
+    def __init__(self, config_file: Path, problems: list[str]):
+        self.config_file = config_file
+        self.problems = problems
+        super().__init__(f"إعدادات غير صالحة في {config_file}:\n  - " + "\n  - ".join(problems))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class AppConfig:
+    raw: dict[str, Any] = field(repr=False) # القاموس الكامل بعد التحقق، لدوال from_config
+    version: int = 1 # يزداد مع كل إعادة تحميل ناجحة
+
+    def section(self, name: str) -> dict[str, Any]:
+        return self.raw.get(name) or {}
+
+
+_TYPE_NAMES = {str: "نصًا", int: "عددًا صحيحًا", float: "رقمًا", bool: "true/false", list: "قائمة", dict: "كائنًا"}
+
+
+class _Validator:
+    # يجمع كل الأخطاء بدل التوقف عند أولها، ليظهر للمستخدم كل ما يجب تصحيحه مرة واحدة
+    def __init__(self):
+        self.problems: list[str] = []
+
+    def section(self, data: dict, key: str, path: str = "") -> dict:
+        value = data.get(key)
+        if value is None:
+            return {}
+        if not isinstance(value, dict):
+            self.problems.append(f"{path}{key}: يجب أن يكون {_TYPE_NAMES[dict]}")
+            return {}
+        return value
+
+    def value(self, data: dict, key: str, kind: type, default: Any, path: str = "",
+              check: Callable[[Any], bool] | None = None, requirement: str = "") -> Any:
+        value = data.get(key, default)
+        if value is None and default is None: # مفتاح اختياري (null = غير محدد)
+            return None
+        if kind is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if not isinstance(value, kind) or (kind in (int, float) and isinstance(value, bool)):
+            self.problems.append(f"{path}{key}: يجب أن يكون {_TYPE_NAMES[kind]} (القيمة الحالية {value!r})")
+            return default
+        if check is not None and not check(value):
+            self.problems.append(f"{path}{key}: {requirement} (القيمة الحالية {value!r})")
+            return default
+        return value
+
+    def string_list(self, data: dict, key: str, path: str = "", default: list | None = None) -> list[str]:
+        values = self.value(data, key, list, default or [], path)
+        if not all(isinstance(item, str) for item in values):
+            self.problems.append(f"{path}{key}: يجب أن تكون قائمة نصوص")
+            return []
+        return values
+
+    def patterns(self, data: dict, key: str, path: str = ""):
+        for pattern in self.string_list(data, key, path):
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                self.problems.append(f"{path}{key}: تعبير نمطي غير صالح {pattern!r} ({e})")
+
+
+_positive = (lambda value: value > 0, "يجب أن يكون أكبر من صفر")
+_not_negative = (lambda value: value >= 0, "لا يمكن أن يكون سالبًا")
+_url = (lambda url: url.startswith(("http://", "https://", "ws://", "wss://")), "يجب أن يبدأ بـ http:// أو ws://")
+
+
+def _check_browser(v: _Validator, data: dict):
+    browser = v.section(data, "browser")
+    v.value(browser, "timeout", int, 60000, "browser.", *_positive)
+    v.value(browser, "headless", bool, False, "browser.")
+    v.value(browser, "cdp_url", str, "http://localhost:9222", "browser.", *_url)
+    v.value(browser, "cdp_connect_timeout", int, 15000, "browser.", *_positive)
+    reconnect = v.section(browser, "reconnect", "browser.")
+    path = "browser.reconnect."
+    v.value(reconnect, "enabled", bool, True, path)
+    initial_delay = v.value(reconnect, "initial_delay", float, 1.0, path, *_not_negative)
+    max_delay = v.value(reconnect, "max_delay", float, 30.0, path, *_not_negative)
+    if max_delay < initial_delay:
+        v.problems.append(f"{path}max_delay: لا يمكن أن يكون أقل من initial_delay")
+    v.value(reconnect, "multiplier", float, 2.0, path, lambda value: value >= 1, "لا يمكن أن يكون أقل من 1")
+    v.value(reconnect, "jitter", float, 0.1, path, lambda value: 0 <= value <= 1, "يجب أن يكون بين 0 و 1")
+    v.value(reconnect, "max_attempts", int, 0, path, *_not_negative) # 0 = بلا حد
+    v.value(reconnect, "fallback_to_session_after", int, 3, path, *_not_negative)
+
+
+def _check_session_check(v: _Validator, data: dict):
+    v.value(data, "session_check_xpath", str, "")
+    options = v.section(data, "session_check")
+    path = "session_check."
+    v.value(options, "probe_url", str, None, path, lambda url: not url or _url[0](url), _url[1])
+    v.string_list(options, "auth_cookie_names", path)
+    v.value(options, "login_url_marker", str, "applogin", path)
+    v.value(options, "login_body_marker", str, "", path)
+    v.value(options, "timeout", int, 5000, path, *_positive)
+
+
+def _check_data_entry(v: _Validator, data: dict):
+    v.value(data, "excel_file", str, "")
+    v.value(data, "sheet_name", str, "Sheet1")
+    v.value(data, "data_entry_url", str, "")
+    form = v.section(data, "form")
+    v.value(form, "submit_button", str, "", "form.")
+    v.value(form, "success_marker", str, None, "form.")
+    v.value(form, "error_marker", str, None, "form.")
+    fields = v.section(form, "fields", "form.")
+    if not all(isinstance(selector, str) for selector in fields.values()):
+        v.problems.append("form.fields: يجب أن تكون كل القيم محددات نصية")
+    data_entry = v.section(data, "data_entry")
+    path = "data_entry."
+    v.value(data_entry, "concurrency", int, 4, path, *_positive)
+    v.value(data_entry, "max_retries", int, 2, path, *_not_negative)
+    v.value(data_entry, "retry_delay", float, 2.0, path, *_not_negative)
+    v.value(data_entry, "key_column", str, None, path)
+    v.value(data_entry, "resume", bool, True, path)
+    v.value(data_entry, "resubmit_in_doubt", bool, False, path)
+    v.value(data_entry, "pipeline", bool, True, path)
+
+
+def _check_rules(v: _Validator, monitoring: dict) -> set[str]:
+    names = set()
+    for index, rule in enumerate(v.value(monitoring, "data_extraction_rules", list, [], "monitoring."), start=1):
+        path = f"monitoring.data_extraction_rules[{index}]."
+        if not isinstance(rule, dict):
+            v.problems.append(f"{path[:-1]}: يجب أن تكون كائنًا")
+            continue
+        names.add(v.value(rule, "name", str, "", path, bool, "مطلوب"))
+        column = v.value(rule, "column", int, None, path, *_not_negative)
+        selector = v.value(rule, "selector", str, None, path)
+        if column is None and not selector:
+            v.problems.append(f"{path[:-1]}: تحتاج column أو selector")
+        v.value(rule, "attribute", str, None, path)
+    return names
+
+
+# نفس قواعد navigation_steps._compile_step؛ لا تُستورد الوحدة هنا لأنها تستورد Playwright
+_STEP_ACTIONS = ("goto", "wait_for_selector", "click")
+_STEP_WAIT_UNTIL = ("commit", "domcontentloaded", "load", "networkidle")
+
+
+def _check_navigation_steps(v: _Validator, monitoring: dict):
+    for index, step in enumerate(v.value(monitoring, "navigation_steps", list, [], "monitoring."), start=1):
+        path = f"monitoring.navigation_steps[{index}]."
+        if not isinstance(step, dict):
+            v.problems.append(f"{path[:-1]}: يجب أن تكون كائنًا")
+            continue
+        action = v.value(step, "action", str, "", path, lambda value: value in _STEP_ACTIONS,
+                         f"يجب أن يكون أحد: {', '.join(_STEP_ACTIONS)}")
+        url = v.value(step, "url", str, "", path)
+        selector = v.value(step, "selector", str, "", path)
+        v.value(step, "timeout", float, None, path, *_positive)
+        v.value(step, "wait_until", str, "domcontentloaded", path, lambda value: value in _STEP_WAIT_UNTIL,
+                f"يجب أن يكون أحد: {', '.join(_STEP_WAIT_UNTIL)}")
+        new_tab = v.value(step, "new_tab", bool, False, path)
+        url_check = v.value(step, "url_contains_check", str, "", path)
+        if action == "goto" and not url:
+            v.problems.append(f"{path}url: مطلوب لإجراء goto")
+        if action in ("wait_for_selector", "click") and not selector.strip():
+            v.problems.append(f"{path}selector: مطلوب لإجراء {action}")
+        if action in ("goto", "wait_for_selector") and (new_tab or url_check):
+            v.problems.append(f"{path[:-1]}: new_tab و url_contains_check متاحان لإجراء click فقط")
+
+
+def _check_monitoring(v: _Validator, data: dict):
+    monitoring = v.section(data, "monitoring")
+    path = "monitoring."
+    for key, default in (("enabled", False), ("enabled_on_startup", False), ("headless_monitoring", True),
+                         ("probe_with_request", True)):
+        v.value(monitoring, key, bool, default, path)
+    v.value(monitoring, "monitoring_page_url", str, "", path)
+    v.value(monitoring, "interval", float, 180.0, path, *_positive)
+    v.value(monitoring, "timeout", int, 60000, path, *_positive)
+    v.value(monitoring, "table_selector", str, "", path)
+    v.string_list(monitoring, "elements_to_check_change", path)
+    v.value(monitoring, "seen_data_ids_file", str, "data/seen_work_orders.db", path)
+    v.value(monitoring, "seen_ids_retention_days", float, None, path, *_positive) # null = بلا حذف
+    _check_navigation_steps(v, monitoring)
+    rule_names = _check_rules(v, monitoring)
+    row_id_field = v.value(monitoring, "row_id_field", str, "", path)
+    if row_id_field and row_id_field not in rule_names:
+        v.problems.append(f"monitoring.row_id_field: لا توجد قاعدة استخراج باسم '{row_id_field}'")
+    pager = v.section(monitoring, "pager", path)
+    v.value(pager, "enabled", bool, True, "monitoring.pager.")
+    v.value(pager, "event_target", str, None, "monitoring.pager.")
+    v.value(pager, "max_pages", int, 200, "monitoring.pager.", *_positive)
+
+
+def _check_notifications(v: _Validator, data: dict):
+    options = v.section(data, "notifications")
+    path = "notifications."
+    enabled = v.value(options, "telegram_enabled", bool, False, path)
+    token = v.value(options, "telegram_bot_token", str, "", path)
+    chat_id = options.get("telegram_chat_id")
+    if chat_id not in (None, "") and (not isinstance(chat_id, (str, int)) or isinstance(chat_id, bool)):
+        v.problems.append(f"{path}telegram_chat_id: يجب أن يكون نصًا أو عددًا (القيمة الحالية {chat_id!r})")
+    if enabled and not (token and chat_id not in (None, "")):
+        v.problems.append("notifications: telegram_enabled يتطلب telegram_bot_token و telegram_chat_id")
+    v.value(options, "telegram_api_url", str, None, path, lambda url: not url or _url[0](url), _url[1])
+    v.value(options, "notify_updates", bool, False, path)
+    v.value(options, "notified_ids_file", str, None, path)
+    v.value(options, "notified_ids_retention_days", float, None, path, *_positive)
+    for key, default in (("timeout", 10.0), ("digest_window", 10.0)):
+        v.value(options, key, float, default, path, *_positive)
+    for key, default in (("max_queue", 5000), ("max_items_per_message", 40), ("max_messages_per_digest", 3)):
+        v.value(options, key, int, default, path, *_positive)
+    for key, default in (("max_retries", 5), ("max_requeues", 10)):
+        v.value(options, key, int, default, path, *_not_negative)
+    initial_delay = v.value(options, "retry_initial_delay", float, 1.0, path, *_not_negative)
+    max_delay = v.value(options, "retry_max_delay", float, 60.0, path, *_not_negative)
+    if max_delay < initial_delay:
+        v.problems.append(f"{path}retry_max_delay: لا يمكن أن يكون أقل من retry_initial_delay")
+
+
+def _check_network_profile(v: _Validator, data: dict):
+    options = v.section(data, "network_profile")
+    path = "network_profile."
+    v.value(options, "enabled", bool, True, path)
+    v.string_list(options, "block_resource_types", path)
+    v.patterns(options, "block_url_patterns", path)
+    v.patterns(options, "allow_url_patterns", path)
+    estimated = v.section(options, "estimated_bytes", path)
+    if not all(isinstance(size, int) and not isinstance(size, bool) and size >= 0 for size in estimated.values()):
+        v.problems.append(f"{path}estimated_bytes: يجب أن تكون كل القيم أعدادًا صحيحة غير سالبة")
+
+
+def _check_session_pool(v: _Validator, data: dict):
+    pool = v.section(data, "session_pool")
+    path = "session_pool."
+    v.value(pool, "enabled", bool, False, path)
+    v.value(pool, "sessions_dir", str, None, path)
+    v.value(pool, "discover", bool, True, path)
+    v.value(pool, "default_rate_per_minute", float, 60.0, path, *_positive)
+    v.value(pool, "default_burst", int, 5, path, *_positive)
+    v.value(pool, "launch_timeout", int, 30000, path, *_positive)
+    for name, session in v.section(pool, "sessions", path).items():
+        session_path = f"{path}sessions.{name}."
+        if not isinstance(session, dict):
+            v.problems.append(f"{session_path[:-1]}: يجب أن يكون {_TYPE_NAMES[dict]}")
+            continue
+        v.value(session, "storage_state", str, None, session_path)
+        v.value(session, "account", str, None, session_path)
+        v.value(session, "rate_per_minute", float, None, session_path, *_positive)
+        v.value(session, "burst", int, None, session_path, *_positive)
+        v.section(session, "overrides", session_path)
+
+
+def parse_config(data: Any, config_file: Path, version: int = 1) -> AppConfig:
+    if not isinstance(data, dict):
+        raise ConfigError(config_file, ["الملف يجب أن يحتوي كائن JSON"])
+    v = _Validator()
+    v.value(data, "login_url", str, "")
+    for check in (_check_browser, _check_session_check, _check_data_entry, _check_monitoring,
+                  _check_notifications, _check_network_profile, _check_session_pool):
+        check(v, data)
+    if v.problems:
+        raise ConfigError(config_file, v.problems)
+    return AppConfig(raw=data, version=version)
+
+
+class ConfigManager:
+    def __init__(self, config_file: Path | str, check_interval: float = DEFAULT_CHECK_INTERVAL, logger_instance=None):
+        self.config_file = Path(config_file)
+        self.check_interval = check_interval
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+        self._current: AppConfig | None = None
+        self._signature: tuple[int, int] | None = None # (وقت التعديل، الحجم) للملف الذي قُرئ آخر مرة
+        self._listeners: list[Callable[[AppConfig], Any]] = []
+        self._lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+        self._stop_watching = threading.Event()
+
+    def _file_signature(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> AppConfig:
+        # يقرأ الملف ويتحقق منه؛ يرفع ConfigError دون تغيير الإعدادات الحالية إن كان غير صالح
+        with self._lock:
+            signature = self._file_signature()
+            try:
+                data = json.loads(self.config_file.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                self._signature = signature
+                raise ConfigError(self.config_file, [str(e)]) from e
+            self._signature = signature
+            version = self._current.version + 1 if self._current else 1
+            self._current = parse_config(data, self.config_file, version)
+            return self._current
+
+    @property
+    def current(self) -> AppConfig:
+        # بدون قراءة من القرص بعد أول تحميل؛ التحديث يتم في reload_if_changed
+        config = self._current
+        return config if config is not None else self.load()
+
+    def reload_if_changed(self) -> bool:
+        if self._file_signature() == self._signature:
+            return False
+        previous = self._current
+        try:
+            config = self.load()
+        except ConfigError as e:
+            # ملف نصف محفوظ أو خطأ كتابة: تبقى الإعدادات السابقة حتى التعديل التالي
+            self.logger.error(f"تم تجاهل تعديل الإعدادات: {e}")
+            return False
+        if previous is not None:
+            self.logger.info(f"تمت إعادة تحميل الإعدادات من {self.config_file} (النسخة {config.version}).")
+        for listener in list(self._listeners):
+            try:
+                listener(config)
+            except Exception as e:
+                self.logger.error(f"خطأ في مستمع تغيير الإعدادات: {e}", exc_info=True)
+        return True
+
+    def subscribe(self, listener: Callable[[AppConfig], Any]) -> Callable[[], None]:
+        # المستمع يُستدعى من خيط المراقبة، فعليه نقل العمل لخيطه (إشارة Qt أو call_soon_threadsafe)
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener) if listener in self._listeners else None
+
+    def start_watching(self) -> "ConfigManager":
+        if self._watcher is not None and self._watcher.is_alive():
+            return self
+        if self._signature is None:
+            self._signature = self._file_signature()
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=self._watch, name="ConfigWatcher", daemon=True)
+        self._watcher.start()
+        return self
+
+    def stop_watching(self):
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join(self.check_interval + 1)
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop_watching.wait(self.check_interval):
+            self.reload_if_changed()
@@ -0,0 +1,118 @@
+# utils/connection_supervisor.py
+# مشرف الاتصال لمدير المتصفح غير المتزامن: يستمع لحدث disconnected ويعيد الاتصال تلقائيًا بتأخير أسي
+# (ReconnectPolicy). إذا لم يعد متصفح CDP بعد عدة محاولات يُطلق متصفح من الجلسة المحفوظة، وإذا عاد
+# المتصفح بلا جلسة صالحة تُستعاد كوكيز sessions/browser_session.json.
+# عمليات الإدخال والمراقبة تنتظر wait_until_ready عند الانقطاع ثم تكمل من حيث توقفت.
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Callable
+
+from utils.async_browser_manager import AsyncBrowserManager
+from utils.browser_manager import ReconnectPolicy, SESSION_INVALID
+from utils.metrics import timed, OUTCOME_FAIL
+
+_STOP_CHECK_INTERVAL = 0.5 # ثوانٍ بين فحوص should_stop أثناء الانتظار
+
+
+class AsyncConnectionSupervisor:
+    def __init__(self, manager: AsyncBrowserManager, policy: ReconnectPolicy | None = None,
+                 session_file: str | None = None, session_check: dict | None = None, headless: bool = True,
+                 logger_instance=None):
+        self.manager = manager
+        self.policy = policy or ReconnectPolicy()
+        self.session_file = session_file
+        self.session_check = session_check # خيارات check_session_health لفحص الجلسة بعد إعادة الاتصال
+        self.headless = headless # للمتصفح الذي يُطلق من الجلسة كبديل
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+        self.reconnects = 0
+        self.gave_up = False
+        self._ready: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_started(self) -> bool:
+        return self._ready is not None
+
+    def start(self):
+        # يُستدعى داخل حلقة المدير؛ استدعاؤه أكثر من مرة آمن
+        if self._ready is not None:
+            return
+        self._ready = asyncio.Event()
+        if self.manager.is_ready:
+            self._ready.set()
+        self.manager.add_disconnect_listener(self._on_disconnected)
+
+    async def stop(self):
+        self.manager.remove_disconnect_listener(self._on_disconnected)
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._ready = None
+
+    def _on_disconnected(self):
+        if not self.policy.enabled or self._ready is None:
+            return
+        self._ready.clear()
+        if self._task is None or self._task.done():
+            self.gave_up = False
+            self._task = asyncio.get_running_loop().create_task(self._reconnect_loop())
+
+    async def wait_until_ready(self, timeout: float | None = None,
+                               should_stop: Callable[[], bool] | None = None) -> bool:
+        # True عندما يعود الاتصال، False إذا توقفت المحاولات أو انتهت المهلة أو أعاد should_stop قيمة True
+        if self.manager.is_ready:
+            return True
+        if self._ready is None or not self.policy.enabled or self.gave_up:
+            return False
+        # قد يصل خطأ الصفحة قبل حدث disconnected
+        self._on_disconnected()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._ready.is_set():
+            if should_stop is not None and should_stop():
+                return False
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            step = remaining if should_stop is None else min(remaining or _STOP_CHECK_INTERVAL, _STOP_CHECK_INTERVAL)
+            try:
+                await asyncio.wait_for(self._ready.wait(), step)
+            except asyncio.TimeoutError:
+                pass
+        return self.manager.is_ready
+
+    async def _reconnect_loop(self):
+        target = self.manager.connection_target
+        can_fall_back = (self.session_file is not None and Path(self.session_file).is_file()
+                         and target is not None and target[0] == "cdp" and self.policy.fallback_to_session_after > 0)
+        with timed("browser_reconnect", url=target[1] if target else None) as event:
+            for attempt, delay in enumerate(self.policy.delays(), 1):
+                self.logger.warning(f"(async) إعادة الاتصال بالمتصفح: المحاولة {attempt} بعد {delay:.1f} ث...")
+                await asyncio.sleep(delay)
+                fall_back = can_fall_back and attempt > self.policy.fallback_to_session_after
+                if fall_back:
+                    self.logger.warning(f"(async) متصفح CDP لم يعد، سيُطلق متصفح من الجلسة المحفوظة {self.session_file}.")
+                if await self.manager.reconnect(self.session_file if fall_back else None, self.headless):
+                    await self._rehydrate_session()
+                    self.reconnects += 1
+                    event.target = f"attempts={attempt}"
+                    self.logger.info(f"(async) تمت إعادة الاتصال بالمتصفح بعد {attempt} محاولة.")
+                    self._ready.set()
+                    return
+            event.outcome = OUTCOME_FAIL
+        self.gave_up = True
+        self.logger.error(f"(async) تعذرت إعادة الاتصال بالمتصفح بعد {self.policy.max_attempts} محاولة.")
+        self._ready.set() # لتنتهي عمليات الانتظار بنتيجة False
+
+    async def _rehydrate_session(self):
+        # متصفح CDP أعيد تشغيله بملف تعريف بلا جلسة: تُعاد كوكيز الجلسة المحفوظة ثم يُعاد الفحص
+        if not self.session_file or not self.session_check or not self.manager.is_connected_to_persistent_cdp:
+            return
+        health = await self.manager.check_session_health(**self.session_check)
+        if health.status != SESSION_INVALID:
+            return
+        if await self.manager.restore_session_cookies(self.session_file):
+            health = await self.manager.check_session_health(**self.session_check)
+            self.logger.info(f"(async) الجلسة بعد الاستعادة: {health.status} ({health.detail})")
@@ -0,0 +1,537 @@
+# utils/data_entry.py
+import asyncio
+import logging
+import re
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+from playwright.async_api import Page, Response, Error as PlaywrightError
+
+from utils.async_browser_manager import AsyncBrowserManager
+from utils.connection_supervisor import AsyncConnectionSupervisor
+from utils.network_profile import NetworkProfile
+from utils.rate_limiter import TokenBucket
+from utils.metrics import timed_operation, LatencyHistogram
+from utils.browser_manager import (headless_from_config, session_check_options, cdp_options, SESSION_INVALID,
+                                   DEFAULT_CDP_URL, DEFAULT_CDP_TIMEOUT, ReconnectPolicy)
+from utils.excel_reader import ExcelRowReader
+from utils.progress_journal import ProgressJournal
+
+RESULTS_DIR = Path(__file__).resolve().parent.parent / "results"
+
+
+@dataclass
+class RowResult:
+    row_number: int
+    status: str  # "success" أو "failed" أو "in_doubt"
+    attempts: int
+    duration_ms: float
+    error: str = ""
+    values: dict[str, Any] = field(default_factory=dict)
+    key: str = ""
+    submit_ms: float = 0.0 # من الضغط على الحفظ حتى وصول رد الـ postback (آخر محاولة)
+
+
+@dataclass
+class DataEntrySummary:
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0 # صفوف أُدخلت في تشغيل سابق (من سجل التقدم)
+    in_doubt: int = 0 # صفوف بدأ إرسالها في تشغيل سابق دون نتيجة مسجلة
+    elapsed_s: float = 0.0
+    stopped: bool = False
+    results_file: str | None = None
+    # زمن الإرسال لكل صف (الضغط على الحفظ حتى رد الخادم)
+    submit_p50_ms: float = 0.0
+    submit_p95_ms: float = 0.0
+    submit_max_ms: float = 0.0
+
+
+class PostbackError(Exception):
+    # رد الـ postback يدل على فشل الحفظ؛ retryable=False لأخطاء التحقق التي لن يغيرها إعادة الإرسال
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+@dataclass
+class _PostbackResult:
+    status: str # "success" أو "in_doubt" (الرد لا يحتوي علامة النجاح)
+    submit_ms: float
+
+
+def _format_cell_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _raise_worker_error(workers: list[asyncio.Task]):
+    for worker in workers:
+        if worker.done() and not worker.cancelled() and worker.exception() is not None:
+            raise worker.exception()
+
+
+async def _put_while_workers_run(queue: asyncio.Queue, item: Any, workers: list[asyncio.Task]):
+    # queue.put ينتظر إلى الأبد إذا توقف العمال بخطأ ولم يبق من يستهلك الطابور، لذلك ننتظر
+    # الإضافة أو انتهاء أي عامل، ونعيد رفع خطأ العامل بدل تعليق الدفعة
+    _raise_worker_error(workers)
+    if not queue.full():
+        queue.put_nowait(item)
+        return
+    put = asyncio.ensure_future(queue.put(item))
+    try:
+        while not put.done():
+            running = [worker for worker in workers if not worker.done()]
+            if not running:
+                raise RuntimeError("محرك الإدخال: توقف كل العمال قبل انتهاء الصفوف.")
+            await asyncio.wait([put, *running], return_when=asyncio.FIRST_COMPLETED)
+            _raise_worker_error(workers)
+    finally:
+        put.cancel()
+
+
+class _ResultsSheetWriter:
+    # يكتب ورقة النتائج بوضع write_only حتى لا تتراكم الصفوف في الذاكرة
+    HEADER = ["row_number", "key", "status", "attempts", "duration_ms", "submit_ms", "error"]
+
+    def __init__(self, file_path: Path, value_columns: list[str]):
+        from openpyxl import Workbook
+
+        self.file_path = file_path
+        self.value_columns = value_columns
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Results")
+        self.sheet.append(self.HEADER + value_columns)
+
+    def append(self, result: RowResult):
+        self.sheet.append(
+            [result.row_number, result.key, result.status, result.attempts, round(result.duration_ms, 1),
+             round(result.submit_ms, 1), result.error]
+            + [_format_cell_value(result.values.get(column)) for column in self.value_columns]
+        )
+
+    def save(self):
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.workbook.save(str(self.file_path))
+
+
+class DataEntryEngine:
+    def __init__(self, data_entry_url: str, field_selectors: dict[str, str], submit_selector: str,
+                 cdp_url: str | None = DEFAULT_CDP_URL, storage_state_file: str | None = None,
+                 cdp_timeout: int = DEFAULT_CDP_TIMEOUT, headless: bool = True, concurrency: int = 4, max_retries: int = 2,
+                 retry_delay: float = 2.0, timeout: int = 60000, key_column: str | None = None,
+                 resume: bool = True, resubmit_in_doubt: bool = False, session_check: dict | None = None,
+                 network_profile: NetworkProfile | None = None, reconnect_policy: ReconnectPolicy | None = None,
+                 rate_limiter: TokenBucket | None = None, success_marker: str | None = None,
+                 error_marker: str | None = None, pipeline: bool = True, logger_instance=None):
+        if concurrency < 1:
+            raise ValueError("concurrency يجب أن يكون 1 على الأقل")
+        self.data_entry_url = data_entry_url
+        self.field_selectors = dict(field_selectors)
+        self.submit_selector = submit_selector
+        # إما الاتصال بمتصفح CDP مفتوح، أو إطلاق متصفح جديد من ملف جلسة محفوظ (storage_state)
+        self.cdp_url = cdp_url
+        self.cdp_timeout = cdp_timeout
+        self.storage_state_file = storage_state_file
+        self.headless = headless
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        # عمود يميز الصف (مثل رقم أمر العمل)، وإلا يُستخدم رقم الصف في الورقة
+        self.key_column = key_column or None
+        self.resume = resume
+        self.resubmit_in_doubt = resubmit_in_doubt
+        # خيارات check_session_health؛ تُفحص الجلسة قبل كل دفعة بدل اكتشاف انتهائها عند أول صف
+        self.session_check = session_check
+        self.network_profile = network_profile
+        # عند انقطاع المتصفح تنتظر الصفحات إعادة الاتصال وتكمل الصفوف بدل أن تفشل كلها
+        self.reconnect_policy = reconnect_policy
+        # حد معدل الحساب (من مجمع الجلسات)، يُنتظر قبل كل إرسال صف
+        self.rate_limiter = rate_limiter
+        # اكتمال الإرسال يُعرف من رد الـ postback نفسه: الحالة، ثم علامات نصية (regex) في جسم الرد
+        self.success_marker = re.compile(success_marker) if success_marker else None
+        self.error_marker = re.compile(error_marker) if error_marker else None
+        # صفحتان لكل عامل: تُملأ إحداهما بالصف التالي بينما ينتظر إرسال الصف الحالي على الأخرى
+        self.pipeline = pipeline
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+        self._stop_requested = threading.Event()
+        # انتظار تحميل المستند الذي أعاده الإرسال، يُنتظر فقط عند ملء الصفحة بالصف التالي
+        self._page_loads: "weakref.WeakKeyDictionary[Page, asyncio.Future]" = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_config(cls, config: dict, cdp_url: str | None = DEFAULT_CDP_URL, storage_state_file: str | None = None,
+                    rate_limiter: TokenBucket | None = None, logger_instance=None) -> "DataEntryEngine":
+        form_config = config.get("form", {})
+        data_entry_config = config.get("data_entry", {})
+        return cls(
+            data_entry_url=config.get("data_entry_url", ""),
+            field_selectors=form_config.get("fields", {}),
+            submit_selector=form_config.get("submit_button", ""),
+            cdp_url=cdp_url,
+            storage_state_file=storage_state_file,
+            cdp_timeout=cdp_options(config)["timeout"],
+            headless=headless_from_config(config),
+            concurrency=int(data_entry_config.get("concurrency", 4)),
+            max_retries=int(data_entry_config.get("max_retries", 2)),
+            retry_delay=float(data_entry_config.get("retry_delay", 2.0)),
+            timeout=int(config.get("browser", {}).get("timeout", 60000)),
+            key_column=data_entry_config.get("key_column") or None,
+            resume=bool(data_entry_config.get("resume", True)),
+            resubmit_in_doubt=bool(data_entry_config.get("resubmit_in_doubt", False)),
+            session_check=session_check_options(config),
+            network_profile=NetworkProfile.from_config(config, logger_instance=logger_instance),
+            reconnect_policy=ReconnectPolicy.from_config(config),
+            rate_limiter=rate_limiter,
+            success_marker=form_config.get("success_marker") or None,
+            error_marker=form_config.get("error_marker") or None,
+            pipeline=bool(data_entry_config.get("pipeline", True)),
+            logger_instance=logger_instance,
+        )
+
+    def request_stop(self):
+        # يوقف قراءة صفوف جديدة، والصفوف الجارية تكتمل بشكل طبيعي
+        self._stop_requested.set()
+
+    def run(self, excel_file: str, sheet_name: str, results_file: str | None = None,
+            progress_callback: Callable[[RowResult], None] | None = None) -> DataEntrySummary:
+        # نسخة حاجبة لمن لا يملك حلقة asyncio (مثل سطر الأوامر)
+        return asyncio.run(self.run_async(excel_file, sheet_name, results_file, progress_callback))
+
+    async def run_async(self, excel_file: str, sheet_name: str, results_file: str | None = None,
+                        progress_callback: Callable[[RowResult], None] | None = None,
+                        browser_manager: AsyncBrowserManager | None = None,
+                        supervisor: AsyncConnectionSupervisor | None = None) -> DataEntrySummary:
+        # browser_manager: مدير متصفح غير متزامن مشترك (مثلًا من واجهة البرنامج). إذا لم يُمرر
+        # يُنشأ مدير خاص بهذه العملية ويُغلق في نهايتها.
+        # supervisor: مشرف اتصال مشترك لنفس المدير، وإلا يُنشأ مشرف لهذه العملية من reconnect_policy.
+        if not excel_file or not Path(excel_file).is_file():
+            raise FileNotFoundError(f"ملف Excel غير موجود: {excel_file!r}")
+        if not self.data_entry_url or not self.field_selectors or not self.submit_selector:
+            raise ValueError("إعدادات إدخال البيانات ناقصة (data_entry_url / form.fields / form.submit_button).")
+        if browser_manager is None and self.storage_state_file is None and not self.cdp_url:
+            raise ValueError("يجب تحديد cdp_url أو ملف جلسة محفوظ (storage_state_file).")
+        if self.storage_state_file is not None and not Path(self.storage_state_file).is_file():
+            raise FileNotFoundError(f"ملف الجلسة غير موجود: {self.storage_state_file}")
+
+        if results_file is None:
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            results_file = str(RESULTS_DIR / f"{Path(excel_file).stem}_results_{stamp}.xlsx")
+
+        self._stop_requested.clear()
+        owned_supervisor = None
+        owns_manager = browser_manager is None
+        manager = browser_manager or AsyncBrowserManager(logger_instance=self.logger, network_profile=self.network_profile)
+        if manager.network_profile is None:
+            manager.network_profile = self.network_profile
+        try:
+            if not manager.is_ready:
+                if self.storage_state_file is not None:
+                    self.logger.info(f"محرك الإدخال: إطلاق متصفح {'بدون واجهة' if self.headless else 'مرئي'} "
+                                     f"من الجلسة المحفوظة {self.storage_state_file}...")
+                    ready = await manager.launch_new_browser_with_session(self.storage_state_file, self.headless)
+                else:
+                    self.logger.info(f"محرك الإدخال: الاتصال بالمتصفح على {self.cdp_url}...")
+                    ready = await manager.connect_to_existing_cdp_browser(self.cdp_url, self.cdp_timeout)
+                if not ready:
+                    raise RuntimeError("محرك الإدخال: تعذر تجهيز المتصفح (اتصال CDP أو إطلاق من الجلسة).")
+            if self.session_check is not None:
+                health = await manager.check_session_health(**self.session_check)
+                if health.status == SESSION_INVALID:
+                    raise RuntimeError(f"محرك الإدخال: الجلسة غير صالحة ({health.detail}). "
+                                       f"يرجى تسجيل الدخول وحفظ الجلسة من جديد.")
+            if (supervisor is None and self.reconnect_policy is not None and self.reconnect_policy.enabled
+                    and manager.connection_target is not None): # سياق يملكه غيره (مجمع الجلسات) لا يُعاد اتصاله هنا
+                supervisor = owned_supervisor = AsyncConnectionSupervisor(
+                    manager, self.reconnect_policy, session_file=self.storage_state_file,
+                    session_check=self.session_check, headless=self.headless, logger_instance=self.logger)
+            if supervisor is not None:
+                supervisor.start()
+            # السياق يحمل جلسة تسجيل الدخول، وكل صفحات المجموعة تُفتح فيه
+            return await self._run_batch(manager, supervisor, excel_file, sheet_name, Path(results_file),
+                                         progress_callback)
+        finally:
+            if owned_supervisor is not None:
+                await owned_supervisor.stop()
+            if owns_manager:
+                await manager.close()
+
+    async def _run_batch(self, manager: AsyncBrowserManager, supervisor: AsyncConnectionSupervisor | None,
+                         excel_file: str, sheet_name: str, results_path: Path,
+                         progress_callback: Callable[[RowResult], None] | None) -> DataEntrySummary:
+        summary = DataEntrySummary(results_file=str(results_path))
+        writer = _ResultsSheetWriter(results_path, list(self.field_selectors))
+        started_at = time.perf_counter()
+
+        journal = ProgressJournal.for_workbook(excel_file, sheet_name)
+        start_row = None
+        if self.resume:
+            journal.load()
+            start_row = journal.resume_row
+            if start_row is not None:
+                self.logger.info(f"محرك الإدخال: استئناف من سجل التقدم {journal.journal_file} "
+                                 f"(الحالات: {journal.counts()}، أول صف غير منجز: {start_row}).")
+        else:
+            journal.discard()
+
+        reader_columns = list(self.field_selectors)
+        if self.key_column and self.key_column not in reader_columns:
+            reader_columns.append(self.key_column)
+
+        submit_latency = LatencyHistogram()
+
+        def on_result(result: RowResult):
+            summary.total += 1
+            if result.submit_ms:
+                submit_latency.add(result.submit_ms, result.status)
+            if result.status == "success":
+                summary.succeeded += 1
+            elif result.status == "in_doubt":
+                summary.in_doubt += 1
+            else:
+                summary.failed += 1
+            writer.append(result)
+            if progress_callback:
+                progress_callback(result)
+
+        pages_per_worker = 2 if self.pipeline else 1
+        pages = [await manager.new_page() for _ in range(self.concurrency * pages_per_worker)]
+        if None in pages:
+            raise RuntimeError("محرك الإدخال: تعذر فتح صفحات العمل في سياق المتصفح.")
+        self.logger.info(f"محرك الإدخال: تم فتح {len(pages)} صفحة لـ {self.concurrency} عامل بالتوازي.")
+
+        # طابور محدود الحجم حتى لا تسبق القراءة من Excel عملية الإدخال بكثير
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(manager, supervisor, pages, index, queue, journal, on_result))
+                   for index in range(self.concurrency)]
+        try:
+            rows = ExcelRowReader(excel_file, sheet_name, columns=reader_columns, start_row=start_row)
+            for row_number, values in rows:
+                if self._stop_requested.is_set():
+                    summary.stopped = True
+                    self.logger.warning("محرك الإدخال: تم طلب الإيقاف، لن تتم قراءة صفوف جديدة.")
+                    break
+                key = self._row_key(row_number, values)
+                if journal.is_done(key, row_number):
+                    summary.skipped += 1
+                    continue
+                if journal.is_in_doubt(key, row_number) and not self.resubmit_in_doubt:
+                    # لا نعيد الإرسال تلقائيًا لتجنب التكرار، ويُترك للتحقق اليدوي
+                    on_result(RowResult(row_number, "in_doubt", 0, 0.0, error="بدأ إرساله في تشغيل سابق دون تأكيد النتيجة",
+                                        values=values, key=key))
+                    continue
+                await _put_while_workers_run(queue, (row_number, key, values), workers)
+            for _ in workers:
+                await _put_while_workers_run(queue, None, workers)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            for page in pages:
+                try:
+                    await page.close()
+                except PlaywrightError:
+                    pass
+            journal.close()
+            writer.save()
+
+        summary.elapsed_s = time.perf_counter() - started_at
+        if submit_latency.count:
+            summary.submit_p50_ms = submit_latency.percentile(0.5)
+            summary.submit_p95_ms = submit_latency.percentile(0.95)
+            summary.submit_max_ms = submit_latency.max_ms
+        self.logger.info(
+            f"محرك الإدخال: اكتمل ({summary.succeeded} ناجح، {summary.failed} فاشل، {summary.in_doubt} غير مؤكد "
+            f"من {summary.total}، وتم تخطي {summary.skipped} صف منجز سابقًا) خلال {summary.elapsed_s:.1f} ث. النتائج في: {results_path}"
+        )
+        if submit_latency.count:
+            self.logger.info(f"محرك الإدخال: زمن الإرسال لكل صف: p50 {summary.submit_p50_ms:.0f} ms، "
+                             f"p95 {summary.submit_p95_ms:.0f} ms، الأقصى {summary.submit_max_ms:.0f} ms.")
+        if manager.network_profile is not None:
+            self.logger.info(f"محرك الإدخال: الشبكة: {manager.network_profile.totals.summary()}")
+        return summary
+
+    def _row_key(self, row_number: int, values: dict[str, Any]) -> str:
+        if self.key_column:
+            key = _format_cell_value(values.get(self.key_column)).strip()
+            if key:
+                return key
+        return f"row:{row_number}"
+
+    async def _worker(self, manager: AsyncBrowserManager, supervisor: AsyncConnectionSupervisor | None,
+                      pages: list[Page], index: int, queue: asyncio.Queue, journal: ProgressJournal,
+                      on_result: Callable[[RowResult], None]):
+        # صفحات هذا العامل في pages (تُستبدل بصفحات جديدة بعد إعادة الاتصال بالمتصفح). مع pipeline يُملأ
+        # الصف التالي على الصفحة الأخرى أثناء انتظار رد إرسال الصف الحالي، ولا يُرسل قبل اكتماله.
+        slots = [index * 2, index * 2 + 1] if self.pipeline else [index]
+        in_flight: asyncio.Task | None = None
+        prefill: asyncio.Task | None = None
+
+        async def run_row(slot: int, row_number: int, key: str, values: dict[str, Any], prefilled: asyncio.Task | None):
+            journal.mark_started(key, row_number)
+            result = await self._process_row(manager, supervisor, pages, slot, row_number, values, prefilled)
+            result.key = key
+            if result.status != "in_doubt": # يبقى "started" في السجل فلا يُعاد إرساله تلقائيًا عند الاستئناف
+                journal.mark_finished(key, row_number, result.status == "success", result.error)
+            on_result(result)
+
+        try:
+            turn = 0
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                row_number, key, values = item
+                slot = slots[turn % len(slots)]
+                turn += 1
+                prefill = None
+                if in_flight is not None:
+                    prefill = asyncio.create_task(self._fill_form(pages[slot], values))
+                    await in_flight
+                in_flight = asyncio.create_task(run_row(slot, row_number, key, values, prefill))
+                if not self.pipeline:
+                    await in_flight
+                    in_flight = None
+            if in_flight is not None:
+                await in_flight
+        finally:
+            for task in (prefill, in_flight):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def _process_row(self, manager: AsyncBrowserManager, supervisor: AsyncConnectionSupervisor | None,
+                           pages: list[Page], index: int, row_number: int, values: dict[str, Any],
+                           prefilled: asyncio.Task | None = None) -> RowResult:
+        started_at = time.perf_counter()
+        last_error = ""
+        attempt = 0
+        while attempt <= self.max_retries:
+            attempt += 1
+            stage = {"submitted": False}
+            # النموذج مُلئ مسبقًا أثناء إرسال الصف السابق (المحاولة الأولى فقط)
+            filled = await self._prefill_succeeded(prefilled, row_number)
+            prefilled = None
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            try:
+                postback = await self._submit_row(pages[index], values, stage, filled)
+                return RowResult(row_number, postback.status, attempt, (time.perf_counter() - started_at) * 1000,
+                                 error="" if postback.status == "success" else "رد الحفظ لا يحتوي علامة النجاح",
+                                 values=values, submit_ms=postback.submit_ms)
+            except (PlaywrightError, PostbackError) as e:
+                last_error = str(e).splitlines()[0] if str(e) else type(e).__name__
+                if isinstance(e, PostbackError) and not e.retryable:
+                    self.logger.warning(f"الصف {row_number}: رفض الخادم الحفظ: {last_error}")
+                    break # خطأ تحقق في البيانات، إعادة الإرسال لن تغير النتيجة
+                if supervisor is not None and not manager.is_ready:
+                    if stage["submitted"] and not self.resubmit_in_doubt:
+                        # انقطع الاتصال بعد الضغط على الحفظ: قد يكون الصف حُفظ، فلا يُعاد إرساله
+                        return RowResult(row_number, "in_doubt", attempt, (time.perf_counter() - started_at) * 1000,
+                                         error=f"انقطع الاتصال بعد الإرسال: {last_error}", values=values)
+                    self.logger.warning(f"الصف {row_number}: انقطع الاتصال بالمتصفح، بانتظار إعادة الاتصال...")
+                    if await supervisor.wait_until_ready(should_stop=self._stop_requested.is_set):
+                        page = await manager.new_page()
+                        if page is not None:
+                            pages[index] = page
+                            attempt -= 1 # انقطاع المتصفح لا يُحسب من محاولات الصف
+                            continue
+                    last_error = f"تعذرت إعادة الاتصال بالمتصفح: {last_error}"
+                    break
+                self.logger.warning(f"الصف {row_number}: فشلت المحاولة {attempt}: {last_error}")
+                if attempt <= self.max_retries:
+                    await asyncio.sleep(self.retry_delay * attempt)
+        self.logger.error(f"الصف {row_number}: فشل الإدخال بعد {attempt} محاولات.")
+        return RowResult(row_number, "failed", attempt, (time.perf_counter() - started_at) * 1000,
+                         error=last_error, values=values)
+
+    async def _prefill_succeeded(self, prefilled: asyncio.Task | None, row_number: int) -> bool:
+        if prefilled is None:
+            return False
+        try:
+            await prefilled
+            return True
+        except PlaywrightError as e:
+            # يُعاد الملء ضمن المحاولة نفسها
+            self.logger.debug(f"الصف {row_number}: فشل الملء المسبق: {e}")
+            return False
+
+    async def _fill_form(self, page: Page, values: dict[str, Any]):
+        loaded = self._page_loads.pop(page, None)
+        if loaded is not None:
+            try:
+                await loaded
+            except PlaywrightError:
+                pass
+        # رد الإرسال السابق (postback أو Post/Redirect/Get) يعرض النموذج من جديد، فلا حاجة لطلب الصفحة
+        if not await self._form_is_open(page):
+            await page.goto(self.data_entry_url, timeout=self.timeout, wait_until="domcontentloaded")
+        for column, selector in self.field_selectors.items():
+            await page.fill(selector, _format_cell_value(values.get(column)), timeout=self.timeout)
+
+    async def _form_is_open(self, page: Page) -> bool:
+        if urlsplit(page.url).path != urlsplit(self.data_entry_url).path:
+            return False
+        selectors = list(self.field_selectors.values()) or [self.submit_selector]
+        return await page.locator(selectors[0]).count() > 0
+
+    @staticmethod
+    def _is_postback_response(page: Page) -> Callable[[Response], bool]:
+        def predicate(response: Response) -> bool:
+            request = response.request
+            if request.frame != page.main_frame:
+                return False
+            if request.resource_type == "document":
+                return not 300 <= response.status < 400 # المستند النهائي بعد إعادة التوجيه (Post/Redirect/Get)
+            # UpdatePanel: الـ postback طلب XHR بدون انتقال للصفحة
+            return request.method == "POST" and request.resource_type in ("xhr", "fetch") and \
+                "x-microsoftajax" in request.headers
+        return predicate
+
+    @timed_operation("submit_row")
+    async def _submit_row(self, page: Page, values: dict[str, Any], stage: dict[str, bool],
+                          filled: bool = False) -> _PostbackResult:
+        if not filled:
+            await self._fill_form(page, values)
+        stage["submitted"] = True
+        loaded = asyncio.ensure_future(page.wait_for_event("domcontentloaded", timeout=self.timeout))
+        loaded.add_done_callback(lambda future: future.cancelled() or future.exception())
+        submitted_at = time.perf_counter()
+        try:
+            # الاكتمال = وصول رد الخادم، دون انتظار تحميل المستند الجديد (يُنتظر عند ملء الصف التالي)
+            async with page.expect_response(self._is_postback_response(page), timeout=self.timeout) as response_info:
+                await page.click(self.submit_selector, timeout=self.timeout, no_wait_after=True)
+            response = await response_info.value
+            status = await self._check_postback(response)
+        except BaseException:
+            loaded.cancel()
+            raise
+        submit_ms = (time.perf_counter() - submitted_at) * 1000
+        if response.request.resource_type == "document":
+            self._page_loads[page] = loaded
+        else:
+            loaded.cancel()
+        return _PostbackResult(status, submit_ms)
+
+    async def _check_postback(self, response: Response) -> str:
+        if response.status >= 400:
+            raise PostbackError(f"رد الحفظ HTTP {response.status}")
+        if self.success_marker is None and self.error_marker is None:
+            return "success"
+        body = await response.text()
+        if self.error_marker is not None:
+            match = self.error_marker.search(body)
+            if match:
+                raise PostbackError(f"رسالة خطأ في رد الحفظ: {match.group(0)[:200]}", retryable=False)
+        if self.success_marker is not None and not self.success_marker.search(body):
+            return "in_doubt"
+        return "success"
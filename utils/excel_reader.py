@@ -0,0 +1,123 @@
+# utils/excel_reader.py
+import logging
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+
+class ExcelColumnsMissingError(ValueError):
+    def __init__(self, missing: list[str], available: list[str]):
+        self.missing = missing
+        self.available = available
+        super().__init__(f"أعمدة غير موجودة في ورقة Excel: {', '.join(missing)} (الأعمدة المتاحة: {', '.join(available)})")
+
+
+logger = logging.getLogger(__name__)
+
+
+def _open_sheet_streaming(excel_file: Path, sheet_name: str | None):
+    # load_workbook(read_only=True) يمسح كل أوراق الملف عند الفتح إذا لم تحتوِ على وسم <dimension>
+    # (وهذا حال كثير من ملفات التصدير)، أي قراءة الملف كاملًا قبل أول صف.
+    # لذلك نجهز المصنف يدويًا ونفتح الورقة المطلوبة فقط دون حساب أبعادها.
+    # هذا يعتمد على أجزاء داخلية في openpyxl (مختبرة على 3.1.x)؛ إذا تغيرت في إصدار آخر
+    # نرجع إلى load_workbook(read_only=True) الأبطأ في الفتح لكنه صحيح.
+    try:
+        return _open_sheet_lazy(excel_file, sheet_name)
+    except (ImportError, AttributeError, TypeError) as e:
+        logger.warning(f"تعذر فتح ورقة Excel بالطريقة السريعة ({type(e).__name__}: {e})، "
+                       f"سيُستخدم load_workbook(read_only=True).")
+    return _open_sheet_read_only(excel_file, sheet_name)
+
+
+def _open_sheet_read_only(excel_file: Path, sheet_name: str | None):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_file, read_only=True, data_only=True)
+    if sheet_name is None:
+        return workbook, workbook.worksheets[0]
+    if sheet_name not in workbook.sheetnames:
+        workbook.close()
+        raise KeyError(f"الورقة '{sheet_name}' غير موجودة في الملف {excel_file}")
+    return workbook, workbook[sheet_name]
+
+
+def _open_sheet_lazy(excel_file: Path, sheet_name: str | None):
+    from openpyxl.reader.excel import ExcelReader
+    from openpyxl.styles.stylesheet import apply_stylesheet
+    from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+
+    class _LazyReadOnlyWorksheet(ReadOnlyWorksheet):
+        def _get_size(self):
+            pass
+
+    reader = ExcelReader(str(excel_file), read_only=True, data_only=True)
+    try:
+        reader.read_manifest()
+        reader.read_strings()
+        reader.read_workbook()
+        apply_stylesheet(reader.archive, reader.wb) # تنسيقات التاريخ لتحويل الأرقام إلى تواريخ
+        for sheet, rel in reader.parser.find_sheets():
+            if "chartsheet" in rel.Type or rel.target not in reader.valid_files:
+                continue
+            if sheet_name is None or sheet.name == sheet_name:
+                return reader.wb, _LazyReadOnlyWorksheet(reader.wb, sheet.name, rel.target, reader.shared_strings)
+    except Exception:
+        reader.archive.close()
+        raise
+    reader.archive.close()
+    raise KeyError(f"الورقة '{sheet_name}' غير موجودة في الملف {excel_file}")
+
+
+class ExcelRowReader:
+    # قارئ تدفقي لملف Excel: يفتح الملف بوضع read_only ويعيد صفًا واحدًا في كل مرة
+    # ولا يحتفظ إلا بالأعمدة المطلوبة، لذلك يبقى استهلاك الذاكرة ثابتًا مهما كبر الملف.
+    def __init__(self, excel_file: str, sheet_name: str | None, columns: Iterable[str] | None = None,
+                 header_row: int = 1, skip_empty_rows: bool = True, start_row: int | None = None):
+        self.excel_file = Path(excel_file)
+        self.sheet_name = sheet_name
+        self.columns = list(columns) if columns is not None else None
+        self.header_row = header_row
+        self.skip_empty_rows = skip_empty_rows
+        # رقم أول صف بيانات يُعاد (لاستئناف عملية متوقفة)، الصفوف قبله تُتخطى دون بناء قيمها
+        self.start_row = start_row
+
+    def __iter__(self) -> Iterator[tuple[int, dict[str, Any]]]:
+        return self.iter_rows()
+
+    def iter_rows(self) -> Iterator[tuple[int, dict[str, Any]]]:
+        workbook, sheet = _open_sheet_streaming(self.excel_file, self.sheet_name)
+        try:
+            header = next(sheet.iter_rows(min_row=self.header_row, max_row=self.header_row, values_only=True), None)
+            if not header:
+                return
+            header_names = [str(name).strip() if name is not None else "" for name in header]
+            positions = self._resolve_positions(header_names)
+            if not positions:
+                return
+
+            # قراءة النطاق الذي يغطي الأعمدة المطلوبة فقط بدل الصف بكامل عرضه
+            min_col = min(positions.values()) + 1
+            max_col = max(positions.values()) + 1
+            projection = [(name, index - (min_col - 1)) for name, index in positions.items()]
+
+            first_row = max(self.header_row + 1, self.start_row or 0)
+            rows = sheet.iter_rows(min_row=first_row, min_col=min_col, max_col=max_col, values_only=True)
+            for row_number, row in enumerate(rows, start=first_row):
+                values = {name: (row[offset] if offset < len(row) else None) for name, offset in projection}
+                if self.skip_empty_rows and all(value is None for value in values.values()):
+                    continue
+                yield row_number, values
+        finally:
+            workbook.close()
+
+    def _resolve_positions(self, header_names: list[str]) -> dict[str, int]:
+        if self.columns is None:
+            return {name: index for index, name in enumerate(header_names) if name}
+
+        index_by_name: dict[str, int] = {}
+        for index, name in enumerate(header_names):
+            if name and name not in index_by_name:
+                index_by_name[name] = index
+        missing = [name for name in self.columns if name not in index_by_name]
+        if missing:
+            raise ExcelColumnsMissingError(missing, [name for name in header_names if name])
+        return {name: index_by_name[name] for name in self.columns}
@@ -1,13 +1,99 @@
 ﻿# utils/logger.py
+import atexit
 import logging
 import os
+import queue
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 # تحديد المسار الأساسي للمشروع بناءً على موقع هذا الملف
 # يفترض أن مجلد utils داخل المجلد الرئيسي للمشروع
-LOGS_DIR = Path(__file__).resolve().parent.parent / "logs"
-LOGS_DIR.mkdir(exist_ok=True) # التأكد من وجود مجلد السجلات
+LOGS_DIR = Path(__file__).resolve().parent.parent / "logs" # يُنشأ عند كتابة أول سجل، لا عند الاستيراد
+
+LOG_FORMAT = '%(asctime)s - %(name)s - [%(levelname)s] - (%(threadName)s) - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# كل المسجلات تضع سجلاتها في طابور غير محدود (لا يحجب أبدًا)، وخيط مستمع واحد يكتبها
+# إلى الملف والطرفية. بهذا لا ينتظر خيط المتصفح أو خيط الواجهة عمليات القرص.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+# أحداث التوقيت المنظمة (سطر JSON لكل حدث) تمر بنفس الطابور وتُكتب في ملف مستقل
+EVENTS_LOGGER_NAME = "SehaCafm.events"
+_listener: QueueListener | None = None
+_listener_lock = threading.Lock()
+
+
+class _LazyFileHandler(logging.FileHandler):
+    # يفتح الملف (وينشئ مجلده) عند أول سجل في خيط المستمع، فلا يلمس بدء التشغيل القرص
+    def __init__(self, file_path: Path):
+        super().__init__(file_path, encoding='utf-8', delay=True)
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+class _EventsFilter(logging.Filter):
+    def __init__(self, events: bool):
+        super().__init__()
+        self.events = events
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return (record.name == EVENTS_LOGGER_NAME) == self.events
+
+
+def _start_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+
+        log_file = LOGS_DIR / f'app_{datetime.now().strftime("%Y%m%d")}.log'
+        file_handler = _LazyFileHandler(log_file)
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(formatter)
+
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(formatter)
+
+        events_file = LOGS_DIR / f'events_{datetime.now().strftime("%Y%m%d")}.jsonl'
+        events_handler = _LazyFileHandler(events_file)
+        events_handler.setFormatter(logging.Formatter('%(message)s'))
+
+        file_handler.addFilter(_EventsFilter(False))
+        console_handler.addFilter(_EventsFilter(False))
+        events_handler.addFilter(_EventsFilter(True))
+
+        _listener = QueueListener(_log_queue, file_handler, console_handler, events_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    # يكتب ما تبقى في الطابور ثم يغلق الملفات؛ يُستدعى تلقائيًا عند خروج البرنامج
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def get_events_logger() -> logging.Logger:
+    # مسجل أحداث التوقيت: الرسالة نفسها سطر JSON جاهز
+    events_logger = logging.getLogger(EVENTS_LOGGER_NAME)
+    if not events_logger.handlers:
+        events_logger.setLevel(logging.INFO)
+        events_logger.propagate = False
+        events_logger.addHandler(QueueHandler(_log_queue))
+        _start_listener()
+    return events_logger
+
 
 class Logger:
     _loggers = {} # قاموس لتخزين مثيلات المسجلات لمنع التكرار
@@ -21,35 +107,21 @@ class Logger:
         
         if not logger_instance.logger.handlers: # إضافة المعالجات فقط إذا لم تكن موجودة
             logger_instance.logger.setLevel(level)
-            
-            formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - [%(levelname)s] - (%(threadName)s) - %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S'
-            )
-            
-            log_file = LOGS_DIR / f'app_{datetime.now().strftime("%Y%m%d")}.log'
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
-            file_handler.setLevel(logging.DEBUG)
-            file_handler.setFormatter(formatter)
-            
-            console_handler = logging.StreamHandler()
-            console_handler.setLevel(logging.INFO) 
-            console_handler.setFormatter(formatter)
-            
-            logger_instance.logger.addHandler(file_handler)
-            logger_instance.logger.addHandler(console_handler)
+            # التنسيق والكتابة يتمان في خيط المستمع، وهنا فقط وضع السجل في الطابور
+            logger_instance.logger.addHandler(QueueHandler(_log_queue))
+            _start_listener()
         
         cls._loggers[name] = logger_instance
         return logger_instance
 
-    def debug(self, message):
-        self.logger.debug(message)
+    def debug(self, message, exc_info=False):
+        self.logger.debug(message, exc_info=exc_info)
 
-    def info(self, message):
-        self.logger.info(message)
+    def info(self, message, exc_info=False):
+        self.logger.info(message, exc_info=exc_info)
 
-    def warning(self, message):
-        self.logger.warning(message)
+    def warning(self, message, exc_info=False):
+        self.logger.warning(message, exc_info=exc_info)
 
     def error(self, message, exc_info=False):
         self.logger.error(message, exc_info=exc_info)
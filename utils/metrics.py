@@ -0,0 +1,229 @@
+# utils/metrics.py
+# قياسات زمن العمليات: كل عملية متصفح (اتصال، انتقال، فحص عنصر، حفظ جلسة، إرسال نموذج...)
+# تسجل حدث توقيت منظمًا {operation, duration_ms, outcome, url} يُكتب سطر JSON في ملف الأحداث
+# (logs/events_YYYYMMDD.jsonl) ويُجمع في مدرج تكراري لكل عملية لحساب p50/p95/p99.
+import asyncio
+import functools
+import inspect
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Callable
+
+from utils.logger import LOGS_DIR, get_events_logger
+
+OUTCOME_OK = "ok"
+OUTCOME_FAIL = "fail" # العملية انتهت لكن نتيجتها سلبية (مثل عنصر غير موجود)
+OUTCOME_ERROR = "error" # استثناء
+OUTCOME_CANCELLED = "cancelled" # أُلغيت المهمة (asyncio.CancelledError) قبل انتهاء العملية
+
+# حدود المدرج التكراري: صناديق لوغاريتمية بنمو 5% من 0.1 ms حتى ~10 دقائق،
+# فالخطأ في أي نسبة مئوية لا يتجاوز 5% والذاكرة ثابتة مهما طال التشغيل
+_BUCKET_MIN_MS = 0.1
+_BUCKET_GROWTH = 1.05
+_BUCKET_COUNT = 330
+_LOG_GROWTH = math.log(_BUCKET_GROWTH)
+
+
+@dataclass
+class TimingEvent:
+    operation: str
+    duration_ms: float
+    outcome: str = OUTCOME_OK
+    url: str | None = None
+    target: str | None = None # محدد العنصر أو اسم الملف حسب العملية
+    error: str | None = None
+    ts: float = field(default_factory=time.time)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.buckets = [0] * (_BUCKET_COUNT + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.outcomes: dict[str, int] = {}
+
+    @staticmethod
+    def _bucket(duration_ms: float) -> int:
+        if duration_ms <= _BUCKET_MIN_MS:
+            return 0
+        return min(int(math.log(duration_ms / _BUCKET_MIN_MS) / _LOG_GROWTH) + 1, _BUCKET_COUNT)
+
+    def add(self, duration_ms: float, outcome: str):
+        self.buckets[self._bucket(duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def percentile(self, fraction: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                # الحد الأعلى للصندوق، ولا يتجاوز أكبر قيمة فعلية
+                return min(_BUCKET_MIN_MS * _BUCKET_GROWTH ** index, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50), 2),
+            "p95_ms": round(self.percentile(0.95), 2),
+            "p99_ms": round(self.percentile(0.99), 2),
+            "max_ms": round(self.max_ms, 2),
+            "total_s": round(self.total_ms / 1000, 2),
+            "outcomes": dict(self.outcomes),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, write_events: bool = True):
+        self.write_events = write_events
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._events_logger = None
+        self.started_at = time.time()
+
+    def record(self, event: TimingEvent):
+        with self._lock:
+            histogram = self._histograms.get(event.operation)
+            if histogram is None:
+                histogram = self._histograms[event.operation] = LatencyHistogram()
+            histogram.add(event.duration_ms, event.outcome)
+        if self.write_events:
+            if self._events_logger is None:
+                self._events_logger = get_events_logger()
+            data = {key: value for key, value in asdict(event).items() if value is not None}
+            data["duration_ms"] = round(event.duration_ms, 3)
+            self._events_logger.info(json.dumps(data, ensure_ascii=False))
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {operation: histogram.summary() for operation, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    def format_table(self) -> str:
+        snapshot = self.snapshot()
+        if not snapshot:
+            return "لا توجد قياسات بعد."
+        header = f"{'operation':<32}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'total s':>10}  outcomes"
+        lines = [header, "-" * len(header)]
+        for operation, stats in snapshot.items():
+            outcomes = " ".join(f"{name}={count}" for name, count in sorted(stats["outcomes"].items()))
+            lines.append(f"{operation:<32}{stats['count']:>8}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+                         f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}{stats['total_s']:>10.1f}  {outcomes}")
+        return "\n".join(lines)
+
+    def dump(self, file_path: str | Path | None = None) -> Path:
+        file_path = Path(file_path) if file_path else LOGS_DIR / f"metrics_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"since": self.started_at, "dumped_at": time.time(), "operations": self.snapshot()}
+        file_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        return file_path
+
+
+# سجل القياسات المشترك لكل البرنامج
+METRICS = MetricsRegistry()
+
+
+class timed:
+    # مدير سياق لقياس جزء من الكود يدويًا:
+    #   with timed("submit_row", url=page.url) as event:
+    #       ...
+    #       event.outcome = OUTCOME_FAIL
+    def __init__(self, operation: str, url: str | None = None, target: str | None = None,
+                 registry: MetricsRegistry | None = None):
+        self.event = TimingEvent(operation, 0.0, url=url, target=target)
+        self.registry = registry or METRICS
+        self._started_at = 0.0
+
+    def __enter__(self) -> TimingEvent:
+        self._started_at = time.perf_counter()
+        return self.event
+
+    def __exit__(self, exc_type, exc, tb):
+        self.event.duration_ms = (time.perf_counter() - self._started_at) * 1000
+        if exc is not None:
+            self.event.outcome = OUTCOME_CANCELLED if isinstance(exc, asyncio.CancelledError) else OUTCOME_ERROR
+            self.event.error = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+        self.registry.record(self.event)
+        return False
+
+
+def _default_outcome(result: Any) -> str:
+    if result is None or result is False:
+        return OUTCOME_FAIL
+    status = getattr(result, "status", None) # مثل SessionHealth
+    if isinstance(status, str):
+        return status
+    return OUTCOME_OK
+
+
+def timed_operation(operation: str, url_arg: str | None = None, target_arg: str | None = None,
+                    outcome: Callable[[Any], str] = _default_outcome):
+    # مزخرف لدوال مدير المتصفح (العادية وغير المتزامنة). url يُؤخذ من المعامل url_arg إن وُجد،
+    # وإلا من رابط الصفحة (page.url) وهي قيمة محلية لا تحتاج رحلة إلى المتصفح.
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def build_event(args, kwargs) -> tuple[TimingEvent, Any]:
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            event = TimingEvent(operation, 0.0,
+                                url=bound.get(url_arg) if url_arg else None,
+                                target=bound.get(target_arg) if target_arg else None)
+            # الصفحة الممررة للدالة (مثل صفحات مجموعة الإدخال) وإلا الصفحة الحالية للمدير
+            page = bound.get("page") or getattr(args[0] if args else None, "page", None)
+            return event, page
+
+        def finish(event: TimingEvent, started_at: float, page, result=None, exc: BaseException | None = None):
+            event.duration_ms = (time.perf_counter() - started_at) * 1000
+            if event.url is None and page is not None:
+                try:
+                    event.url = page.url
+                except Exception:
+                    pass
+            if exc is not None:
+                event.outcome = OUTCOME_CANCELLED if isinstance(exc, asyncio.CancelledError) else OUTCOME_ERROR
+                event.error = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+            else:
+                event.outcome = outcome(result)
+            METRICS.record(event)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                (event, page), started_at = build_event(args, kwargs), time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e: # CancelledError ليس Exception ويجب أن يُسجل أيضًا
+                    finish(event, started_at, page, exc=e)
+                    raise
+                finish(event, started_at, page, result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            (event, page), started_at = build_event(args, kwargs), time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                finish(event, started_at, page, exc=e)
+                raise
+            finish(event, started_at, page, result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,311 @@
+# utils/monitoring_service.py
+# خدمة مراقبة أوامر العمل: تنفذ خطوات الانتقال (monitoring.navigation_steps) مرة واحدة،
+# وتبقي تبويب "Site wise Work Orders" مفتوحًا، ثم في كل دورة تكتشف التغيير بأرخص طريقة ممكنة
+# ولا تستخرج إلا الصفوف الجديدة أو المتغيرة.
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from playwright.async_api import Page, Error as PlaywrightError
+
+from utils.async_browser_manager import AsyncBrowserManager
+from utils.connection_supervisor import AsyncConnectionSupervisor
+from utils.rate_limiter import TokenBucket
+from utils.notifications import NotificationDispatcher, KIND_NEW, KIND_UPDATED
+from utils.navigation_steps import NavigationStepRunner, NavigationStepError
+from utils.metrics import timed_operation
+from utils.table_extractor import TableExtractor
+from utils.seen_ids_store import SeenIdStore, resolve_store_path
+
+APP_BASE_DIR = Path(__file__).resolve().parent.parent
+
+# حقول ASP.NET المخفية تتغير مع كل طلب حتى لو لم تتغير البيانات، فتُستبعد من بصمة الصفحة
+_VOLATILE_INPUTS_RE = re.compile(
+    r'<input[^>]+name="(?:__VIEWSTATE|__VIEWSTATEGENERATOR|__EVENTVALIDATION|__REQUESTDIGEST)[^"]*"[^>]*>',
+    re.IGNORECASE,
+)
+
+
+class MonitoringPageError(RuntimeError):
+    pass
+
+
+@dataclass
+class PollResult:
+    changed: bool
+    probe_skipped: bool = False # لم يتغير رد الطلب الخفيف، فلم يُعد تحميل الصفحة
+    total_rows: int = 0
+    new_rows: list[dict[str, Any]] = field(default_factory=list)
+    updated_rows: list[dict[str, Any]] = field(default_factory=list)
+    duration_ms: float = 0.0
+
+
+class MonitoringService:
+    def __init__(self, browser_manager: AsyncBrowserManager, monitoring_config: dict, name: str = "monitor",
+                 on_new_rows: Callable[[list[dict[str, Any]]], Any] | None = None,
+                 on_updated_rows: Callable[[list[dict[str, Any]]], Any] | None = None,
+                 supervisor: AsyncConnectionSupervisor | None = None, rate_limiter: TokenBucket | None = None,
+                 notifier: NotificationDispatcher | None = None, logger_instance=None):
+        self.browser_manager = browser_manager
+        self.supervisor = supervisor # عند انقطاع المتصفح تنتظر المراقبة إعادة الاتصال ثم تكمل
+        self.rate_limiter = rate_limiter # حد معدل الحساب، يُنتظر قبل كل دورة
+        self.notifier = notifier # التنبيهات تُضاف لطابوره دون انتظار الإرسال
+        self.config = monitoring_config
+        self.name = name
+        self.on_new_rows = on_new_rows
+        self.on_updated_rows = on_updated_rows
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+
+        self.interval = float(monitoring_config.get("interval", 180))
+        self.timeout = int(monitoring_config.get("timeout", 60000))
+        self.table_selector = monitoring_config.get("table_selector", "")
+        # كل دورة = استدعاء evaluate واحد يقرأ الجدول كله (بكل صفحاته إن كان مقسمًا)
+        self.extractor = TableExtractor.from_config(monitoring_config, logger_instance=self.logger)
+        self.probe_with_request = bool(monitoring_config.get("probe_with_request", True))
+
+        seen_file = Path(monitoring_config.get("seen_data_ids_file") or "data/seen_work_orders.db")
+        store_file, self._legacy_seen_ids_file = resolve_store_path(seen_file if seen_file.is_absolute() else APP_BASE_DIR / seen_file)
+        self.seen_ids = SeenIdStore(store_file, retention_days=monitoring_config.get("seen_ids_retention_days"))
+
+        self.page: Page | None = None
+        self._step_runner: NavigationStepRunner | None = None
+        self._row_hashes: dict[str, str] = {} # id -> بصمة الصف في آخر دورة
+        self._fingerprint: str | None = None
+        self._probe_digest: str | None = None
+        self._table_pages = 0
+        self._reopen_page = False
+        self._stop_event: asyncio.Event | None = None
+        self._wake_event: asyncio.Event | None = None # يقطع انتظار الفترة عند الإيقاف أو تغيير الإعدادات
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    # --- تحديث الإعدادات أثناء التشغيل ---
+    def update_config(self, monitoring_config: dict):
+        # آمن للاستدعاء من أي خيط (مثل مستمع ConfigManager)؛ التطبيق يتم داخل حلقة المراقبة
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._apply_config, monitoring_config)
+        else:
+            self._apply_config(monitoring_config)
+
+    def _apply_config(self, monitoring_config: dict):
+        # ما يتغير دون إعادة تشغيل: الفترة والمهلة ومحددات الجدول وقواعد الاستخراج وخطوات الانتقال.
+        # ملف المعرفات المرئية يبقى كما هو حتى إعادة التشغيل.
+        try:
+            extractor = TableExtractor.from_config(monitoring_config, logger_instance=self.logger)
+        except ValueError as e:
+            self.logger.error(f"[{self.name}] لم تُطبق إعدادات المراقبة الجديدة: {e}")
+            return
+        previous, self.config = self.config, monitoring_config
+        self.interval = float(monitoring_config.get("interval", 180))
+        self.timeout = int(monitoring_config.get("timeout", 60000))
+        self.probe_with_request = bool(monitoring_config.get("probe_with_request", True))
+        if (extractor.table_selector, extractor.rules, extractor.id_rule, extractor.watch_selectors, extractor.pager) != \
+                (self.extractor.table_selector, self.extractor.rules, self.extractor.id_rule,
+                 self.extractor.watch_selectors, self.extractor.pager):
+            # القواعد الجديدة تُطبق على كل الصفوف في الدورة التالية
+            self.extractor = extractor
+            self.table_selector = extractor.table_selector
+            self._row_hashes = {}
+            self._fingerprint = None
+        if any(previous.get(key) != monitoring_config.get(key) for key in ("monitoring_page_url", "navigation_steps")):
+            self._step_runner = None
+            self._reopen_page = True
+        if self._wake_event:
+            self._wake_event.set()
+        self.logger.info(f"[{self.name}] تم تطبيق إعدادات المراقبة الجديدة (الفترة {self.interval:.0f} ث).")
+
+    # --- خطوات الانتقال ---
+    @timed_operation("open_monitoring_page")
+    async def open_monitoring_page(self) -> Page:
+        page = await self.browser_manager.new_page()
+        if page is None:
+            raise MonitoringPageError("لا يوجد سياق متصفح صالح لبدء المراقبة.")
+        direct_url = self.config.get("monitoring_page_url")
+        try:
+            if direct_url:
+                await page.goto(direct_url, timeout=self.timeout, wait_until="domcontentloaded")
+            else:
+                if self._step_runner is None:
+                    self._step_runner = NavigationStepRunner(self.config.get("navigation_steps", []), self.timeout,
+                                                             logger_instance=self.logger)
+                page = (await self._step_runner.run(page)).page
+        except (PlaywrightError, NavigationStepError):
+            # لا يبقى تبويب مفتوح لكل محاولة فاشلة
+            if not page.is_closed():
+                try:
+                    await page.close()
+                except PlaywrightError:
+                    pass
+            raise
+        self.page = page
+        self._fingerprint = None
+        self._probe_digest = None
+        self.logger.info(f"[{self.name}] صفحة المراقبة جاهزة: {page.url}")
+        return page
+
+    # --- دورة المراقبة ---
+    @timed_operation("monitor_poll", outcome=lambda result: "probe_skipped" if result.probe_skipped
+                     else ("changed" if result.changed else "unchanged"))
+    async def poll_once(self) -> PollResult:
+        started_at = time.perf_counter()
+        if self._reopen_page:
+            self._reopen_page = False
+            await self._close_page()
+        if self.page is None or self.page.is_closed():
+            await self.open_monitoring_page()
+        elif self._fingerprint is not None:
+            # الطلب الخفيف يرى الصفحة الأولى فقط، فلا يُعتمد عليه إن كان الجدول مقسمًا لصفحات
+            if self.probe_with_request and self._table_pages <= 1 and await self._probe_unchanged():
+                return PollResult(False, probe_skipped=True, total_rows=len(self._row_hashes),
+                                  duration_ms=(time.perf_counter() - started_at) * 1000)
+            await self.page.reload(timeout=self.timeout, wait_until="domcontentloaded")
+
+        snapshot = await self.extractor.extract(self.page, known_hashes=list(self._row_hashes.values()))
+        result = PollResult(changed=snapshot.fingerprint != self._fingerprint, total_rows=snapshot.row_count)
+        self._fingerprint = snapshot.fingerprint
+        self._table_pages = snapshot.pages
+        if self.table_selector and not snapshot.found:
+            self.logger.warning(f"[{self.name}] جدول المراقبة '{self.table_selector}' غير موجود في الصفحة.")
+
+        if result.changed:
+            # أول لقطة بعد التشغيل لا نعرف فيها الحالة السابقة للصفوف، فلا نبلغ عن "تغير"
+            is_baseline = not self._row_hashes
+            extracted = {index: snapshot.record(index) for index in snapshot.extracted}
+            row_ids = [str(row_id) for row_id in snapshot.ids]
+            # استعلام واحد للمخزن لكل الصفوف المتغيرة بدل فحص كل صف على حدة
+            already_seen = self.seen_ids.contains_many(row_ids[index] for index in extracted)
+            new_ids: list[str] = []
+            row_hashes: dict[str, str] = {}
+            for index, (row_id, row_hash) in enumerate(zip(row_ids, snapshot.hashes)):
+                row_hashes[row_id] = row_hash
+                if index not in extracted:
+                    continue # نفس البصمة السابقة: الصف لم يتغير
+                record = extracted[index]
+                if row_id not in already_seen:
+                    new_ids.append(row_id)
+                    result.new_rows.append(record)
+                elif not is_baseline:
+                    result.updated_rows.append(record)
+            self._row_hashes = row_hashes
+            await self._handle_changes(result, new_ids)
+
+        result.duration_ms = (time.perf_counter() - started_at) * 1000
+        return result
+
+    async def _probe_unchanged(self) -> bool:
+        # طلب HTTP واحد عبر سياق المتصفح (بنفس الكوكيز) دون تحميل الموارد الفرعية أو رسم الصفحة.
+        # إذا لم يتغير المحتوى (بعد حذف الحقول المتغيرة) فلا داعي لإعادة تحميل التبويب.
+        try:
+            response = await self.page.context.request.get(self.page.url, timeout=self.timeout, max_redirects=0)
+            try:
+                if response.status != 200:
+                    return False
+                body = await response.text()
+            finally:
+                # Playwright يحتفظ بجسم الرد حتى إغلاق السياق ما لم يُحرر
+                await response.dispose()
+        except PlaywrightError as e:
+            self.logger.debug(f"[{self.name}] فشل الطلب الخفيف، سيتم إعادة تحميل الصفحة: {e}")
+            return False
+        digest = hashlib.sha1(_VOLATILE_INPUTS_RE.sub("", body).encode("utf-8")).hexdigest()
+        unchanged = digest == self._probe_digest
+        self._probe_digest = digest
+        return unchanged
+
+    async def _handle_changes(self, result: PollResult, new_ids: list[str]):
+        if new_ids:
+            self.seen_ids.add_many(new_ids)
+        id_field = self.extractor.id_rule["name"] if self.extractor.id_rule else None
+        if result.new_rows:
+            self.logger.info(f"[{self.name}] {len(result.new_rows)} أمر عمل جديد.")
+            if self.notifier:
+                self.notifier.submit_rows(result.new_rows, KIND_NEW, id_field, self.name)
+            if self.on_new_rows:
+                await _maybe_await(self.on_new_rows(result.new_rows))
+        if result.updated_rows:
+            self.logger.info(f"[{self.name}] {len(result.updated_rows)} أمر عمل تغيرت بياناته.")
+            if self.notifier and self.notifier.notify_updates:
+                self.notifier.submit_rows(result.updated_rows, KIND_UPDATED, id_field, self.name)
+            if self.on_updated_rows:
+                await _maybe_await(self.on_updated_rows(result.updated_rows))
+
+    # --- المعرفات التي تمت رؤيتها ---
+    def _open_seen_ids(self):
+        self.seen_ids.open()
+        if self._legacy_seen_ids_file.is_file():
+            try:
+                migrated = self.seen_ids.import_json(self._legacy_seen_ids_file)
+                self.logger.info(f"[{self.name}] تم ترحيل {migrated} معرف من {self._legacy_seen_ids_file} إلى {self.seen_ids.db_file}.")
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"[{self.name}] تعذر ترحيل ملف المعرفات {self._legacy_seen_ids_file}: {e}")
+
+    # --- التشغيل المستمر ---
+    async def run_forever(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._wake_event = asyncio.Event()
+        self._open_seen_ids()
+        if self.notifier:
+            self.notifier.start()
+        self.logger.info(f"[{self.name}] بدء المراقبة كل {self.interval:.0f} ث.")
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.acquire()
+                    result = await self.poll_once()
+                    if result.probe_skipped:
+                        self.logger.debug(f"[{self.name}] لا تغيير (طلب خفيف، {result.duration_ms:.0f} ms).")
+                    elif not result.changed:
+                        self.logger.debug(f"[{self.name}] لا تغيير في الجدول ({result.duration_ms:.0f} ms).")
+                except (PlaywrightError, NavigationStepError, MonitoringPageError) as e:
+                    # خطأ مؤقت (مهلة انتقال، انقطاع المتصفح...): تُعاد المحاولة في الدورة التالية
+                    self.logger.error(f"[{self.name}] خطأ أثناء دورة المراقبة: {e}")
+                    await self._close_page() # لا يبقى تبويب يتيم في السياق؛ ستُعاد خطوات الانتقال في الدورة التالية
+                    if self.supervisor is not None and not self.browser_manager.is_ready:
+                        self.logger.warning(f"[{self.name}] انقطع الاتصال بالمتصفح، بانتظار إعادة الاتصال...")
+                        if await self.supervisor.wait_until_ready(should_stop=self._stop_event.is_set):
+                            continue # دورة فورية بعد عودة الاتصال بدل انتظار الفترة كاملة
+                await self._wait_interval()
+        finally:
+            await self._close_page()
+            if self.notifier:
+                await self.notifier.stop()
+            self.seen_ids.close()
+            self.logger.info(f"[{self.name}] تم إيقاف المراقبة.")
+
+    async def _wait_interval(self):
+        # الفترة تُقرأ من جديد عند كل تنبيه، فتغييرها في الإعدادات يسري على الانتظار الجاري
+        started_at = time.monotonic()
+        while not self._stop_event.is_set():
+            remaining = self.interval - (time.monotonic() - started_at)
+            if remaining <= 0:
+                return
+            self._wake_event.clear()
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return
+
+    async def _close_page(self):
+        if self.page and not self.page.is_closed():
+            try:
+                await self.page.close()
+            except PlaywrightError:
+                pass
+        self.page = None
+
+    def request_stop(self):
+        # آمن للاستدعاء من أي خيط
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+            self._loop.call_soon_threadsafe(self._wake_event.set)
+
+
+async def _maybe_await(value):
+    if asyncio.iscoroutine(value):
+        await value
@@ -0,0 +1,208 @@
+# utils/navigation_steps.py
+# منفذ خطوات الانتقال المعرفة كبيانات في الإعدادات (مثل monitoring.navigation_steps).
+# قائمة الخطوات يتم التحقق منها وتحويلها مرة واحدة إلى "مراحل" جاهزة للتنفيذ:
+# - خطوات wait_for_selector المتتالية تُنفذ معًا بالتوازي (زمن المرحلة = زمن أبطأ عنصر)
+# - wait_for_selector على نفس عنصر النقرة التالية يُدمج في النقرة (click تنتظر العنصر تلقائيًا)
+# - الـ Locator لكل محدد يُنشأ مرة واحدة لكل صفحة ويُعاد استخدامه
+# ويُسجل زمن كل خطوة لمعرفة أين يذهب وقت الانتقال.
+import asyncio
+import json
+import logging
+import time
+import weakref
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+
+from playwright.async_api import Page, Locator, Error as PlaywrightError
+
+from utils.metrics import timed
+
+ACTIONS = ("goto", "wait_for_selector", "click")
+WAIT_UNTIL_VALUES = ("commit", "domcontentloaded", "load", "networkidle")
+
+
+class NavigationStepError(RuntimeError):
+    def __init__(self, step_index: int, message: str):
+        super().__init__(f"الخطوة {step_index}: {message}")
+        self.step_index = step_index
+
+
+@dataclass(frozen=True)
+class NavigationStep:
+    index: int # رقم الخطوة في الإعدادات (يبدأ من 1)
+    action: str
+    url: str = ""
+    selector: str = ""
+    timeout: int | None = None
+    wait_until: str = "domcontentloaded"
+    new_tab: bool = False
+    url_contains_check: str = ""
+    merged_waits: tuple[int, ...] = () # خطوات wait_for_selector المدمجة في هذه النقرة
+
+
+@dataclass
+class StepTiming:
+    index: int
+    action: str
+    target: str
+    duration_ms: float
+    merged_into: int | None = None
+
+
+@dataclass
+class NavigationResult:
+    page: Page
+    timings: list[StepTiming] = field(default_factory=list)
+    total_ms: float = 0.0
+
+    def summary(self) -> str:
+        parts = [f"{t.index}.{t.action}={t.duration_ms:.0f}ms" if t.merged_into is None
+                 else f"{t.index}.{t.action}->{t.merged_into}" for t in self.timings]
+        return f"{self.total_ms:.0f} ms ({', '.join(parts)})"
+
+
+def _compile_step(index: int, raw: dict) -> NavigationStep:
+    if not isinstance(raw, dict):
+        raise NavigationStepError(index, "يجب أن تكون الخطوة كائنًا (dict).")
+    action = raw.get("action")
+    if action not in ACTIONS:
+        raise NavigationStepError(index, f"إجراء غير معروف '{action}'. الإجراءات المدعومة: {', '.join(ACTIONS)}.")
+    timeout = raw.get("timeout")
+    if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0):
+        raise NavigationStepError(index, f"قيمة timeout غير صالحة: {timeout!r}.")
+    wait_until = raw.get("wait_until", "domcontentloaded")
+    if wait_until not in WAIT_UNTIL_VALUES:
+        raise NavigationStepError(index, f"قيمة wait_until غير صالحة: {wait_until!r}.")
+
+    url = raw.get("url", "")
+    selector = raw.get("selector", "")
+    if action == "goto" and not (isinstance(url, str) and url):
+        raise NavigationStepError(index, "الإجراء goto يتطلب url.")
+    if action != "goto" and not (isinstance(selector, str) and selector.strip()):
+        raise NavigationStepError(index, f"الإجراء {action} يتطلب selector.")
+    if action != "click" and (raw.get("new_tab") or raw.get("url_contains_check")):
+        raise NavigationStepError(index, "new_tab و url_contains_check متاحان لإجراء click فقط.")
+
+    return NavigationStep(
+        index=index,
+        action=action,
+        url=url,
+        selector=selector.strip() if isinstance(selector, str) else "",
+        timeout=int(timeout) if timeout is not None else None,
+        wait_until=wait_until,
+        new_tab=bool(raw.get("new_tab", False)),
+        url_contains_check=str(raw.get("url_contains_check") or ""),
+    )
+
+
+def _plan(steps: list[NavigationStep]) -> tuple[tuple[NavigationStep, ...], ...]:
+    stages: list[list[NavigationStep]] = []
+    for step in steps:
+        previous = stages[-1] if stages else None
+        if step.action == "click" and previous and previous[-1].action == "wait_for_selector":
+            # الانتظارات على نفس عنصر النقرة زائدة: النقرة نفسها تنتظر ظهور العنصر
+            redundant = [wait for wait in previous if wait.selector == step.selector]
+            if redundant:
+                remaining = [wait for wait in previous if wait.selector != step.selector]
+                # المهلة الافتراضية (None) تبقى كما هي؛ وإلا فأطول مهلة بين الخطوات المدمجة
+                timeouts = [step.timeout, *(wait.timeout for wait in redundant)]
+                step = replace(step, timeout=None if None in timeouts else max(timeouts),
+                               merged_waits=tuple(wait.index for wait in redundant))
+                if remaining:
+                    previous[:] = remaining
+                else:
+                    stages.pop()
+        if step.action == "wait_for_selector" and stages and stages[-1][-1].action == "wait_for_selector":
+            stages[-1].append(step) # انتظارات مستقلة متتالية: مرحلة واحدة متوازية
+        else:
+            stages.append([step])
+    return tuple(tuple(stage) for stage in stages)
+
+
+@lru_cache(maxsize=32)
+def _compile_cached(steps_json: str) -> tuple[tuple[NavigationStep, ...], ...]:
+    raw_steps = json.loads(steps_json)
+    if not isinstance(raw_steps, list):
+        raise NavigationStepError(0, "navigation_steps يجب أن تكون قائمة.")
+    return _plan([_compile_step(index, raw) for index, raw in enumerate(raw_steps, start=1)])
+
+
+def compile_steps(raw_steps: list[dict]) -> tuple[tuple[NavigationStep, ...], ...]:
+    # نفس القائمة في الإعدادات تُحول مرة واحدة فقط طوال عمر البرنامج
+    return _compile_cached(json.dumps(raw_steps, sort_keys=True, ensure_ascii=False))
+
+
+class NavigationStepRunner:
+    def __init__(self, raw_steps: list[dict], default_timeout: int = 60000, logger_instance=None):
+        self.stages = compile_steps(raw_steps)
+        self.default_timeout = default_timeout
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+        self._locators: "weakref.WeakKeyDictionary[Page, dict[str, Locator]]" = weakref.WeakKeyDictionary()
+
+    @property
+    def step_count(self) -> int:
+        return sum(1 + len(step.merged_waits) for stage in self.stages for step in stage)
+
+    def locator(self, page: Page, selector: str) -> Locator:
+        page_locators = self._locators.setdefault(page, {})
+        locator = page_locators.get(selector)
+        if locator is None:
+            locator = page_locators[selector] = page.locator(selector).first
+        return locator
+
+    def _timeout(self, step: NavigationStep) -> int:
+        return step.timeout if step.timeout is not None else self.default_timeout
+
+    async def run(self, page: Page) -> NavigationResult:
+        result = NavigationResult(page)
+        started_at = time.perf_counter()
+        for stage in self.stages:
+            if len(stage) == 1:
+                timings = [await self._run_step(result, stage[0])]
+            else:
+                timings = await asyncio.gather(*(self._run_step(result, step) for step in stage))
+            for step, timing in zip(stage, timings):
+                result.timings.extend(StepTiming(index, "wait_for_selector", step.selector, 0.0, merged_into=step.index)
+                                      for index in step.merged_waits)
+                result.timings.append(timing)
+        result.timings.sort(key=lambda timing: timing.index)
+        result.total_ms = (time.perf_counter() - started_at) * 1000
+        self.logger.info(f"تم تنفيذ {self.step_count} خطوة انتقال خلال {result.summary()}")
+        return result
+
+    async def _run_step(self, result: NavigationResult, step: NavigationStep) -> StepTiming:
+        timeout = self._timeout(step)
+        target = step.url or step.selector
+        with timed(f"nav_{step.action}", url=step.url or None, target=step.selector or None) as event:
+            try:
+                if step.action == "goto":
+                    await result.page.goto(step.url, timeout=timeout, wait_until=step.wait_until) # type: ignore
+                elif step.action == "wait_for_selector":
+                    await self.locator(result.page, step.selector).wait_for(state="visible", timeout=timeout)
+                else:
+                    result.page = await self._click(result.page, step, timeout)
+            except PlaywrightError as e:
+                raise NavigationStepError(step.index, f"فشل {step.action} ({target}): {e}") from e
+        return StepTiming(step.index, step.action, target, event.duration_ms)
+
+    async def _click(self, page: Page, step: NavigationStep, timeout: int) -> Page:
+        locator = self.locator(page, step.selector)
+        if step.new_tab:
+            async with page.context.expect_page(timeout=timeout) as new_page_info:
+                await locator.click(timeout=timeout)
+            previous_page, page = page, await new_page_info.value
+            if step.wait_until != "commit":
+                await page.wait_for_load_state(step.wait_until, timeout=timeout) # type: ignore
+            await previous_page.close()
+        else:
+            await locator.click(timeout=timeout)
+            if step.wait_until != "commit":
+                await page.wait_for_load_state(step.wait_until, timeout=timeout) # type: ignore
+        expected = step.url_contains_check
+        if expected and expected not in page.url:
+            # الرابط قد يتغير بعد domcontentloaded (إعادة توجيه)، فننتظره بدل الفشل فورًا
+            try:
+                await page.wait_for_url(lambda url: expected in url, timeout=timeout, wait_until="commit")
+            except PlaywrightError:
+                raise NavigationStepError(step.index, f"الرابط الحالي {page.url} لا يحتوي على '{expected}'.") from None
+        return page
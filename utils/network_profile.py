@@ -0,0 +1,162 @@
+# utils/network_profile.py
+# ملف تعريف الشبكة لصفحات الأتمتة: يعترض الطلبات ويسقط أنواع الموارد التي لا تحتاجها عمليات
+# الإدخال والاستخراج (صور، خطوط، CSS، وسائط) وروابط التتبع والإحصاءات، مع قائمة سماح تضمن
+# بقاء ما تحتاجه صفحات ASP.NET لتعمل (مثل WebResource.axd و ScriptResource.axd).
+# يحتفظ بإحصاءات لكل صفحة: عدد الطلبات المحظورة وتقدير البايتات الموفرة.
+import logging
+import re
+import weakref
+from dataclasses import dataclass, field
+from typing import Any
+
+DEFAULT_BLOCK_RESOURCE_TYPES = ("image", "media", "font", "stylesheet")
+DEFAULT_BLOCK_URL_PATTERNS = (
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+    r"doubleclick\.net",
+    r"/collect\?",
+)
+DEFAULT_ALLOW_URL_PATTERNS = (
+    r"\.axd(\?|$)",
+)
+
+# حجم تقديري لكل نوع مورد محظور (بالبايت)، ويُستبدل بمتوسط الحجم الفعلي لنفس النوع إن حُمل منه شيء
+DEFAULT_ESTIMATED_BYTES = {
+    "image": 20_000,
+    "media": 200_000,
+    "font": 40_000,
+    "stylesheet": 15_000,
+    "script": 30_000,
+}
+_FALLBACK_ESTIMATED_BYTES = 5_000
+
+
+def _compile_patterns(patterns: list[str] | tuple[str, ...]) -> re.Pattern | None:
+    patterns = [pattern for pattern in patterns if pattern]
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+
+@dataclass
+class NetworkStats:
+    requests: int = 0 # كل الطلبات التي مرت على الملف
+    blocked: int = 0
+    bytes_loaded: int = 0 # حسب Content-Length للردود المحملة
+    bytes_saved_estimate: int = 0
+    blocked_by_type: dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        by_type = ", ".join(f"{resource_type}: {count}" for resource_type, count in sorted(self.blocked_by_type.items()))
+        return (f"تم حظر {self.blocked} من {self.requests} طلب (~{self.bytes_saved_estimate / 1024:.0f} KB موفرة، "
+                f"{self.bytes_loaded / 1024:.0f} KB محملة){f' [{by_type}]' if by_type else ''}")
+
+
+class NetworkProfile:
+    def __init__(self, block_resource_types: tuple[str, ...] = DEFAULT_BLOCK_RESOURCE_TYPES,
+                 block_url_patterns: tuple[str, ...] = DEFAULT_BLOCK_URL_PATTERNS,
+                 allow_url_patterns: tuple[str, ...] = DEFAULT_ALLOW_URL_PATTERNS,
+                 estimated_bytes: dict[str, int] | None = None, logger_instance=None):
+        self.block_resource_types = frozenset(block_resource_types)
+        self._block_re = _compile_patterns(block_url_patterns)
+        self._allow_re = _compile_patterns(allow_url_patterns)
+        self.estimated_bytes = {**DEFAULT_ESTIMATED_BYTES, **(estimated_bytes or {})}
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+        self.totals = NetworkStats()
+        self._page_stats: "weakref.WeakKeyDictionary[Any, NetworkStats]" = weakref.WeakKeyDictionary()
+        # متوسط الحجم الفعلي لكل نوع من الردود المحملة: (مجموع البايتات، العدد)
+        self._loaded_sizes: dict[str, list[int]] = {}
+
+    @classmethod
+    def from_config(cls, config: dict, logger_instance=None) -> "NetworkProfile | None":
+        options = config.get("network_profile", {})
+        if not options.get("enabled", True):
+            return None
+        return cls(
+            block_resource_types=tuple(options.get("block_resource_types", DEFAULT_BLOCK_RESOURCE_TYPES)),
+            block_url_patterns=tuple(options.get("block_url_patterns", DEFAULT_BLOCK_URL_PATTERNS)),
+            allow_url_patterns=tuple(options.get("allow_url_patterns", DEFAULT_ALLOW_URL_PATTERNS)),
+            estimated_bytes=options.get("estimated_bytes"),
+            logger_instance=logger_instance,
+        )
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if resource_type == "document":
+            return False # الصفحة نفسها لا تُحظر أبدًا
+        if self._allow_re is not None and self._allow_re.search(url):
+            return False
+        if resource_type in self.block_resource_types:
+            return True
+        return self._block_re is not None and self._block_re.search(url) is not None
+
+    # --- الإحصاءات ---
+    def stats_for(self, page) -> NetworkStats:
+        stats = self._page_stats.get(page)
+        if stats is None:
+            stats = self._page_stats[page] = NetworkStats()
+        return stats
+
+    def reset_page_stats(self, page):
+        self._page_stats[page] = NetworkStats()
+
+    def _estimate(self, resource_type: str) -> int:
+        loaded = self._loaded_sizes.get(resource_type)
+        if loaded and loaded[1]:
+            return loaded[0] // loaded[1]
+        return self.estimated_bytes.get(resource_type, _FALLBACK_ESTIMATED_BYTES)
+
+    def _stats_targets(self, request_or_response) -> list[NetworkStats]:
+        targets = [self.totals]
+        try:
+            targets.append(self.stats_for(request_or_response.frame.page))
+        except Exception:
+            pass # طلبات Service Worker ليس لها إطار
+        return targets
+
+    def _record_request(self, request) -> bool:
+        resource_type = request.resource_type
+        blocked = self.should_block(request.url, resource_type)
+        estimate = self._estimate(resource_type) if blocked else 0
+        for stats in self._stats_targets(request):
+            stats.requests += 1
+            if blocked:
+                stats.blocked += 1
+                stats.bytes_saved_estimate += estimate
+                stats.blocked_by_type[resource_type] = stats.blocked_by_type.get(resource_type, 0) + 1
+        return blocked
+
+    def _on_response(self, response):
+        try:
+            size = int(response.headers.get("content-length", 0))
+        except ValueError:
+            return
+        if not size:
+            return
+        loaded = self._loaded_sizes.setdefault(response.request.resource_type, [0, 0])
+        loaded[0] += size
+        loaded[1] += 1
+        for stats in self._stats_targets(response):
+            stats.bytes_loaded += size
+
+    # --- التركيب على صفحة أو سياق ---
+    def attach(self, target):
+        # target: Page أو BrowserContext من playwright.sync_api
+        def handle(route):
+            if self._record_request(route.request):
+                route.abort("blockedbyclient")
+            else:
+                route.fallback()
+
+        target.route("**/*", handle)
+        target.on("response", self._on_response)
+
+    async def attach_async(self, target):
+        # target: Page أو BrowserContext من playwright.async_api
+        async def handle(route):
+            if self._record_request(route.request):
+                await route.abort("blockedbyclient")
+            else:
+                await route.fallback()
+
+        await target.route("**/*", handle)
+        target.on("response", self._on_response)
@@ -0,0 +1,393 @@
+# utils/notifications.py
+# إرسال تنبيهات أوامر العمل إلى Telegram دون تأخير دورة المراقبة:
+# - submit يضع التنبيهات في طابور محدود ويعود فورًا (إذا امتلأ الطابور تُسقط الزيادة ويُسجل ذلك)
+# - مهمة خلفية تجمع التنبيهات خلال نافذة زمنية (digest_window) في رسائل ملخصة بدل رسالة لكل أمر
+# - المعرفات التي أُرسل تنبيهها تُحفظ في جدول notified_ids (SeenIdStore) فلا تتكرر بعد إعادة التشغيل
+# - فشل الإرسال يُعاد بتأخير أسي، ويُحترم retry_after في رد 429 من Telegram
+# - المعرف يُسجل بعد إرسال رسالته فقط؛ ما لم يُرسل (فشل أو اختُصر في سطر "و N أخرى") يُعاد للطابور
+#   (بعد تأخير أسي عند الفشل) حتى max_requeues مرة، لأن دورة المراقبة سجلته في seen_ids ولن ترسله ثانية
+# عنوان الواجهة قابل للتغيير (telegram_api_url) لاختبارها على خادم Telegram وهمي محلي.
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from utils.metrics import timed_operation
+from utils.seen_ids_store import SeenIdStore
+
+APP_BASE_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_TELEGRAM_API_URL = "https://api.telegram.org"
+TELEGRAM_MESSAGE_LIMIT = 4096 # حد طول رسالة Telegram بالأحرف
+REQUEUE_MAX_DELAY = 900.0 # أقصى تأخير لإعادة تنبيهات فشل إرسالها (ثانية)
+
+KIND_NEW = "new"
+KIND_UPDATED = "updated"
+_KIND_TITLES = {KIND_NEW: "أمر عمل جديد", KIND_UPDATED: "أمر عمل تغيرت بياناته"}
+
+
+class NotificationError(Exception):
+    def __init__(self, message: str, retry_after: float | None = None, permanent: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after # من رد 429
+        self.permanent = permanent # خطأ لا تفيد إعادته (مثل رمز بوت خاطئ)
+
+
+@dataclass
+class Alert:
+    item_id: str
+    kind: str
+    record: dict[str, Any]
+    source: str = ""
+    attempts: int = 0 # عدد مرات فشل إرسالها وإعادتها للطابور
+
+
+@dataclass
+class DigestMessage:
+    text: str
+    alerts: list[Alert] # التنبيهات الظاهرة في هذه الرسالة (دون المختصرة في سطر "و N أخرى")
+
+
+@dataclass
+class NotificationStats:
+    queued: int = 0
+    dropped: int = 0 # الطابور ممتلئ
+    deduplicated: int = 0 # أُرسل تنبيهها سابقًا
+    messages_sent: int = 0
+    alerts_sent: int = 0
+    messages_failed: int = 0
+    retries: int = 0
+    requeued: int = 0 # أُعيدت للطابور (فشل الإرسال أو تجاوزت حد الرسائل)
+    undelivered: int = 0 # تجاوزت max_requeues أو بقيت عند الإيقاف
+
+
+class TelegramSender:
+    def __init__(self, bot_token: str, chat_id: str, api_url: str = DEFAULT_TELEGRAM_API_URL, timeout: float = 10.0):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+
+    def send(self, text: str):
+        # متزامن (urllib)؛ يُستدعى في خيط منفصل حتى لا يوقف حلقة asyncio
+        body = json.dumps({"chat_id": self.chat_id, "text": text, "disable_web_page_preview": True}).encode("utf-8")
+        request = urllib.request.Request(f"{self.api_url}/bot{self.bot_token}/sendMessage", data=body,
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            payload = _read_error_payload(e)
+            retry_after = payload.get("parameters", {}).get("retry_after")
+            description = payload.get("description") or e.reason
+            raise NotificationError(f"Telegram HTTP {e.code}: {description}",
+                                    retry_after=float(retry_after) if retry_after is not None else None,
+                                    permanent=e.code in (400, 401, 403, 404)) from e
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise NotificationError(f"تعذر الاتصال بـ Telegram: {e}") from e
+        if not payload.get("ok", False):
+            raise NotificationError(f"Telegram رفض الرسالة: {payload.get('description', payload)}")
+
+
+def _read_error_payload(error: urllib.error.HTTPError) -> dict:
+    try:
+        return json.loads(error.read() or b"{}")
+    except ValueError:
+        return {}
+
+
+def alert_id(record: dict[str, Any], id_field: str | None) -> str:
+    # معرف الأمر من حقل المعرف، وإلا بصمة محتوى الصف
+    if id_field and record.get(id_field) not in (None, ""):
+        return str(record[id_field])
+    return hashlib.sha1(json.dumps(record, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def format_digest(alerts: list[Alert], max_items_per_message: int = 40,
+                  max_messages: int = 3) -> list[DigestMessage]:
+    # رسائل ملخصة مجمعة حسب النوع والمصدر، كل رسالة ضمن حد Telegram، وبحد max_messages لكل مجموعة
+    # (ما يزيد يُختصر في سطر "و N أخرى" ولا يدخل في alerts أي رسالة)
+    messages: list[DigestMessage] = []
+    groups: dict[tuple[str, str], list[Alert]] = {}
+    for alert in alerts:
+        groups.setdefault((alert.kind, alert.source), []).append(alert)
+    for (kind, source), group in groups.items():
+        header = f"🔔 {len(group)} {_KIND_TITLES.get(kind, kind)}{f' ({source})' if source else ''}"
+        lines = [" | ".join(str(value) for value in alert.record.values() if value not in (None, ""))
+                 or alert.item_id for alert in group]
+        group_messages: list[DigestMessage] = []
+        current: list[str] = []
+        current_alerts: list[Alert] = []
+        length = len(header)
+        for index, (alert, line) in enumerate(zip(group, lines)):
+            line = f"• {line}"[:300]
+            if len(current) >= max_items_per_message or length + len(line) + 1 > TELEGRAM_MESSAGE_LIMIT - 100:
+                group_messages.append(DigestMessage("\n".join([header, *current]), current_alerts))
+                current, current_alerts, length = [], [], len(header)
+                if len(group_messages) >= max_messages:
+                    group_messages[-1].text += f"\n... و {len(lines) - index} أخرى (تُرسل لاحقًا)"
+                    break
+            current.append(line)
+            current_alerts.append(alert)
+            length += len(line) + 1
+        else:
+            group_messages.append(DigestMessage("\n".join([header, *current]), current_alerts))
+        messages.extend(group_messages)
+    return messages
+
+
+class NotificationDispatcher:
+    def __init__(self, sender: TelegramSender, notified_store: SeenIdStore | None = None,
+                 digest_window: float = 10.0, max_queue: int = 5000, max_items_per_message: int = 40,
+                 max_messages_per_digest: int = 3, max_retries: int = 5, retry_initial_delay: float = 1.0,
+                 retry_max_delay: float = 60.0, max_requeues: int = 10, notify_updates: bool = False,
+                 logger_instance=None):
+        self.sender = sender
+        self.notified_store = notified_store
+        self.digest_window = digest_window
+        self.max_queue = max_queue
+        self.max_items_per_message = max_items_per_message
+        self.max_messages_per_digest = max_messages_per_digest
+        self.max_retries = max_retries
+        self.retry_initial_delay = retry_initial_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_requeues = max_requeues # حد إعادة التنبيه للطابور بعد فشل إرساله
+        self.notify_updates = notify_updates # تنبيه عند تغير بيانات أمر سبق تنبيهه
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+        self.stats = NotificationStats()
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._pending_ids: set[str] = set() # في الطابور أو قيد الإرسال، لمنع التكرار داخل نفس الدفعة
+        self._requeued: list[tuple[asyncio.TimerHandle, list[Alert]]] = [] # تنتظر تأخير إعادتها للطابور
+        self._stopping = False
+
+    @classmethod
+    def from_config(cls, config: dict, logger_instance=None) -> "NotificationDispatcher | None":
+        options = config.get("notifications", {})
+        if not options.get("telegram_enabled", False):
+            return None
+        if not options.get("telegram_bot_token") or not options.get("telegram_chat_id"):
+            (logger_instance or logging.getLogger(__name__)).warning(
+                "التنبيهات مفعلة لكن telegram_bot_token أو telegram_chat_id غير محدد.")
+            return None
+        store_file = Path(options.get("notified_ids_file") or "data/notified_ids.db")
+        return cls(
+            TelegramSender(options["telegram_bot_token"], str(options["telegram_chat_id"]),
+                           options.get("telegram_api_url") or DEFAULT_TELEGRAM_API_URL,
+                           float(options.get("timeout", 10.0))),
+            notified_store=SeenIdStore(store_file if store_file.is_absolute() else APP_BASE_DIR / store_file,
+                                       retention_days=options.get("notified_ids_retention_days"),
+                                       table="notified_ids"),
+            digest_window=float(options.get("digest_window", 10.0)),
+            max_queue=int(options.get("max_queue", 5000)),
+            max_items_per_message=int(options.get("max_items_per_message", 40)),
+            max_messages_per_digest=int(options.get("max_messages_per_digest", 3)),
+            max_retries=int(options.get("max_retries", 5)),
+            retry_initial_delay=float(options.get("retry_initial_delay", 1.0)),
+            retry_max_delay=float(options.get("retry_max_delay", 60.0)),
+            max_requeues=int(options.get("max_requeues", 10)),
+            notify_updates=bool(options.get("notify_updates", False)),
+            logger_instance=logger_instance,
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        # يُستدعى داخل الحلقة التي تعمل فيها المراقبة؛ استدعاؤه أكثر من مرة آمن
+        if self.is_running:
+            return
+        if self.notified_store is not None:
+            self.notified_store.open()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, alerts: list[Alert]) -> int:
+        # لا ينتظر أبدًا: يعيد عدد التنبيهات المضافة للطابور
+        if self._queue is None:
+            self.logger.warning("مرسل التنبيهات غير مُشغل، تم تجاهل التنبيهات.")
+            return 0
+        queued = 0
+        for alert in alerts:
+            key = f"{alert.kind}:{alert.item_id}"
+            if key in self._pending_ids:
+                self.stats.deduplicated += 1
+                continue
+            try:
+                self._queue.put_nowait(alert)
+            except asyncio.QueueFull:
+                self.stats.dropped += len(alerts) - queued
+                self.logger.warning(f"طابور التنبيهات ممتلئ ({self.max_queue})، تم إسقاط {len(alerts) - queued} تنبيه.")
+                break
+            self._pending_ids.add(key)
+            queued += 1
+        self.stats.queued += queued
+        return queued
+
+    def submit_rows(self, rows: list[dict[str, Any]], kind: str = KIND_NEW, id_field: str | None = None,
+                    source: str = "") -> int:
+        return self.submit([Alert(alert_id(row, id_field), kind, row, source) for row in rows])
+
+    async def stop(self, flush_timeout: float = 10.0):
+        # يرسل ما في الطابور (ضمن المهلة) ثم يتوقف
+        if self._task is None:
+            return
+        self._stopping = True
+        if not self._task.done():
+            # التنبيهات المنتظرة لإعادة المحاولة تُرسل الآن قبل الإيقاف
+            for handle, alerts in self._requeued:
+                handle.cancel()
+                self._put_back(alerts)
+            await self._queue.put(None)
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), flush_timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"لم تُرسل كل التنبيهات خلال {flush_timeout} ث عند الإيقاف.")
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        lost = 0
+        for handle, alerts in self._requeued:
+            handle.cancel()
+            lost += len(alerts)
+        self._requeued.clear()
+        while not self._queue.empty():
+            lost += self._queue.get_nowait() is not None
+        if lost:
+            self.stats.undelivered += lost
+            self.logger.error(f"لم يُرسل تنبيه {lost} أمر عمل عند الإيقاف.")
+        if self.notified_store is not None:
+            self.notified_store.close()
+
+    # --- المهمة الخلفية ---
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            alert = await self._queue.get()
+            if alert is None:
+                break
+            batch = [alert]
+            # نافذة التجميع تبدأ من أول تنبيه
+            deadline = time.monotonic() + self.digest_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    alert = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if alert is None:
+                    stopping = True
+                    break
+                batch.append(alert)
+            requeued: list[Alert] = []
+            try:
+                requeued = await self._deliver(batch, flush=stopping or self._stopping)
+            except Exception as e:
+                self.logger.error(f"خطأ غير متوقع في إرسال التنبيهات: {e}", exc_info=True)
+            finally:
+                # المعاد للطابور يبقى في _pending_ids حتى لا يُضاف مرة ثانية
+                kept = {id(alert) for alert in requeued}
+                for alert in batch:
+                    if id(alert) not in kept:
+                        self._pending_ids.discard(f"{alert.kind}:{alert.item_id}")
+
+    async def _deliver(self, batch: list[Alert], flush: bool = False) -> list[Alert]:
+        # يعيد التنبيهات التي أُعيدت للطابور؛ flush (عند الإيقاف): المختصر يُرسل الآن بدل إعادته
+        # التنبيهات الجديدة تُقارن بما أُرسل سابقًا، والتحديثات تُرسل في كل مرة يتغير فيها الصف
+        new_ids = [alert.item_id for alert in batch if alert.kind == KIND_NEW]
+        already = await asyncio.to_thread(self.notified_store.contains_many, new_ids) \
+            if self.notified_store is not None and new_ids else set()
+        alerts = [alert for alert in batch if not (alert.kind == KIND_NEW and alert.item_id in already)]
+        self.stats.deduplicated += len(batch) - len(alerts)
+        while alerts:
+            messages = format_digest(alerts, self.max_items_per_message, self.max_messages_per_digest)
+            sent: set[int] = set()
+            failed = False
+            for message in messages:
+                if not await self._send_with_retry(message.text):
+                    failed = True # الخدمة غالبًا متوقفة: باقي الرسائل تُعاد مع هذه
+                    break
+                await self._mark_sent(message.alerts)
+                sent.update(id(alert) for alert in message.alerts)
+            if sent:
+                self.logger.info(f"تم إرسال {len(sent)} تنبيه في {len(messages) - failed} رسالة.")
+            alerts = [alert for alert in alerts if id(alert) not in sent]
+            if failed or not flush:
+                return self._requeue(alerts, failed) if alerts else []
+        return []
+
+    async def _mark_sent(self, alerts: list[Alert]):
+        # يُسجل بعد كل رسالة حتى لا تتكرر رسائل أُرسلت إذا فشلت رسالة تالية
+        self.stats.alerts_sent += len(alerts)
+        delivered_new = [alert.item_id for alert in alerts if alert.kind == KIND_NEW]
+        if self.notified_store is not None and delivered_new:
+            await asyncio.to_thread(self.notified_store.add_many, delivered_new)
+
+    def _requeue(self, alerts: list[Alert], failed: bool) -> list[Alert]:
+        # المختصر في سطر "و N أخرى" يعود فورًا للدفعة التالية، وما فشل إرساله بعد تأخير أسي
+        retry: list[Alert] = []
+        for alert in alerts:
+            if failed:
+                alert.attempts += 1
+            if alert.attempts <= self.max_requeues:
+                retry.append(alert)
+        if len(retry) < len(alerts):
+            self.stats.undelivered += len(alerts) - len(retry)
+            self.logger.error(f"تم التخلي عن {len(alerts) - len(retry)} تنبيه بعد {self.max_requeues} إعادة.")
+        if not retry:
+            return []
+        attempts = max(alert.attempts for alert in retry)
+        delay = min(self.retry_max_delay * 2 ** (attempts - 1), REQUEUE_MAX_DELAY) if failed else 0.0
+        self.stats.requeued += len(retry)
+        if failed:
+            self.logger.warning(f"إعادة {len(retry)} تنبيه لم يُرسل إلى الطابور بعد {delay:.0f} ث.")
+        handle = asyncio.get_running_loop().call_later(delay, self._put_back, retry)
+        self._requeued.append((handle, retry))
+        return retry
+
+    def _put_back(self, alerts: list[Alert]):
+        self._requeued = [(handle, waiting) for handle, waiting in self._requeued if waiting is not alerts]
+        for index, alert in enumerate(alerts):
+            try:
+                self._queue.put_nowait(alert)
+            except asyncio.QueueFull:
+                lost = alerts[index:]
+                self.stats.dropped += len(lost)
+                for dropped in lost:
+                    self._pending_ids.discard(f"{dropped.kind}:{dropped.item_id}")
+                self.logger.warning(f"طابور التنبيهات ممتلئ ({self.max_queue})، تم إسقاط {len(lost)} تنبيه معاد.")
+                break
+
+    async def _send_with_retry(self, text: str) -> bool:
+        delay = self.retry_initial_delay
+        for attempt in range(1, self.max_retries + 2):
+            try:
+                await self._send(text)
+                self.stats.messages_sent += 1
+                return True
+            except NotificationError as e:
+                if e.permanent or attempt > self.max_retries:
+                    self.stats.messages_failed += 1
+                    self.logger.error(f"فشل إرسال التنبيه بعد {attempt} محاولة: {e}")
+                    return False
+                wait = e.retry_after if e.retry_after is not None else delay
+                self.stats.retries += 1
+                self.logger.warning(f"فشل إرسال التنبيه (المحاولة {attempt}): {e}؛ إعادة بعد {wait:.1f} ث.")
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, self.retry_max_delay)
+        return False
+
+    @timed_operation("notify_send")
+    async def _send(self, text: str) -> bool:
+        await asyncio.to_thread(self.sender.send, text)
+        return True
@@ -0,0 +1,235 @@
+# utils/progress_journal.py
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+# مجلد سجلات التقدم بجانب مجلد sessions
+JOURNALS_DIR = Path(__file__).resolve().parent.parent / "journals"
+
+STATE_STARTED = "started"
+STATE_SUCCESS = "success"
+STATE_FAILED = "failed"
+
+
+def _clean_field(value: str) -> str:
+    # الحقول مفصولة بـ Tab وكل سجل في سطر واحد
+    return value.replace("\t", " ").replace("\r", " ").replace("\n", " ")
+
+
+class ProgressJournal:
+    # سجل كتابة مسبقة (write-ahead) لعملية الإدخال: يُكتب "started" قبل إرسال الصف
+    # ثم "success"/"failed" بعده. كل سجل سطر واحد بالشكل:
+    #   state \t row_number \t key \t timestamp \t error
+    # بجانبه ملف نقطة تفتيش (.ckpt) صغير يحفظ "العلامة المائية" (كل صف قبلها منجز ما لم يكن
+    # ضمن الاستثناءات المحفوظة) وموضع آخر بايت مقروء في السجل. الاستئناف يقرأ نقطة التفتيش
+    # ثم ذيل السجل فقط، لذلك لا يكبر زمنه مع حجم ملف Excel.
+    def __init__(self, journal_file: str | Path, fsync_every: int = 100, checkpoint_every: int = 5000):
+        self.journal_file = Path(journal_file)
+        self.checkpoint_file = self.journal_file.with_suffix(self.journal_file.suffix + ".ckpt")
+        self.fsync_every = fsync_every
+        self.checkpoint_every = checkpoint_every
+        self._entries: dict[str, tuple[str, int]] = {} # key -> (state, row_number)
+        self._done_rows: set[int] = set() # صفوف ناجحة بعد العلامة المائية
+        self._pending_rows: set[int] = set() # صفوف غير ناجحة (started/failed) في أي موضع
+        self._first_row: int | None = None
+        self._watermark: int | None = None # الصفوف قبلها ناجحة إلا ما في _pending_rows
+        self._pruned_done = 0 # مفاتيح ناجحة حُذفت من _entries عند نقاط التفتيش
+        self._file = None
+        self._writes_since_sync = 0
+        self._writes_since_checkpoint = 0
+
+    @classmethod
+    def for_workbook(cls, excel_file: str, sheet_name: str, **kwargs) -> "ProgressJournal":
+        # اسم ثابت لكل (ملف، ورقة) حتى تستأنف إعادة التشغيل نفس السجل
+        source = Path(excel_file).resolve()
+        digest = hashlib.sha1(f"{source}|{sheet_name}".encode("utf-8")).hexdigest()[:10]
+        return cls(JOURNALS_DIR / f"{source.stem}_{digest}.journal", **kwargs)
+
+    def load(self) -> "ProgressJournal":
+        self._reset_state()
+        if not self.journal_file.exists():
+            return self
+
+        offset = self._load_checkpoint()
+        with open(self.journal_file, "rb") as f:
+            f.seek(offset)
+            tail = f.read()
+        for raw_line in tail.split(b"\n")[:-1]: # الجزء الأخير إما فارغ أو سطر مبتور بسبب انهيار
+            parts = raw_line.decode("utf-8", errors="replace").split("\t", 3)
+            if len(parts) < 3:
+                continue
+            try:
+                row_number = int(parts[1])
+            except ValueError:
+                continue
+            self._apply(parts[0], row_number, parts[2])
+        return self
+
+    def _load_checkpoint(self) -> int:
+        try:
+            data = json.loads(self.checkpoint_file.read_text(encoding="utf-8"))
+            offset = int(data["offset"])
+            if offset > self.journal_file.stat().st_size:
+                raise ValueError("نقطة التفتيش لا تطابق ملف السجل")
+            entries = {key: (state, int(row_number)) for key, (state, row_number) in data["entries"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            self._reset_state()
+            return 0
+        self._first_row = data.get("first_row")
+        self._watermark = data.get("watermark")
+        self._entries = entries
+        if "pruned_done" in data:
+            self._pruned_done = int(data["pruned_done"])
+        else: # نقطة تفتيش أقدم تحفظ العدادات فقط
+            done_in_entries = sum(1 for state, _ in entries.values() if state == STATE_SUCCESS)
+            self._pruned_done = max(0, int(data.get("counts", {}).get(STATE_SUCCESS, 0)) - done_in_entries)
+        for state, row_number in entries.values():
+            if state == STATE_SUCCESS:
+                self._done_rows.add(row_number)
+            else:
+                self._pending_rows.add(row_number)
+        return offset
+
+    def _reset_state(self):
+        self._entries = {}
+        self._done_rows = set()
+        self._pending_rows = set()
+        self._first_row = None
+        self._watermark = None
+        self._pruned_done = 0
+
+    def _apply(self, state: str, row_number: int, key: str):
+        # سجل لمفتاح معروف يستبدل حالته السابقة ولا يُعد مرتين (مثل إعادة تشغيل الصفوف بعد الاستئناف)
+        previous = self._entries.get(key)
+        if previous is not None:
+            self._done_rows.discard(previous[1])
+            self._pending_rows.discard(previous[1])
+        elif self._is_pruned_done(row_number):
+            self._pruned_done -= 1 # صف ناجح حُذف من الذاكرة عند نقطة تفتيش ثم سُجل من جديد
+        self._entries[key] = (state, row_number)
+        if state == STATE_SUCCESS:
+            self._done_rows.add(row_number)
+        else:
+            self._pending_rows.add(row_number)
+        if self._first_row is None or row_number < self._first_row:
+            self._first_row = row_number
+
+    def _is_pruned_done(self, row_number: int) -> bool:
+        # الصفوف الناجحة قبل العلامة المائية حُذفت من الذاكرة عند آخر نقطة تفتيش
+        return self._watermark is not None and (self._first_row or 0) <= row_number < self._watermark \
+            and row_number not in self._pending_rows and row_number not in self._done_rows
+
+    def state(self, key: str, row_number: int | None = None) -> str | None:
+        entry = self._entries.get(_clean_field(key))
+        if entry is not None:
+            return entry[0]
+        if row_number is not None and self._is_pruned_done(row_number):
+            return STATE_SUCCESS
+        return None
+
+    def is_done(self, key: str, row_number: int | None = None) -> bool:
+        return self.state(key, row_number) == STATE_SUCCESS
+
+    def is_in_doubt(self, key: str, row_number: int | None = None) -> bool:
+        # بدأ إرسال الصف ولم يُسجل له نتيجة: قد يكون وصل للخادم أو لا
+        return self.state(key, row_number) == STATE_STARTED
+
+    def _first_gap(self) -> int | None:
+        # أول صف بعد العلامة المائية ليس له أي سجل أو سجله غير ناجح
+        start = self._watermark if self._watermark is not None else self._first_row
+        if start is None:
+            return None
+        row = start
+        while row in self._done_rows:
+            row += 1
+        return row
+
+    @property
+    def resume_row(self) -> int | None:
+        # أول صف غير منجز؛ كل ما قبله منجز ويمكن تخطي قراءته من Excel
+        first_gap = self._first_gap()
+        if first_gap is None:
+            return None
+        return min(min(self._pending_rows, default=first_gap), first_gap)
+
+    def counts(self) -> dict[str, int]:
+        # من المفاتيح نفسها، فكل مفتاح يُعد مرة واحدة بحالته الأخيرة
+        counts = {STATE_SUCCESS: self._pruned_done} if self._pruned_done else {}
+        for state, _ in self._entries.values():
+            counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def mark_started(self, key: str, row_number: int):
+        self._append(STATE_STARTED, row_number, key)
+
+    def mark_finished(self, key: str, row_number: int, success: bool, error: str = ""):
+        self._append(STATE_SUCCESS if success else STATE_FAILED, row_number, key, error)
+
+    def _append(self, state: str, row_number: int, key: str, error: str = ""):
+        if self._file is None:
+            self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.journal_file, "ab")
+        key = _clean_field(key)
+        line = f"{state}\t{row_number}\t{key}\t{time.time():.3f}\t{_clean_field(error)}\n"
+        self._file.write(line.encode("utf-8"))
+        # flush بعد كل سجل يحميه من انهيار البرنامج، و fsync الدوري يحميه من انقطاع الكهرباء
+        self._file.flush()
+        self._writes_since_sync += 1
+        if self._writes_since_sync >= self.fsync_every:
+            os.fsync(self._file.fileno())
+            self._writes_since_sync = 0
+        self._apply(state, row_number, key)
+        self._writes_since_checkpoint += 1
+        if self._writes_since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        # تقديم العلامة المائية فوق الصفوف الناجحة المتتالية (الصفوف غير الناجحة تبقى استثناءات
+        # في الذاكرة) وحذف الناجحة قبلها، ثم حفظ نقطة التفتيش بشكل ذري
+        if self._file is None:
+            return
+        start = self._watermark if self._watermark is not None else self._first_row
+        if start is not None:
+            row = start
+            while row in self._done_rows or row in self._pending_rows:
+                row += 1
+            self._watermark = row
+            for key, (state, row_number) in list(self._entries.items()):
+                if state == STATE_SUCCESS and row_number < row:
+                    del self._entries[key]
+                    self._pruned_done += 1
+            self._done_rows = {done_row for done_row in self._done_rows if done_row >= row}
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._writes_since_sync = 0
+        self._writes_since_checkpoint = 0
+        data = {
+            "offset": self._file.tell(),
+            "first_row": self._first_row,
+            "watermark": self._watermark,
+            "pruned_done": self._pruned_done,
+            "entries": self._entries,
+        }
+        temp_file = self.checkpoint_file.with_suffix(".tmp")
+        temp_file.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(temp_file, self.checkpoint_file)
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self.checkpoint()
+            finally:
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        # بدء عملية جديدة من الصفر لنفس الملف
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.journal_file.unlink(missing_ok=True)
+        self.checkpoint_file.unlink(missing_ok=True)
+        self._reset_state()
@@ -0,0 +1,59 @@
+# utils/rate_limiter.py
+# حد معدل الطلبات لكل حساب (Token Bucket): يسمح بدفعة قصيرة حتى capacity ثم بمعدل ثابت rate في الثانية،
+# حتى تعمل عدة عمليات بالتوازي بأقصى سرعة دون تجاوز ما يتحمله الخادم قبل قفل الحساب.
+# وقت الانتظار يُسجل كحدث "rate_limit_wait" في سجل القياسات.
+import asyncio
+import time
+
+from utils.metrics import METRICS, TimingEvent
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1.0, name: str = ""):
+        # rate: رموز في الثانية؛ 0 أو أقل = بلا حد
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.name = name
+        self.tokens = self.capacity
+        self.waits = 0
+        self.waited_s = 0.0
+        self._updated_at = time.monotonic()
+        self._lock: asyncio.Lock | None = None
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: float = 1.0, name: str = "") -> "TokenBucket":
+        return cls(requests_per_minute / 60.0, burst, name)
+
+    @property
+    def is_limited(self) -> bool:
+        return self.rate > 0
+
+    def _get_lock(self) -> asyncio.Lock:
+        # القفل يُنشأ داخل الحلقة التي تستخدمه، ويحفظ ترتيب الطلبات المنتظرة
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        # ينتظر حتى يتوفر الرمز ثم يستهلكه؛ يعيد زمن الانتظار بالثواني
+        if not self.is_limited:
+            return 0.0
+        started_at = time.perf_counter()
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    break
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+        waited = time.perf_counter() - started_at
+        if waited >= 0.001:
+            self.waits += 1
+            self.waited_s += waited
+            METRICS.record(TimingEvent("rate_limit_wait", waited * 1000, target=self.name or None))
+        return waited
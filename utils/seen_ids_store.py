@@ -0,0 +1,139 @@
+# utils/seen_ids_store.py
+# مخزن معرفات أوامر العمل التي تمت رؤيتها، مبني على SQLite بدل ملف JSON:
+# - فحص العضوية O(1) تقريبًا عبر المفتاح الأساسي (جدول WITHOUT ROWID)
+# - الإضافة إلحاقية ولا تعيد كتابة الملف كاملًا
+# - الحذف حسب العمر عبر فهرس على وقت أول رؤية
+# - الفتح لا يقرأ البيانات إلى الذاكرة، لذلك زمنه ثابت تقريبًا مهما كبر عدد المعرفات
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+# حد SQLite لعدد المتغيرات في الاستعلام الواحد (القيمة الافتراضية في الإصدارات القديمة 999)
+_MAX_VARIABLES = 900
+
+
+class SeenIdStore:
+    def __init__(self, db_file: str | Path, retention_days: float | None = None, table: str = "seen_ids"):
+        if not table.isidentifier():
+            raise ValueError(f"اسم جدول غير صالح: {table!r}")
+        self.db_file = Path(db_file)
+        self.retention_days = retention_days
+        self.table = table
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._last_eviction = 0.0
+
+    def open(self) -> "SeenIdStore":
+        if self._connection is not None:
+            return self
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (id TEXT PRIMARY KEY, first_seen REAL NOT NULL) WITHOUT ROWID"
+        )
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_first_seen ON {self.table}(first_seen)")
+        self._connection = connection
+        self.evict_expired()
+        return self
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __enter__(self) -> "SeenIdStore":
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.open()
+        return self._connection
+
+    def __contains__(self, item_id: str) -> bool:
+        with self._lock:
+            row = self._conn().execute(f"SELECT 1 FROM {self.table} WHERE id = ?", (str(item_id),)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def contains_many(self, ids: Iterable[str]) -> set[str]:
+        # يعيد المعرفات الموجودة فقط، على دفعات لتجنب حد عدد المتغيرات
+        ids = list(dict.fromkeys(str(item_id) for item_id in ids))
+        found: set[str] = set()
+        with self._lock:
+            connection = self._conn()
+            for start in range(0, len(ids), _MAX_VARIABLES):
+                chunk = ids[start:start + _MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                rows = connection.execute(f"SELECT id FROM {self.table} WHERE id IN ({placeholders})", chunk)
+                found.update(row[0] for row in rows)
+        return found
+
+    def add_many(self, ids: Iterable[str], seen_at: float | None = None) -> list[str]:
+        # يضيف المعرفات ويعيد الجديدة منها فقط (بنفس ترتيب الإدخال)
+        ids = list(dict.fromkeys(str(item_id) for item_id in ids))
+        if not ids:
+            return []
+        existing = self.contains_many(ids)
+        new_ids = [item_id for item_id in ids if item_id not in existing]
+        if new_ids:
+            timestamp = time.time() if seen_at is None else seen_at
+            with self._lock:
+                connection = self._conn()
+                connection.execute("BEGIN")
+                try:
+                    connection.executemany(f"INSERT OR IGNORE INTO {self.table} (id, first_seen) VALUES (?, ?)",
+                                           ((item_id, timestamp) for item_id in new_ids))
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+        self._maybe_evict()
+        return new_ids
+
+    def add(self, item_id: str) -> bool:
+        return bool(self.add_many([item_id]))
+
+    def evict_older_than(self, seconds: float) -> int:
+        with self._lock:
+            cursor = self._conn().execute(f"DELETE FROM {self.table} WHERE first_seen < ?", (time.time() - seconds,))
+            self._last_eviction = time.time()
+            return cursor.rowcount
+
+    def evict_expired(self) -> int:
+        if not self.retention_days:
+            return 0
+        return self.evict_older_than(self.retention_days * 86400)
+
+    def _maybe_evict(self):
+        # الحذف حسب العمر مرة واحدة يوميًا على الأكثر
+        if self.retention_days and time.time() - self._last_eviction > 86400:
+            self.evict_expired()
+
+    def import_json(self, json_file: str | Path, rename: bool = True) -> int:
+        # ترحيل ملف JSON القديم (قائمة معرفات) إلى المخزن مرة واحدة
+        json_file = Path(json_file)
+        if not json_file.is_file():
+            return 0
+        ids = json.loads(json_file.read_text(encoding="utf-8"))
+        added = len(self.add_many(ids))
+        if rename:
+            json_file.replace(json_file.with_suffix(json_file.suffix + ".migrated"))
+        return added
+
+
+def resolve_store_path(configured_path: str | Path) -> tuple[Path, Path]:
+    # الإعداد القديم كان يشير إلى ملف .json؛ المخزن دائمًا ملف .db ويُعاد مسار JSON المقابل للترحيل
+    path = Path(configured_path)
+    return path.with_suffix(".db"), path.with_suffix(".json")
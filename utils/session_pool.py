@@ -0,0 +1,287 @@
+# utils/session_pool.py
+# مجمع جلسات لعدة حسابات ومواقع CAFM: كل ملف storage_state في sessions/ جلسة باسم الملف (مثل
+# sessions/site_a.json -> "site_a")، وتُفتح كل جلسة في سياق متصفح معزول (كوكيز وتخزين مستقلان)
+# داخل عملية Chromium واحدة بدل متصفح لكل حساب.
+# المهام تُوجه للجلسة بالاسم (manager_for)، ولكل حساب حد معدل (TokenBucket) تشترك فيه كل مهامه.
+# استهلاك الذاكرة لكل سياق يُقاس عند فتحه ويُعرض في memory_report.
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from playwright.async_api import async_playwright, Playwright, Browser, BrowserContext, Page, Error as PlaywrightError
+
+from utils.async_browser_manager import AsyncBrowserManager
+from utils.browser_manager import launch_options, headless_from_config
+from utils.network_profile import NetworkProfile
+from utils.metrics import timed_operation
+from utils.rate_limiter import TokenBucket
+
+APP_BASE_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_RATE_PER_MINUTE = 60.0
+DEFAULT_BURST = 5
+
+MEMORY_METHOD_RSS = "rss" # ذاكرة عمليات Chromium من نظام التشغيل (يتطلب psutil)
+MEMORY_METHOD_JS_HEAP = "js_heap" # ذاكرة JavaScript لصفحات السياق فقط (بدون psutil)
+
+
+@dataclass
+class SessionSpec:
+    name: str
+    storage_state_file: Path
+    account: str # الجلسات بنفس الحساب تشترك في حد المعدل نفسه
+    rate_per_minute: float = DEFAULT_RATE_PER_MINUTE
+    burst: int = DEFAULT_BURST
+    overrides: dict[str, Any] = field(default_factory=dict) # إعدادات خاصة بالموقع (مثل data_entry_url)
+
+
+@dataclass
+class PooledSession:
+    spec: SessionSpec
+    context: BrowserContext
+    manager: AsyncBrowserManager
+    opened_at: float = field(default_factory=time.time)
+    open_ms: float = 0.0
+    memory_bytes: int | None = None # الزيادة في الذاكرة عند فتح السياق
+
+
+@dataclass
+class PoolMemoryReport:
+    method: str | None
+    browser_bytes: int | None # المتصفح قبل فتح أي سياق
+    total_bytes: int | None
+    contexts: dict[str, int | None] = field(default_factory=dict)
+
+    @property
+    def per_extra_context_bytes(self) -> float | None:
+        # السياق الأول يحمل تكلفة عملية العرض المشتركة، فيُحسب المتوسط لما بعده
+        values = [value for value in list(self.contexts.values())[1:] if value is not None]
+        return sum(values) / len(values) if values else None
+
+    def summary(self) -> str:
+        if self.method is None:
+            return "قياس الذاكرة غير متاح."
+        contexts = "، ".join(f"{name}: {_mb(value)}" for name, value in self.contexts.items())
+        return (f"الذاكرة ({self.method}): المتصفح {_mb(self.browser_bytes)}، الإجمالي {_mb(self.total_bytes)}، "
+                f"لكل سياق إضافي {_mb(self.per_extra_context_bytes)} [{contexts}]")
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "method": self.method,
+            "browser_mb": _to_mb(self.browser_bytes),
+            "total_mb": _to_mb(self.total_bytes),
+            "per_extra_context_mb": _to_mb(self.per_extra_context_bytes),
+            "contexts_mb": {name: _to_mb(value) for name, value in self.contexts.items()},
+        }
+
+
+def _to_mb(value: float | None) -> float | None:
+    return None if value is None else round(value / (1024 * 1024), 1)
+
+
+def _mb(value: float | None) -> str:
+    return "غير معروف" if value is None else f"{value / (1024 * 1024):.1f} MB"
+
+
+def _chromium_rss_bytes() -> int | None:
+    # مجموع RSS لعمليات Chromium التابعة لهذه العملية (عبر مشغل Playwright)
+    try:
+        import psutil
+    except ImportError:
+        return None
+    total = 0
+    for process in psutil.Process().children(recursive=True):
+        try:
+            name = process.name().lower()
+            if "chrom" in name or "headless_shell" in name:
+                total += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+
+async def _js_heap_bytes(pages: list[Page]) -> int:
+    total = 0
+    for page in pages:
+        try:
+            total += int(await page.evaluate("() => (performance.memory && performance.memory.usedJSHeapSize) || 0"))
+        except PlaywrightError:
+            pass
+    return total
+
+
+def discover_sessions(sessions_dir: Path, pool_config: dict) -> list[SessionSpec]:
+    # الجلسات المعرفة في session_pool.sessions، ثم باقي ملفات sessions/*.json بالإعدادات الافتراضية
+    default_rate = float(pool_config.get("default_rate_per_minute", DEFAULT_RATE_PER_MINUTE))
+    default_burst = int(pool_config.get("default_burst", DEFAULT_BURST))
+    specs: dict[str, SessionSpec] = {}
+    for name, options in pool_config.get("sessions", {}).items():
+        state_file = Path(options.get("storage_state") or f"{name}.json")
+        specs[name] = SessionSpec(
+            name=name,
+            storage_state_file=state_file if state_file.is_absolute() else sessions_dir / state_file,
+            account=options.get("account") or name,
+            rate_per_minute=float(options.get("rate_per_minute", default_rate)),
+            burst=int(options.get("burst", default_burst)),
+            overrides=dict(options.get("overrides", {})),
+        )
+    if pool_config.get("discover", True) and sessions_dir.is_dir():
+        configured_files = {spec.storage_state_file.resolve() for spec in specs.values()}
+        for state_file in sorted(sessions_dir.glob("*.json")):
+            if state_file.stem not in specs and state_file.resolve() not in configured_files:
+                specs[state_file.stem] = SessionSpec(state_file.stem, state_file, state_file.stem,
+                                                     default_rate, default_burst)
+    return list(specs.values())
+
+
+class SessionPool:
+    def __init__(self, specs: list[SessionSpec], headless: bool = True, network_profile: NetworkProfile | None = None,
+                 launch_timeout: int = 30000, logger_instance=None):
+        self.specs = {spec.name: spec for spec in specs}
+        self.headless = headless
+        self.network_profile = network_profile
+        self.launch_timeout = launch_timeout
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+        self.playwright_instance: Playwright | None = None
+        self.browser: Browser | None = None
+        self.sessions: dict[str, PooledSession] = {}
+        self.memory_method: str | None = None
+        self.browser_memory_bytes: int | None = None
+        # حد معدل واحد لكل حساب
+        self.rate_limiters: dict[str, TokenBucket] = {}
+        for spec in specs:
+            if spec.account not in self.rate_limiters:
+                self.rate_limiters[spec.account] = TokenBucket.per_minute(spec.rate_per_minute, spec.burst, spec.account)
+        self._lock: asyncio.Lock | None = None
+
+    @classmethod
+    def from_config(cls, config: dict, sessions_dir: Path | None = None, headless: bool | None = None,
+                    logger_instance=None) -> "SessionPool":
+        pool_config = config.get("session_pool", {})
+        sessions_dir = Path(sessions_dir or pool_config.get("sessions_dir") or "sessions")
+        if not sessions_dir.is_absolute():
+            sessions_dir = APP_BASE_DIR / sessions_dir
+        return cls(
+            discover_sessions(sessions_dir, pool_config),
+            headless=headless_from_config(config) if headless is None else headless,
+            network_profile=NetworkProfile.from_config(config, logger_instance=logger_instance),
+            launch_timeout=int(pool_config.get("launch_timeout", 30000)),
+            logger_instance=logger_instance,
+        )
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.specs)
+
+    def spec(self, name: str) -> SessionSpec:
+        if name not in self.specs:
+            raise KeyError(f"جلسة غير معروفة في المجمع: {name!r} (المتاح: {', '.join(self.specs) or 'لا شيء'})")
+        return self.specs[name]
+
+    def rate_limiter(self, name: str) -> TokenBucket:
+        return self.rate_limiters[self.spec(name).account]
+
+    def config_for(self, name: str, config: dict) -> dict:
+        # الإعدادات العامة مع إعدادات الموقع الخاصة بالجلسة
+        return {**config, **self.spec(name).overrides}
+
+    # --- المتصفح والسياقات ---
+    async def _ensure_browser(self) -> Browser:
+        if self.browser is not None and self.browser.is_connected():
+            return self.browser
+        if self.sessions:
+            self.logger.warning("(pool) انقطع متصفح المجمع، سيُعاد إطلاقه وفتح السياقات عند الطلب.")
+            self.sessions.clear()
+        if not self.playwright_instance:
+            self.playwright_instance = await async_playwright().start()
+        started_at = time.perf_counter()
+        self.browser = await self.playwright_instance.chromium.launch(timeout=self.launch_timeout,
+                                                                      **launch_options(self.headless))
+        self.browser_memory_bytes = _chromium_rss_bytes()
+        self.memory_method = MEMORY_METHOD_RSS if self.browser_memory_bytes is not None else MEMORY_METHOD_JS_HEAP
+        self.logger.info(f"(pool) تم إطلاق متصفح المجمع خلال {(time.perf_counter() - started_at) * 1000:.0f} ms.")
+        return self.browser
+
+    @timed_operation("pool_open_context", target_arg="name")
+    async def manager_for(self, name: str) -> AsyncBrowserManager:
+        # مدير مرتبط بسياق الجلسة (يُفتح عند أول طلب)؛ إغلاقه لا يغلق السياق
+        spec = self.spec(name)
+        async with self._get_lock():
+            browser = await self._ensure_browser()
+            session = self.sessions.get(name)
+            if session is not None:
+                return session.manager
+            if not spec.storage_state_file.is_file():
+                raise FileNotFoundError(f"ملف الجلسة غير موجود: {spec.storage_state_file}")
+            started_at = time.perf_counter()
+            before = _chromium_rss_bytes() if self.memory_method == MEMORY_METHOD_RSS else None
+            context = await browser.new_context(storage_state=str(spec.storage_state_file))
+            manager = AsyncBrowserManager.for_context(browser, context, network_profile=self.network_profile,
+                                                      logger_instance=self.logger)
+            # صفحة أولى حتى تُحسب عملية العرض ضمن ذاكرة السياق
+            manager.page = await manager.new_page()
+            session = PooledSession(spec, context, manager, open_ms=(time.perf_counter() - started_at) * 1000)
+            if before is not None:
+                after = _chromium_rss_bytes()
+                session.memory_bytes = max(0, after - before) if after is not None else None
+            else:
+                session.memory_bytes = await _js_heap_bytes(context.pages)
+            self.sessions[name] = session
+            self.logger.info(f"(pool) فُتحت الجلسة {name} خلال {session.open_ms:.0f} ms "
+                             f"(ذاكرة السياق {_mb(session.memory_bytes)}، {len(self.sessions)} سياق مفتوح).")
+            return manager
+
+    async def open_all(self) -> dict[str, bool]:
+        results = {}
+        for name in self.specs:
+            try:
+                await self.manager_for(name)
+                results[name] = True
+            except (OSError, PlaywrightError) as e:
+                self.logger.error(f"(pool) تعذر فتح الجلسة {name}: {e}")
+                results[name] = False
+        return results
+
+    async def close_session(self, name: str):
+        async with self._get_lock():
+            session = self.sessions.pop(name, None)
+            if session is None:
+                return
+            try:
+                await session.context.close()
+            except PlaywrightError as e:
+                self.logger.warning(f"(pool) خطأ أثناء إغلاق سياق الجلسة {name}: {e}")
+
+    async def memory_report(self) -> PoolMemoryReport:
+        contexts = {name: session.memory_bytes for name, session in self.sessions.items()}
+        if self.memory_method == MEMORY_METHOD_RSS:
+            total = _chromium_rss_bytes()
+        elif self.memory_method == MEMORY_METHOD_JS_HEAP:
+            total = await _js_heap_bytes([page for session in self.sessions.values() for page in session.context.pages])
+        else:
+            total = None
+        return PoolMemoryReport(self.memory_method, self.browser_memory_bytes, total, contexts)
+
+    async def close(self):
+        async with self._get_lock():
+            self.sessions.clear()
+            if self.browser is not None:
+                try:
+                    await self.browser.close()
+                except Exception as e:
+                    self.logger.warning(f"(pool) خطأ أثناء إغلاق متصفح المجمع: {e}")
+                self.browser = None
+            if self.playwright_instance:
+                try:
+                    await self.playwright_instance.stop()
+                except Exception as e:
+                    self.logger.warning(f"(pool) خطأ أثناء إيقاف Playwright: {e}")
+                self.playwright_instance = None
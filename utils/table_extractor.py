@@ -0,0 +1,192 @@
+# utils/table_extractor.py
+# استخراج جدول كامل باستدعاء page.evaluate واحد بدل محدد (locator) لكل صف أو خلية، فكل استدعاء
+# locator رحلة CDP مستقلة وهذا بطيء جدًا في جداول أوامر العمل الكبيرة.
+# قواعد الاستخراج (data_extraction_rules) تُمرر للسكربت الذي يقرأ كل الصفوف داخل الصفحة ويعيد
+# مصفوفة لكل عمود (أصغر حجمًا من قائمة قواميس).
+# جداول ASP.NET المقسمة لصفحات (GridView) تُقرأ كلها في نفس الاستدعاء: السكربت يرسل طلب
+# __doPostBack('grid','Page$N') عبر fetch من داخل الصفحة بنفس الكوكيز و __VIEWSTATE، ويقرأ الجدول من
+# الرد دون تغيير الصفحة المعروضة.
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from playwright.async_api import Page
+
+from utils.metrics import timed_operation, OUTCOME_OK, OUTCOME_FAIL
+
+DEFAULT_MAX_PAGES = 200
+
+_EXTRACT_SCRIPT = r"""
+async ({tableSelector, rules, idRule, watchSelectors, knownHashes, pager}) => {
+  const resolve = (selector, root) => {
+    root = root || document;
+    const doc = root.ownerDocument || root;
+    if (selector.startsWith('xpath=')) {
+      return doc.evaluate(selector.slice(6), root, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    return root.querySelector(selector.startsWith('css=') ? selector.slice(4) : selector);
+  };
+  const hash = (text) => {
+    let h = 0x811c9dc5;
+    for (let i = 0; i < text.length; i++) { h ^= text.charCodeAt(i); h = Math.imul(h, 0x01000193); }
+    return (h >>> 0).toString(36);
+  };
+  const readRule = (row, rule) => {
+    const el = rule.selector ? resolve(rule.selector, row) : row.cells[rule.column];
+    if (!el) return null;
+    if (rule.attribute) return el.getAttribute(rule.attribute);
+    return (el.textContent || '').trim();
+  };
+  // روابط ترقيم GridView: javascript:__doPostBack('gvWorkOrders','Page$2')
+  const PAGE_LINK = /__doPostBack\(\s*'([^']*)'\s*,\s*'Page\$(\w+)'/;
+  const pagerLinks = (root) => Array.from(root.querySelectorAll('a[href*="Page$"]'))
+    .map((a) => PAGE_LINK.exec(a.getAttribute('href') || '')).filter(Boolean);
+  const isPagerRow = (row) => row.querySelector('a[href*="Page$"]') !== null;
+
+  const known = new Set(knownHashes);
+  const columns = {};
+  for (const rule of rules) columns[rule.name] = [];
+  const ids = [], hashes = [], extracted = [];
+  const readTable = (table) => {
+    for (const row of Array.from(table.rows)) {
+      if (!row.querySelector('td') || isPagerRow(row)) continue; // صف العناوين أو صف ترقيم الصفحات
+      const rowHash = hash(row.textContent);
+      const index = hashes.length;
+      hashes.push(rowHash);
+      ids.push(idRule ? readRule(row, idRule) : null); // null تُستبدل ببصمة الصف في extract
+      // صف بنفس البصمة السابقة لا تُقرأ أعمدته
+      const skip = known.has(rowHash);
+      if (!skip) extracted.push(index);
+      for (const rule of rules) columns[rule.name].push(skip ? null : readRule(row, rule));
+    }
+  };
+  const formFields = (form) => {
+    const params = new URLSearchParams();
+    for (const el of form.querySelectorAll('input[name], select[name], textarea[name]')) {
+      const type = (el.getAttribute('type') || '').toLowerCase();
+      if (['submit', 'button', 'image', 'file', 'reset'].includes(type)) continue;
+      if ((type === 'checkbox' || type === 'radio') && !el.checked) continue;
+      if (el.tagName === 'SELECT') {
+        for (const option of el.options) if (option.selected) params.append(el.name, option.value);
+        continue;
+      }
+      params.append(el.name, el.value);
+    }
+    return params;
+  };
+
+  const watched = watchSelectors.map((s) => { const el = resolve(s); return el ? el.textContent : ''; }).join('\u0001');
+  let table = tableSelector ? resolve(tableSelector) : null;
+  if (!table || !table.rows) {
+    return {found: false, pages: 0, error: null, fingerprint: hash(watched), ids, hashes, extracted, columns};
+  }
+  readTable(table);
+
+  let pages = 1, error = null;
+  if (pager) {
+    let page = 1;
+    let baseUrl = location.href;
+    let form = table.closest('form') || document.forms[0];
+    const hasPageAfter = (root, n) => pagerLinks(root).some((m) => m[2] === 'Next' || m[2] === 'Last' || Number(m[2]) > n);
+    while (form && pages < pager.maxPages && hasPageAfter(table, page)) {
+      const target = pager.eventTarget || pagerLinks(table)[0][1];
+      const fields = formFields(form);
+      fields.set('__EVENTTARGET', target);
+      fields.set('__EVENTARGUMENT', 'Page$' + (page + 1));
+      let response;
+      try {
+        response = await fetch(new URL(form.getAttribute('action') || baseUrl, baseUrl).href,
+                               {method: 'POST', body: fields, credentials: 'same-origin'});
+      } catch (e) { error = 'page ' + (page + 1) + ': ' + e; break; }
+      if (!response.ok) { error = 'page ' + (page + 1) + ': HTTP ' + response.status; break; }
+      const doc = new DOMParser().parseFromString(await response.text(), 'text/html');
+      table = resolve(tableSelector, doc);
+      if (!table || !table.rows) { error = 'page ' + (page + 1) + ': table not found'; break; }
+      page += 1;
+      pages += 1;
+      readTable(table);
+      // الصفحة التالية تحتاج __VIEWSTATE و __EVENTVALIDATION من هذا الرد
+      baseUrl = response.url || baseUrl;
+      form = table.closest('form') || doc.forms[0];
+    }
+  }
+  return {found: true, pages, error, fingerprint: hash(watched + '\u0002' + hashes.join(',')),
+          ids, hashes, extracted, columns};
+}
+"""
+
+
+@dataclass
+class TableData:
+    found: bool
+    columns: dict[str, list[Any]] # اسم القاعدة -> قيمة لكل صف (None للصفوف المعروفة التي لم تُقرأ)
+    hashes: list[str] # بصمة نص كل صف
+    ids: list[str] = field(default_factory=list) # قيمة عمود المعرف لكل صف، أو بصمة الصف إن لم تكن له قيمة
+    extracted: list[int] = field(default_factory=list) # أرقام الصفوف التي قُرئت أعمدتها
+    pages: int = 0
+    fingerprint: str = ""
+    error: str | None = None # توقف الترقيم قبل آخر صفحة
+    duration_ms: float = 0.0
+
+    @property
+    def row_count(self) -> int:
+        return len(self.hashes)
+
+    def record(self, index: int) -> dict[str, Any]:
+        return {name: values[index] for name, values in self.columns.items()}
+
+    def records(self) -> list[dict[str, Any]]:
+        return [self.record(index) for index in self.extracted]
+
+
+class TableExtractor:
+    def __init__(self, table_selector: str, rules: list[dict[str, Any]], id_field: str | None = None,
+                 watch_selectors: list[str] | tuple[str, ...] = (), pager: dict[str, Any] | None = None,
+                 logger_instance=None):
+        for rule in rules:
+            if not rule.get("name") or (rule.get("column") is None and not rule.get("selector")):
+                raise ValueError(f"قاعدة استخراج غير صالحة (تحتاج name و column أو selector): {rule!r}")
+        self.table_selector = table_selector
+        self.rules = list(rules)
+        self.id_rule = next((rule for rule in self.rules if rule["name"] == id_field), None) if id_field else None
+        self.watch_selectors = list(watch_selectors)
+        # pager: None = صفحة واحدة فقط، وإلا {"event_target": اختياري، "max_pages": حد الصفحات}
+        self.pager = None
+        if pager is not None and pager.get("enabled", True):
+            self.pager = {"eventTarget": pager.get("event_target") or None,
+                          "maxPages": int(pager.get("max_pages", DEFAULT_MAX_PAGES))}
+        self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+
+    @classmethod
+    def from_config(cls, monitoring_config: dict, logger_instance=None) -> "TableExtractor":
+        rules = list(monitoring_config.get("data_extraction_rules", []))
+        id_field = monitoring_config.get("row_id_field") or (rules[0]["name"] if rules else None)
+        return cls(
+            monitoring_config.get("table_selector", ""),
+            rules,
+            id_field=id_field,
+            watch_selectors=monitoring_config.get("elements_to_check_change", []),
+            pager=monitoring_config.get("pager", {}),
+            logger_instance=logger_instance,
+        )
+
+    @timed_operation("extract_table", outcome=lambda data: OUTCOME_OK if data.found and not data.error else OUTCOME_FAIL)
+    async def extract(self, page: Page, known_hashes: list[str] | tuple[str, ...] = ()) -> TableData:
+        # known_hashes: بصمات صفوف معروفة مسبقًا، لا تُقرأ أعمدتها (تبقى البصمة والمعرف فقط)
+        started_at = time.perf_counter()
+        raw = await page.evaluate(_EXTRACT_SCRIPT, {
+            "tableSelector": self.table_selector,
+            "rules": self.rules,
+            "idRule": self.id_rule,
+            "watchSelectors": self.watch_selectors,
+            "knownHashes": list(known_hashes),
+            "pager": self.pager,
+        })
+        # بدون قاعدة معرف أو بخلية معرف فارغة: بصمة الصف هي المعرف (وليس النص "None")
+        ids = [row_id if row_id not in (None, "") else row_hash for row_id, row_hash in zip(raw["ids"], raw["hashes"])]
+        data = TableData(raw["found"], raw["columns"], raw["hashes"], ids, raw["extracted"], raw["pages"],
+                         raw["fingerprint"], raw["error"], (time.perf_counter() - started_at) * 1000)
+        if data.error:
+            self.logger.warning(f"توقف ترقيم الجدول '{self.table_selector}' بعد {data.pages} صفحة: {data.error}")
+        return data